@@ -0,0 +1,104 @@
+"""
+Benchmark reading the summary files straight out of compressed files and archives.
+
+Packs the corpus into a temporary directory as plain files, one .txt.gz per
+file, a .tar and a .tar.gz (plus .zst / .tar.zst when zstandard is installed),
+then times listing + ingest_files on each and checks every layout gives the
+same results as the plain directory.
+
+Usage:
+python3 benchmarks/bench_archive_ingest.py [--repeat 3] [--jobs 1]
+"""
+import io
+import json
+import os
+import sys
+import gzip
+import time
+import shutil
+import tarfile
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+from ingest import ingest_files, list_summary_files
+from sources import zstandard, plain_name
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+
+def pack(directory: str, workdir: str) -> dict:
+    """
+    {layout: path to give list_summary_files} of the corpus in every layout
+    """
+    names = sorted(os.listdir(directory))
+    layouts = {'plain': directory}
+
+    layouts['txt.gz'] = os.path.join(workdir, 'gz')
+    os.makedirs(layouts['txt.gz'])
+    for name in names:
+        with open(os.path.join(directory, name), 'rb') as source, gzip.open(os.path.join(layouts['txt.gz'], name + '.gz'), 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target)
+
+    for layout, mode in [('tar', 'w'), ('tar.gz', 'w:gz')]:
+        layouts[layout] = os.path.join(workdir, f'runs.{layout}')
+        with tarfile.open(layouts[layout], mode) as archive:
+            archive.add(directory, arcname='runs')
+
+    if zstandard is not None:
+        layouts['zst'] = os.path.join(workdir, 'zst')
+        os.makedirs(layouts['zst'])
+        compressor = zstandard.ZstdCompressor()
+        for name in names:
+            with open(os.path.join(directory, name), 'rb') as source, open(os.path.join(layouts['zst'], name + '.zst'), 'wb') as target:
+                compressor.copy_stream(source, target)
+        layouts['tar.zst'] = os.path.join(workdir, 'runs.tar.zst')
+        with open(layouts['tar'], 'rb') as source, open(layouts['tar.zst'], 'wb') as target:
+            compressor.copy_stream(source, target)
+    return layouts
+
+
+def comparable(results: list) -> list:
+    """
+    The results without the file names, which differ by their compression suffix only.
+    NaN never equals itself once the results have been through the pool, so they are compared as JSON
+    """
+    return [json.dumps({k: plain_name(v) if k == 'duplicate_of' else v for k, v in i.items() if k != 'file'}, sort_keys=True) for i in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingesting compressed and archived summary files")
+    parser.add_argument("--dir", default=RUNS_DIR, help="Directory of summary files")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats per layout, the best is reported")
+    parser.add_argument("--jobs", type=int, default=1, help="Processes used to parse")
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='treeval_bench_')
+    try:
+        layouts = pack(options.dir, workdir)
+        if zstandard is None:
+            print("zstandard not installed, .zst layouts skipped")
+
+        baseline = None
+        print(f"{'layout':<10} {'size (MB)':>10} {'best (s)':>9} {'files/s':>9}   same results")
+        for layout, path in layouts.items():
+            size = sum(os.path.getsize(os.path.join(root, i)) for root, _, files in os.walk(path) for i in files) if os.path.isdir(path) else os.path.getsize(path)
+            times = []
+            for _ in range(options.repeat):
+                start = time.perf_counter()
+                with redirect_stdout(io.StringIO()):            # The parsers print about every odd file
+                    results = ingest_files(list_summary_files(path), jobs=options.jobs)
+                times.append(time.perf_counter() - start)
+            if baseline is None:
+                baseline = comparable(results)
+            same = comparable(results) == baseline
+            print(f"{layout:<10} {size / 1e6:>10.2f} {min(times):>9.3f} {len(results) / min(times):>9.0f}   {same}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
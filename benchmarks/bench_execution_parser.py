@@ -0,0 +1,73 @@
+"""
+Benchmark the grouping of execution log lines per process.
+
+Compares the old two step scan (get_unique_processes + collect_per_process,
+which re-split every line once per process) against
+ParseRunExecution.group_per_process on the largest files of the corpus.
+
+Usage:
+python3 benchmarks/bench_execution_parser.py [--files 5] [--repeat 5]
+"""
+import os
+import sys
+import argparse
+import timeit
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+from parse_run_execution import ParseRunExecution
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+
+def legacy_get_unique_processes(data: list) -> list:
+    return list(set([i.split(' ')[0] for i in data]))
+
+
+def legacy_collect_per_process(data: list, processes: list) -> dict:
+    collection = dict()
+    for i in processes:
+        for ii in data:
+            if ii.split(' ')[0] == i and str(ii.split('\t')[1]) == 'COMPLETED':
+                ii = ii.split('\t')[3:]
+                if i in collection:
+                    collection[i].append(ii)
+                else:
+                    collection[i] = [ii]
+    return collection
+
+
+def legacy_group(data: list) -> dict:
+    return legacy_collect_per_process(data, legacy_get_unique_processes(data))
+
+
+def largest_files(directory: str, number: int) -> list:
+    files = [os.path.join(directory, i) for i in os.listdir(directory)]
+    return sorted(files, key=os.path.getsize, reverse=True)[:number]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark execution log grouping")
+    parser.add_argument("--dir", default=RUNS_DIR, help="Directory of summary files")
+    parser.add_argument("--files", type=int, default=5, help="Number of the largest files to time")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N repeats")
+    options = parser.parse_args()
+
+    print(f"{'file':60} {'lines':>7} {'procs':>6} {'legacy (s)':>11} {'single (s)':>11} {'speedup':>8}")
+    for file in largest_files(options.dir, options.files):
+        with open(file) as handle:
+            block = handle.readlines()[16:-1]
+
+        new = ParseRunExecution.group_per_process(block)
+        old = legacy_group(block)
+        assert {k: sorted(v) for k, v in old.items()} == {k: sorted(v) for k, v in new.items()}, file
+
+        old_time = min(timeit.repeat(lambda: legacy_group(block), number=1, repeat=options.repeat))
+        new_time = min(timeit.repeat(lambda: ParseRunExecution.group_per_process(block), number=1, repeat=options.repeat))
+
+        print(f"{os.path.basename(file)[:60]:60} {len(block):>7} {len(new):>6} {old_time:>11.4f} {new_time:>11.4f} {old_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark the parsing of the groovy input fields of the summary header
+(InputAssemblyData, Input_PacBio_Files and Input_Cram_Files).
+
+Compares the old split(':') + eval() implementation against
+ParseRunHeader.parse_input over every header in the corpus, and reports
+how many fields each one fails on.
+
+Usage:
+python3 benchmarks/bench_header_parser.py [--repeat 5]
+"""
+import os
+import re
+import sys
+import argparse
+import timeit
+
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+from parse_run_header import ParseRunHeader
+from general_functions import read_summary_header
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+
+def legacy_fix_data(input_data: str) -> list:
+    if 'cn' in input_data.split(':')[3].split('],')[0]:
+        count_files = eval(input_data.split(':')[3].split(',')[0])
+    else:
+        count_files = eval(input_data.split(':')[3].split('],')[0])
+    if not isinstance (count_files, list):
+        count_files = [count_files]
+    return count_files
+
+
+def legacy_get_container(input_data: str) -> int:
+    if 'cn' in input_data:
+        cn_no = re.findall(f"cn:([0-9]*)", input_data)
+        if cn_no:
+            return cn_no[0]
+        else:
+            return np.nan
+    else:
+        return np.nan
+
+
+def legacy_fix_fasta(fasta: str) -> list:
+    split_field = fasta.split('  ')[1].split(':')
+    return [    split_field[1].split(',')[0],
+                int(split_field[2].split(',')[0]),
+                split_field[3].split(',')[0],
+                split_field[4].split(']')[0],
+                str(split_field[4].split(']')[1][2:])
+            ]
+
+
+def legacy(header: dict):
+    # The old code worked on the raw line, so rebuild it
+    fasta   = 'InputAssemblyData:  ' + header['InputAssemblyData']
+    pacbio  = 'Input_PacBio_Files: ' + header['Input_PacBio_Files']
+    cram    = 'Input_Cram_Files:   ' + header['Input_Cram_Files']
+    return legacy_fix_fasta(fasta), legacy_fix_data(pacbio), legacy_fix_data(cram), legacy_get_container(cram)
+
+
+def compiled(header: dict):
+    cram = ParseRunHeader.parse_input(header['Input_Cram_Files'])
+    return (    ParseRunHeader.fix_fasta(ParseRunHeader.parse_input(header['InputAssemblyData'])),
+                ParseRunHeader.fix_data(ParseRunHeader.parse_input(header['Input_PacBio_Files'])),
+                ParseRunHeader.fix_data(cram),
+                ParseRunHeader.get_container(cram)
+            )
+
+
+def run_all(function, headers: list) -> int:
+    failures = 0
+    for header in headers:
+        try:
+            function(header)
+        except Exception:
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark header input field parsing")
+    parser.add_argument("--dir", default=RUNS_DIR, help="Directory of summary files")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N repeats")
+    options = parser.parse_args()
+
+    headers = []
+    for file in sorted(os.listdir(options.dir)):
+        path = os.path.join(options.dir, file)
+        if os.path.getsize(path) > 0:
+            with open(path) as handle:
+                headers.append(read_summary_header(handle))
+
+    disagree = 0
+    for header in headers:
+        try:
+            old = legacy(header)
+        except Exception:
+            continue
+        new = compiled(header)
+        # The old parser kept the container count as a string
+        old_fasta = old[0]
+        old_cn = np.nan if old[3] is np.nan else int(old[3])
+        if [old_fasta, old[1], old[2]] != list(new[:3]) or not (old_cn == new[3] or (old_cn is np.nan and new[3] is np.nan)):
+            disagree += 1
+
+    old_time = min(timeit.repeat(lambda: run_all(legacy, headers), number=1, repeat=options.repeat))
+    new_time = min(timeit.repeat(lambda: run_all(compiled, headers), number=1, repeat=options.repeat))
+
+    print(f"headers:                {len(headers)}")
+    print(f"legacy failures:        {run_all(legacy, headers)}")
+    print(f"compiled failures:      {run_all(compiled, headers)}")
+    print(f"disagreements:          {disagree}")
+    print(f"legacy (s):             {old_time:.4f}")
+    print(f"compiled (s):           {new_time:.4f}")
+    print(f"speedup:                {old_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark the size and load time of TreeValSummary.html.
+
+Tiles the parsed corpus up to --runs runs and writes the report in each
+--html_mode: cdn (one plotly div with its own copy of the data per figure)
+and compact (plotly.js inlined once, one shared columnar payload, plain
+and gzipped). Reports build time and page size, and when node is on the PATH
+the time to evaluate the page's scripts against a stub DOM / Plotly, i.e.
+everything a browser does before drawing.
+
+Usage:
+python3 benchmarks/bench_html_report.py [--runs 3000] [--no_trendlines]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+import pandas as pd
+
+from ingest import ingest_files, list_summary_files, RUN_COLUMNS
+from process_registry import ProcessRegistry
+from plotly.offline import get_plotlyjs
+
+from report import expand_process_columns, render_figures, compact_report, FIGURE_SPECS
+from html_template import html_report
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+# Runs every inline script of a report with a stub DOM and Plotly, skipping plotly.js itself
+NODE_LOADER = r"""
+const fs = require('fs');
+const html = fs.readFileSync(process.argv[2], 'utf8');
+const data = html.match(/<script type="application\/json" id="treeval-data" data-encoding="(\w+)">([\s\S]*?)<\/script>/);
+const scripts = [...html.matchAll(/<script(?: type="text\/javascript")?>([\s\S]*?)<\/script>/g)].map(m => m[1]).filter(s => s.length < 1000000 || data === null);
+const element = () => ({appendChild() {}, innerHTML: '', dataset: {}, textContent: ''});
+const elements = data ? {'treeval-data': {dataset: {encoding: data[1]}, textContent: data[2]}} : {};
+let figures = 0, pending = 0;
+global.window = {};
+global.document = {getElementById: id => elements[id] || element(), createElement: element};
+global.Plotly = {newPlot: () => { figures++; return {then: () => null}; }};
+const start = process.hrtime.bigint();
+for (const script of scripts) new Function(script)();
+const check = () => {
+    if (data && figures === 0 && pending++ < 60000) return setTimeout(check, 1);
+    console.log(JSON.stringify({seconds: Number(process.hrtime.bigint() - start) / 1e9, figures: figures}));
+};
+check();
+"""
+
+
+def tile(data_df: pd.DataFrame, runs: int) -> pd.DataFrame:
+    copies = -(-runs // len(data_df))
+    tiled = pd.concat([data_df] * copies, ignore_index=True).iloc[:runs].copy()
+    tiled['Unique_name'] = [f"{name}-{i}" for i, name in enumerate(tiled['Unique_name'])]
+    return tiled
+
+
+def node_load(path: str, node: str, script: str) -> str:
+    process = subprocess.run([node, script, path], capture_output=True, text=True)
+    if process.returncode != 0:
+        return 'failed'
+    result = json.loads(process.stdout.strip())
+    return f"{result['seconds']:.3f}s ({result['figures']} figures)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML report modes")
+    parser.add_argument("--dir", default=RUNS_DIR, help="Directory of summary files")
+    parser.add_argument("--runs", type=int, default=3000, help="Number of runs in the report, the corpus is repeated to reach it")
+    parser.add_argument("--jobs", type=int, default=1, help="Processes used to parse and render")
+    parser.add_argument("--no_trendlines", action="store_true", help="Leave out the OLS trendlines (they need statsmodels for the cdn mode)")
+    options = parser.parse_args()
+
+    specs = FIGURE_SPECS
+    if options.no_trendlines:
+        specs = [{k: v for k, v in i.items() if not k.startswith('trendline')} for i in FIGURE_SPECS]
+
+    registry = ProcessRegistry()
+    results = [i for i in ingest_files(list_summary_files(options.dir), jobs=options.jobs, registry=registry) if i['status'] == 'OK']
+    data_df = pd.DataFrame([i['row'] + registry.process_row(i) for i in results], columns=RUN_COLUMNS + registry.process_columns())
+    data_df = tile(expand_process_columns(data_df, registry.names), options.runs)
+    shape = list(data_df.shape)
+
+    modes = {   'cdn'           : lambda: html_report('', shape, render_figures(data_df, specs, jobs=options.jobs)),
+                'compact'       : lambda: compact_report('', shape, data_df, specs),
+                'compact gzip'  : lambda: compact_report('', shape, data_df, specs, compress=True)
+            }
+
+    node = shutil.which('node')
+    workdir = tempfile.mkdtemp(prefix='treeval_bench_')
+    loader = os.path.join(workdir, 'load.js')
+    with open(loader, 'w') as file:
+        file.write(NODE_LOADER)
+
+    print(f"runs: {shape[0]}    columns: {shape[1]}")
+    # The cdn page also has to download plotly.js, the compact one carries it
+    extra = {'cdn': len(get_plotlyjs().encode())}
+
+    print(f"{'mode':<14} {'build':>8} {'size (MB)':>10} {'+ plotly.js':>12}   script load")
+    try:
+        for name, build in modes.items():
+            start = time.perf_counter()
+            page = build()
+            seconds = time.perf_counter() - start
+            path = os.path.join(workdir, f"{name.replace(' ', '_')}.html")
+            with open(path, 'w') as file:
+                file.write(page)
+            load = node_load(path, node, loader) if node else 'node not found'
+            size = len(page.encode())
+            print(f"{name:<14} {seconds:>7.2f}s {size / 1e6:>10.2f} {(size + extra.get(name, 0)) / 1e6:>12.2f}   {load}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
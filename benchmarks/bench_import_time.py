@@ -0,0 +1,94 @@
+"""
+Benchmark the start up of ProjectStats.py and guard the fast path.
+
+Times `--version` and a `--stats_only` run over a few summary files in fresh
+interpreters, and checks that none of the plotting libraries (or pandas) were
+imported on the way. Exits non zero if a heavy module was loaded or the fast
+path is slower than --max_seconds, so it can be used as a check.
+
+Usage:
+python3 benchmarks/bench_import_time.py [--repeat 5] [--max_seconds 1.0]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPO, 'src', 'treeval', 'scripts', 'ProjectStats.py')
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+HEAVY_MODULES = ['pandas', 'matplotlib', 'plotly', 'seaborn', 'report']
+
+# Runs ProjectStats in this interpreter and reports which heavy modules it pulled in
+CHECK = """
+import os, sys, json, runpy
+sys.argv = {argv!r}
+sys.path.insert(0, os.path.dirname({script!r}))
+try:
+    runpy.run_path({script!r}, run_name='__main__')
+except SystemExit:
+    pass
+sys.stderr.write('\\n' + json.dumps(sorted(i for i in {heavy!r} if i in sys.modules)))
+"""
+
+
+def wall_time(command: list, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def heavy_imports(argv: list) -> list:
+    code = CHECK.format(argv=['ProjectStats.py'] + argv, script=SCRIPT, heavy=HEAVY_MODULES)
+    process = subprocess.run([sys.executable, '-c', code], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return json.loads(process.stderr.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ProjectStats start up time")
+    parser.add_argument("--dir", default=RUNS_DIR, help="Directory of summary files")
+    parser.add_argument("--files", type=int, default=5, help="Number of summary files for the --stats_only run")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N repeats")
+    parser.add_argument("--max_seconds", type=float, default=1.0, help="Fail if a fast path run takes longer than this")
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='treeval_bench_')
+    try:
+        runs = os.path.join(workdir, 'runs')
+        os.makedirs(runs)
+        files = sorted(i for i in os.listdir(options.dir) if os.path.getsize(os.path.join(options.dir, i)) > 0)
+        for file in files[:options.files]:
+            shutil.copy(os.path.join(options.dir, file), runs)
+        outdir = os.path.join(workdir, 'out')
+
+        cases = {   'python startup'    : [sys.executable, '-c', 'pass'],
+                    '--version'         : [sys.executable, SCRIPT, '--version'],
+                    '--stats_only'      : [sys.executable, SCRIPT, runs, '-o', outdir, '--stats_only'],
+                    '--stats_only json' : [sys.executable, SCRIPT, runs, '-o', outdir, '--stats_only', 'json']
+                }
+
+        failed = False
+        for name, command in cases.items():
+            seconds = wall_time(command, options.repeat)
+            loaded = heavy_imports(command[2:]) if command[1] == SCRIPT else []
+            status = 'ok'
+            if loaded or (name != 'python startup' and seconds > options.max_seconds):
+                status = 'FAIL'
+                failed = True
+            print(f"{name:<20} {seconds:>8.3f}s   {status}   {'loaded: ' + ', '.join(loaded) if loaded else ''}")
+    finally:
+        shutil.rmtree(workdir)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark the directory scan and how much of it overlaps with parsing.
+
+Counts the stat calls made by the old listing (os.listdir, then a stat of
+every entry to skip empty files) and by scanner.scan_files, which is what
+costs a metadata server round trip each on Lustre / NFS. Then times listing
+everything before parsing against feeding scan_sources straight into
+ingest_files, and checks both give the same results.
+
+Usage:
+python3 benchmarks/bench_scan.py [--dir DIR] [--recursive] [--jobs 4] [--repeat 3]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+from ingest import ingest_files, list_summary_files, RUN_EXCLUDE
+from scanner import scan_files, scan_sources
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+
+def listdir_stat(directory: str) -> list:
+    """
+    The listing scan_sources replaced: listdir, then a stat per entry to drop the empty files
+    """
+    return [os.path.join(directory, i) for i in sorted(os.listdir(directory)) if os.stat(os.path.join(directory, i)).st_size > 0]
+
+
+def count_stats(function, *args) -> int:
+    """
+    Number of os.stat calls made by function(*args)
+    """
+    calls = [0]
+    original = os.stat
+    def counted(*a, **k):
+        calls[0] += 1
+        return original(*a, **k)
+    os.stat = counted
+    try:
+        function(*args)
+    finally:
+        os.stat = original
+    return calls[0]
+
+
+def best_time(function, repeat: int):
+    """
+    (best wall time, last result) of function()
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):            # The parsers print about every odd file
+            result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scanning a summary directory")
+    parser.add_argument("--dir", default=RUNS_DIR, help="Directory of summary files")
+    parser.add_argument("--recursive", action="store_true", help="Scan subdirectories too")
+    parser.add_argument("--jobs", type=int, default=4, help="Processes used to parse")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats per case, the best is reported")
+    options = parser.parse_args()
+
+    if not options.recursive:
+        print(f"stat calls, listdir + stat: {count_stats(listdir_stat, options.dir)}")
+    print(f"stat calls, scan_files:     {count_stats(scan_files, options.dir, ['*'], RUN_EXCLUDE, options.recursive)}")
+
+    listed, listed_results = best_time(lambda: ingest_files(list_summary_files(options.dir, options.recursive), jobs=options.jobs), options.repeat)
+    streamed, streamed_results = best_time(lambda: ingest_files(scan_sources(options.dir, exclude=RUN_EXCLUDE, recursive=options.recursive), jobs=options.jobs), options.repeat)
+
+    # NaN never equals itself once the results have been through the pool, so compare them as JSON
+    same = [json.dumps(i, sort_keys=True) for i in listed_results] == [json.dumps(i, sort_keys=True) for i in streamed_results]
+    print(f"list then parse: {listed:.3f}s   streamed: {streamed:.3f}s   files: {len(streamed_results)}   same results: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Generate a synthetic corpus of TreeVal summary (and co2footprint) files for scale testing.
+
+Every value is drawn from the bundled corpus. Each synthetic run copies the
+header and process mix (task counts per process) of a real run with the chosen
+entry point, gets a new sample id, and draws the cpus / memory / realtime /
+%cpu / %mem / peak_rss of every completed task from all real tasks of that
+process. Only runs ProjectStats can parse are used as templates, so the
+output parses like the corpus does.
+
+--fan_out multiplies the tasks of sharded processes (those with more than one
+task in the template, or only the ones matching --shard), --tasks picks the
+fan out that gives each trace about that many lines, e.g. one FULL trace of
+100k task lines from a heavily sharded HIC_MAPPING and SELFCOMP:MUMMER:
+
+python3 benchmarks/generate_corpus.py /tmp/big --runs 1 --entry_point FULL --tasks 100000 --shard HIC_MAPPING SELFCOMP:MUMMER
+
+and a 50k run project with co2footprint files:
+
+python3 benchmarks/generate_corpus.py /tmp/50k --runs 50000 --co2
+"""
+import io
+import os
+import re
+import sys
+import random
+import argparse
+from contextlib import redirect_stdout
+from collections import defaultdict
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+from general_functions import SECTION_MARKERS, read_summary_header, stream_summary_trace
+from ingest import ingest_files, list_summary_files, list_co2_files, CO2_SUFFIX
+from normalise import duration_seconds, normalise_value
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+CO2_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-co2')
+
+TRACE_HEADER = ['name', 'status', 'module', 'cpus', 'memory', 'attempt', 'realtime', '%cpu', '%mem', 'peak_rss']
+CO2_HEADER = [  'task_id', 'name', 'status', 'energy_consumption', 'CO2e', 'time', 'cpus',
+                'powerdraw_cpu', 'cpu_model', 'cpu_usage', 'requested_memory'
+            ]
+
+# co2footprint defaults: W per GB of memory requested and g CO2e per kWh, the bundled files use 231
+POWER_PER_GB = 0.3725
+CARBON_INTENSITY = 231
+
+TASK_TAG = re.compile(r'^(?P<process>\S+)(?: \((?P<tag>.*)\))?$')
+SAMPLE_LETTERS = re.compile(r'^[A-Za-z]+')
+
+
+class CorpusModel:
+    """
+    What the generator draws from: the parsable runs of the corpus (header + trace lines)
+    and, per process name, the resource columns of every completed task.
+    """
+
+    def __init__(self, runs_dir: str, co2_dir: str = '', jobs: int = 1):
+        self.templates  = defaultdict(list)         # entry point: [(header, [(process, tag, status, resources)])]
+        self.resources  = defaultdict(list)         # process: [resources]
+        self.runnames   = []
+        self.cpus       = []                        # (powerdraw_cpu, cpu_model) of the co2 files
+
+        files = list_summary_files(runs_dir)
+        with redirect_stdout(io.StringIO()):         # The parsers print about every odd file
+            results = ingest_files(files, jobs=jobs)
+        for file, result in zip(files, results):
+            if result['status'] != 'OK':
+                continue
+            with open(file) as handle:
+                header = read_summary_header(handle)
+                tasks = [CorpusModel.split_task(i) for i in stream_summary_trace(handle)]
+            tasks = [i for i in tasks if i is not None]
+            self.templates[header['Pipeline_entrypnt']].append((header, tasks))
+            self.runnames.append(header['Pipeline_runname'])
+            for process, _, status, resources in tasks:
+                if status == 'COMPLETED':
+                    self.resources[process].append(resources)
+
+        if co2_dir:
+            for file in list_co2_files(co2_dir):
+                with open(file) as handle:
+                    next(handle)
+                    self.cpus.extend({(i[7], i[8]) for i in (j.split('\t') for j in handle) if len(i) > 8})
+        if not self.cpus:
+            self.cpus = [('12.0', 'Intel Xeon Processor (Skylake, IBRS)')]
+
+        if not self.templates:
+            sys.exit(f"No parsable summary files in {runs_dir}")
+
+
+    def split_task(line: str):
+        fields = line.rstrip('\n').split('\t')
+        if len(fields) < len(TRACE_HEADER):
+            return None
+        name = TASK_TAG.match(fields[0])
+        return name.group('process'), name.group('tag'), fields[1], fields[2:]
+
+
+def sample_id(header: dict, index: int) -> str:
+    """
+    A new sample id keeping the letters of the template's, so the prefix and clade still match
+    """
+    name = header['InputSampleID'].strip('[]')
+    return f"{SAMPLE_LETTERS.match(name).group()}{index + 1}_1"
+
+
+def make_header(header: dict, old_sample: str, sample: str, runname: str, rng: random.Random) -> list:
+    """
+    Header lines of a synthetic run, the template's with the sample, run name and session replaced
+    """
+    header = {k: v.replace(old_sample, sample) for k, v in header.items()}
+    header['InputSampleID'] = sample
+    header['Pipeline_runname'] = runname
+    header['Pipeline_session'] = '{:08x}-{:04x}-4{:03x}-{:04x}-{:012x}'.format(
+        rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(12), rng.getrandbits(16), rng.getrandbits(48)
+    )
+
+    lines = [SECTION_MARKERS[0]]
+    for key, value in header.items():
+        if key == 'InputSampleID':
+            lines.append(SECTION_MARKERS[1])
+        lines.append(f"{key + ':':<20}{value}")
+    lines.append(SECTION_MARKERS[2])
+    lines.append('\t'.join(TRACE_HEADER))
+    return lines
+
+
+def co2_line(task_id: int, name: str, status: str, resources: list, cpu: tuple) -> str:
+    """
+    A co2footprint line for one task, energy from its realtime, cpus, %cpu and requested memory
+    """
+    _, cpus, memory, _, realtime, percent_cpu = resources[:6]
+    hours = (duration_seconds(realtime) or 0) / 3600
+    percent_cpu = float(percent_cpu.rstrip('%')) if percent_cpu != '-' else 0     # FAILED tasks have no usage
+    usage = min(max(percent_cpu / 100 / int(cpus), 0.01), 1)
+    watts = int(cpus) * float(cpu[0]) * usage + normalise_value(memory) / 1000 * POWER_PER_GB
+    energy = watts * hours * 1000                                   # mWh
+    co2e = energy * CARBON_INTENSITY / 1000                         # mg
+    return '\t'.join([  str(task_id), name, status, f"{energy:.2f} mWh", f"{co2e:.2f} mg", realtime, cpus,
+                        cpu[0], cpu[1], f"{usage:.3f}", memory
+                    ])
+
+
+def generate_run(model: CorpusModel, entry_point: str, index: int, options, rng: random.Random) -> dict:
+    """
+    One synthetic run: {'name': summary file name, 'sample': id, 'summary': lines, 'co2': lines, 'tasks': task lines}
+    """
+    header, tasks = rng.choice(model.templates[entry_point])
+    old_sample = header['InputSampleID'].strip('[]')
+    sample = sample_id(header, index)
+    runname = f"{rng.choice(model.runnames)}_{index}"
+
+    counts = defaultdict(int)
+    for process, _, status, _ in tasks:
+        counts[process] += status == 'COMPLETED'
+
+    if options.shard:
+        sharded = {i for i in counts if any(j in i for j in options.shard)}
+    else:
+        sharded = {i for i, count in counts.items() if count > 1}
+
+    fan_out = options.fan_out
+    if options.tasks:
+        # Fan out just enough for the trace to reach --tasks lines
+        fanned = sum(i[0] in sharded for i in tasks)
+        fan_out = max(1, -(-(options.tasks - len(tasks) + fanned) // max(fanned, 1)))
+
+    summary = make_header(header, old_sample, sample, runname, rng)
+    start = len(summary)
+    co2 = ['\t'.join(CO2_HEADER)]
+    cpu = rng.choice(model.cpus)
+    for process, tag, status, resources in tasks:
+        copies = fan_out if process in sharded else 1
+        tag = (tag or sample).replace(old_sample, sample)
+        for shard in range(copies):
+            if status == 'COMPLETED':
+                resources = rng.choice(model.resources[process])
+            name = f"{process} ({tag}{'_' + str(shard) if shard else ''})"
+            summary.append('\t'.join([name, status] + resources))
+            if options.co2 and status != 'CACHED':
+                co2.append(co2_line(len(co2), name, status, resources, cpu))
+
+    date = header['Pipeline_datastrt'][:19].replace('T', '_').replace(':', '-')
+    return {    'name'      : f"TreeVal_run_{sample}_{entry_point}_{date}.txt",
+                'sample'    : sample,
+                'summary'   : summary,
+                'co2'       : co2,
+                'tasks'     : len(summary) - start
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic TreeVal summary and co2footprint files")
+    parser.add_argument("output", help="Directory to write the summary files to, co2footprint files go in output/co2")
+    parser.add_argument("--runs", type=int, default=1000, help="Number of runs to generate")
+    parser.add_argument("--entry_point", default='mixed', help="FULL, RAPID, RAPID_TOL ... or mixed to draw them like the corpus")
+    parser.add_argument("--fan_out", type=int, default=1, help="Multiply the tasks of sharded processes by this")
+    parser.add_argument("--tasks", type=int, help="Pick the fan out per run so each trace has about this many task lines")
+    parser.add_argument("--shard", nargs='*', help="Only fan out processes containing one of these, e.g. HIC_MAPPING SELFCOMP:MUMMER")
+    parser.add_argument("--co2", action="store_true", help="Also write a co2footprint file per run")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed gives the same corpus")
+    parser.add_argument("--corpus", default=RUNS_DIR, help="Directory of real summary files to draw from")
+    parser.add_argument("--co2_corpus", default=CO2_DIR, help="Directory of real co2footprint files (cpu models and power draw)")
+    parser.add_argument("--jobs", type=int, default=1, help="Processes used to parse the corpus")
+    options = parser.parse_args()
+
+    model = CorpusModel(options.corpus, options.co2_corpus, options.jobs)
+    entry_points = sorted(model.templates)
+    if options.entry_point != 'mixed' and options.entry_point not in entry_points:
+        sys.exit(f"No {options.entry_point} runs in the corpus, choose from: {', '.join(entry_points)} or mixed")
+    weights = [len(model.templates[i]) for i in entry_points]
+
+    rng = random.Random(options.seed)
+    co2_dir = os.path.join(options.output, 'co2')
+    os.makedirs(co2_dir if options.co2 else options.output, exist_ok=True)
+
+    lines = 0
+    for index in range(options.runs):
+        entry_point = options.entry_point
+        if entry_point == 'mixed':
+            entry_point = rng.choices(entry_points, weights)[0]
+        run = generate_run(model, entry_point, index, options, rng)
+        with open(os.path.join(options.output, run['name']), 'w') as file:
+            file.write('\n'.join(run['summary']) + '\n')
+        if options.co2:
+            with open(os.path.join(co2_dir, run['sample'] + CO2_SUFFIX), 'w') as file:
+                file.write('\n'.join(run['co2']) + '\n')
+        lines += run['tasks']
+
+    print(f"{options.runs} runs, {lines} task lines written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
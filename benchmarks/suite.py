@@ -0,0 +1,253 @@
+"""
+Benchmark suite for ProjectStats over the bundled corpus.
+
+Times each stage separately: the header, execution and co2 parsers, the
+aggregates, the DataFrame expansion and every graph / report function.
+`run` writes the timings to JSON, `compare` checks a run against a stored
+baseline and exits non zero when a stage got slower than the threshold.
+compare goes by the median of each stage's repeats (at least MIN_REPEAT),
+and a stage must also be at least --min_change seconds slower to be
+flagged, so the sub millisecond stages can't fail on timer noise.
+benchmarks/baseline.json is the committed baseline `compare` uses by default.
+Timings depend on the machine, so refresh it with `run --output
+benchmarks/baseline.json` on the machine you compare on, from the commit
+you want to compare against.
+
+Usage:
+python3 benchmarks/suite.py run [--repeat 3] [--output benchmarks/results.json]
+python3 benchmarks/suite.py compare [results.json] [--baseline benchmarks/baseline.json] [--threshold 0.2] [--min_change 0.05]
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+from contextlib import redirect_stdout
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+CO2_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-co2')
+BASELINE = os.path.join(REPO, 'benchmarks', 'baseline.json')
+RESULTS = os.path.join(REPO, 'benchmarks', 'results.json')
+
+MIN_REPEAT = 3                  # Fewer repeats than this don't give compare a median worth going by
+
+
+def measure(function, repeat: int) -> dict:
+    """
+    Best and median wall time of function over repeat calls, its output is discarded
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):     # The parsers and print_report write to stdout
+            function()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def quietly(function, *args):
+    """
+    Call one parser, the corpus has files which exit or raise
+    """
+    try:
+        return function(*args)
+    except (Exception, SystemExit):
+        return None
+
+
+def git_commit() -> str:
+    process = subprocess.run(['git', '-C', REPO, 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True)
+    return process.stdout.strip() or 'unknown'
+
+
+def run_suite(options) -> dict:
+    import pandas as pd
+
+    from general_functions import read_summary_header, stream_summary_trace
+    from parse_run_header import ParseRunHeader
+    from parse_run_execution import ParseRunExecution
+    from parse_co2 import Co2Parser
+    from ingest import ingest_files, ingest_co2_files, list_summary_files, list_co2_files
+    from aggregates import ProjectAggregates
+    from process_registry import ProcessRegistry
+    from ingest import RUN_COLUMNS
+    from html_template import html_report
+    import report
+
+    try:
+        import statsmodels
+        trendlines = True
+    except ImportError:
+        trendlines = False
+    specs = report.FIGURE_SPECS
+    if not trendlines:
+        # The OLS trendlines need statsmodels, the figures are timed without them
+        specs = [{k: v for k, v in i.items() if not k.startswith('trendline')} for i in specs]
+
+    files = [i for i in list_summary_files(options.runs) if os.path.getsize(i) > 0]
+    headers, traces = [], []
+    for file in files:
+        with open(file) as handle:
+            headers.append(read_summary_header(handle))
+            traces.append(list(stream_summary_trace(handle)))
+    co2_files = list_co2_files(options.co2)
+
+    registry = ProcessRegistry()
+    with redirect_stdout(io.StringIO()):
+        results = ingest_files(files, registry=registry)
+        co2_index, _ = ingest_co2_files(co2_files)
+    ok = [i for i in results if i['status'] == 'OK']
+
+    data_df = pd.DataFrame([i['row'] + registry.process_row(i) for i in ok], columns=RUN_COLUMNS + registry.process_columns())
+    expanded = report.add_co2_columns(report.expand_process_columns(data_df, registry.names), co2_index)
+    efficiency_df = pd.DataFrame.from_dict({i['uniquename']: i['efficiency'] for i in ok}, orient='index')
+    efficiency = report.efficiency_summary(efficiency_df)
+    outdir = tempfile.mkdtemp(prefix='treeval_bench_') + '/'
+
+    def aggregate():
+        totals = ProjectAggregates()
+        for result in results:
+            totals.add_result(result)
+        totals.summary_text()
+
+    def print_report():
+        # report binds sys.stdout at import, so redirect_stdout doesn't reach it
+        stdout, report.stdout = report.stdout, io.StringIO()
+        try:
+            report.print_report(data_df, [0, 0], efficiency, [], [], False, outdir)
+        finally:
+            report.stdout = stdout
+
+    def co2_parse():
+        for file in co2_files:
+            parsed = Co2Parser(file)
+            for name in Co2Parser.AGGREGATES:
+                getattr(parsed, name)
+
+    stages = {
+        'parse.header'          : lambda: [quietly(ParseRunHeader, i) for i in headers],
+        'parse.execution'       : lambda: [quietly(ParseRunExecution, i) for i in traces],
+        'parse.co2'             : co2_parse,
+        'aggregate.project'     : aggregate,
+        'frame.expand'          : lambda: report.expand_process_columns(data_df, registry.names),
+        'frame.co2_join'        : lambda: report.add_co2_columns(data_df.copy(), co2_index),
+        'png.efficiency'        : lambda: report.plot_efficiency(efficiency_df, outdir),
+        'png.super_module_mem'  : lambda: report.plot_average_mem_of_super_module(expanded, outdir),
+        'png.super_module_cpu'  : lambda: report.plot_average_cpu_of_super_module(expanded, outdir),
+        'report.print'          : print_report,
+        'report.compact_html'   : lambda: report.compact_report('', list(expanded.shape), expanded, specs),
+    }
+
+    groups = report.boxplot_groups(registry.names)
+    stages['png.boxplots'] = lambda: [ report.plot_mem_boxplots(name, 'ALL', expanded, processes, False, outdir)
+                                        for name, processes in groups.items() ]
+
+    for section in dict.fromkeys(i['section'] for i in specs):
+        section_specs = [i for i in specs if i['section'] == section]
+        stages[f"figure.{section}"] = lambda section_specs=section_specs: report.render_figures(expanded, section_specs)
+
+    sections = report.render_figures(expanded, specs)
+    stages['report.cdn_html'] = lambda: html_report('', list(expanded.shape), sections)
+
+    timings = {}
+    try:
+        for name, function in stages.items():
+            if options.only and not any(name.startswith(i) for i in options.only):
+                continue
+            timings[name] = measure(function, options.repeat)
+            print(f"{name:<40} {timings[name]['best']:>9.4f}s")
+    finally:
+        shutil.rmtree(outdir)
+
+    return {    'meta'      : { 'commit'        : git_commit(),
+                                'date'          : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                'python'        : platform.python_version(),
+                                'machine'       : platform.machine(),
+                                'cpus'          : os.cpu_count(),
+                                'files'         : len(files),
+                                'co2_files'     : len(co2_files),
+                                'runs'          : len(ok),
+                                'trendlines'    : trendlines
+                            },
+                'results'   : timings
+            }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_change: float = 0.05) -> int:
+    """
+    Print the change of the median of every stage and return how many got
+    slower than 1 + threshold and by more than min_change seconds
+    """
+    regressions = 0
+    print(f"{'stage (median)':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        if name not in current['results'] or name not in baseline['results']:
+            print(f"{name:<40} {'only in ' + ('baseline' if name in baseline['results'] else 'current'):>30}")
+            continue
+        old = baseline['results'][name]['median']
+        new = current['results'][name]['median']
+        change = new / old - 1 if old else 0
+        flag = ''
+        if change > threshold and new - old > min_change:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{name:<40} {old:>9.4f}s {new:>9.4f}s {change:>+7.0%}{flag}")
+
+    for key in ['commit', 'machine', 'python', 'cpus', 'files', 'trendlines']:
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"note: {key} differs, baseline {baseline['meta'].get(key)} / current {current['meta'].get(key)}")
+    for label, results in [('baseline', baseline), ('current', current)]:
+        repeats = min(i['repeat'] for i in results['results'].values()) if results['results'] else MIN_REPEAT
+        if repeats < MIN_REPEAT:
+            print(f"note: the {label} has stages timed {repeats} times, their medians are noisy below {MIN_REPEAT}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProjectStats benchmark suite")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Time every stage and write the results to JSON")
+    run.add_argument("--runs", default=RUNS_DIR, help="Directory of summary files")
+    run.add_argument("--co2", default=CO2_DIR, help="Directory of co2footprint files")
+    run.add_argument("--repeat", type=int, default=MIN_REPEAT, help=f"Repeats per stage, at least {MIN_REPEAT}, compare goes by their median")
+    run.add_argument("--only", nargs='*', help="Only run stages starting with these names, e.g. parse figure.")
+    run.add_argument("--output", default=RESULTS, help="Where to write the results")
+
+    check = subparsers.add_parser('compare', help="Compare results against a baseline")
+    check.add_argument("current", nargs='?', default=RESULTS, help="Results JSON to check")
+    check.add_argument("--baseline", default=BASELINE, help="Baseline results JSON")
+    check.add_argument("--threshold", type=float, default=0.2, help="Allowed slow down per stage (0.2 = 20%%)")
+    check.add_argument("--min_change", type=float, default=0.05, help="Seconds a stage must also slow down by to be flagged, so timer noise on the fastest stages isn't")
+
+    options = parser.parse_args()
+
+    if options.command == 'run':
+        if options.repeat < MIN_REPEAT:
+            sys.exit(f"--repeat must be at least {MIN_REPEAT}, compare goes by the median of the repeats")
+        results = run_suite(options)
+        with open(options.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"written to {options.output}")
+    else:
+        if not os.path.isfile(options.baseline):
+            sys.exit(f"No baseline at {options.baseline}, write one with: python3 benchmarks/suite.py run --output {options.baseline}")
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        with open(options.current) as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, options.threshold, options.min_change)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,27 @@
 # %%
 # Python imports
+# pandas and the plotting libraries are imported in main() only when the
+# full report is made, so --help, --version and --stats_only start quickly
 import os
+import json
 import argparse
-import plotly.express as px
-import plotly
-import pandas as pd
-from itertools import count
+import cProfile
+import sys
 from sys import stdout
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
-import matplotlib.transforms as transforms
 import time
-import seaborn as sns
-import warnings
-
-warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 # TreeVal imports
-from parse_run import RunParser
+from ingest import ingest_files, ingest_co2_files, list_co2_files, RUN_COLUMNS, RUN_EXCLUDE, PARSER_VERSION
+from scanner import scan_sources
+from parse_cache import ParseCache
+from export import write_long_table
+from watch import watch_directory, write_atomic
+from aggregates import ProjectAggregates, PERCENTILES
+from stage_profile import StageProfiler
+from recommend import ResourceRecommender, PREDICTORS
+from dedup import SKIPPED
+from process_registry import ProcessRegistry
 from html_template import html_report
-from master_list import master_list, subworkflows
 
 DOCSTRING = f"""
 {'-'*60}
@@ -59,15 +60,6 @@ Usage:
 python3 src/treeval/scripts/ProjectStats.py ./treeval-summary-files/1-1-0/
 
 """
-class Colours:
-    HEADER  = '\033[95m'
-    BLUE    = '\033[94m'
-    GREEN   = '\033[92m'
-    YELLOW  = '\033[93m'
-    RED     = '\033[91m'
-    END     = '\033[0m'
-
-
 def get_command_args(args=None):
     parser = argparse.ArgumentParser(
         prog="ProjectStats (Python 3)", description=DOCSTRING, formatter_class=argparse.RawDescriptionHelpFormatter
@@ -79,359 +71,122 @@ def get_command_args(args=None):
 
     parser.add_argument("-o", "--output", action="store", help="Output directory location", default="./StatGraphs/", type=str)
 
-    parser.add_argument("-v", "--version", action="version", version="v1.0.0")
-
-    parser.add_argument("--verbose", action="store", type=bool, default=False, help="Verbosity, do you want more information on the run?")
+    parser.add_argument("--recursive", action="store_true", help="Also read the summary (and co2footprint) files in subdirectories of DIR (and --co2footprint)")
 
-    parser.add_argument("--no_graphs", action="store", type=bool, default=True, help="For debugging, do not generate graphs!")
+    parser.add_argument("--include", action="store", nargs='+', default=['*'], help="Globs of the summary file names to read, e.g. 'TreeVal_run_*'")
 
-    options = parser.parse_args(args)
-    return options
+    parser.add_argument("--exclude", action="store", nargs='+', default=RUN_EXCLUDE, help="Globs of the file names to skip, co2footprint files by default")
 
+    parser.add_argument("-j", "--jobs", action="store", type=int, default=1, help="Number of processes used to parse the summary files")
 
-def subset_dataframe(data_df: pd.DataFrame, ticket: list):
-    if len(ticket) > 0:
-        df = data_df[data_df["Ticket"].isin(ticket)]
-    else:
-        df = data_df
-    return df
+    parser.add_argument("--cache", action="store", type=str, help="Directory for the parse cache, only new or changed files are parsed when set")
 
+    parser.add_argument("--cache_key", action="store", choices=['stat', 'content'], default='stat', help="Identify unchanged files by path/size/mtime (stat) or by a hash of their contents")
 
-def graph_efficiency(data: pd.DataFrame):
-    data.index.name = 'Org'
-    mean = np.nanmean(data['MEM_EFF'])
+    parser.add_argument("--cache_max_mb", action="store", type=int, default=512, help="Size cap for the parse cache, least recently used entries are removed")
 
-    data = data.reset_index()
-    for k, v in {'MEM':1000, 'CPU': 50}.items():
-        data.plot(kind='scatter', x='Org', y=f'{k}_EFF')
-        plt.axhline(y=np.nanmean(data[f'{k}_EFF']), linestyle='--', color='red', label='Avg')
-        plt.axhline(y=100, linestyle='solid', color='black', label='AIM')
-        plt.yticks(np.arange(0, max(data[f'{k}_EFF']), v))
+    parser.add_argument("--clear_cache", action="store_true", help="Empty the parse cache before running")
 
-        value = ( '' if k == 'CPU' else 'PEAK ')
+    parser.add_argument("--keep_duplicates", action="store_true", help="Count summary files with the same Pipeline_session and resources block as another file too, instead of leaving them out")
 
-        plt.ylabel(f'{k} (%)')
-        plt.title(f"REQUESTED {k} AS % MORE THAN {value}USAGE")
+    parser.add_argument("--latest_per_sample", action="store_true", help="Only count the last completed run of each sample and entry point, earlier runs and retries are skipped (not in --watch mode)")
 
-        plt.xticks(rotation=90)
-        plt.savefig(f'Efficiency_{k}.png')
-        plt.clf()
+    parser.add_argument("--registry", action="store", type=str, help="JSON file of the process registry: every process name seen so far (with its id) and per version aliases, updated with new processes after each run")
 
-    return [
-            f"CPU min/max {round(min(data['CPU_EFF']), 2)}% / {round(max(data['CPU_EFF']), 2)}%",
-            f"MEM min/max {round(min(data['MEM_EFF']), 2)}% / {round(max(data['MEM_EFF']), 2)}%"
-            ]
+    parser.add_argument("--export", action="store", type=str, help="Write a long per run x process table to this .parquet or .arrow file")
 
+    parser.add_argument("--watch", action="store_true", help="Keep polling DIR and refresh StatsSummary.txt and ProcessSummary.tsv as new runs land")
 
-def plot_hic_size_vs_mem(data_df: pd.DataFrame):
+    parser.add_argument("--interval", action="store", type=float, default=60, help="Seconds between polls in --watch mode")
 
-    subset_df = data_df[['Unique_name', 'Clade', 'Entry_Point', 'Fasta_(mb)', 'HIC_CONTAINERS', 'HiC_(TOTAL_GB)', 'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_PEAK_MEMORY', 'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY']]
-    subset_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY'] =     subset_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY'] / 1000
-    fig = px.scatter(subset_df, x='HiC_(TOTAL_GB)', y='HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY',
-                color = 'Clade', height=400, hover_data=['Unique_name'], trendline="ols",
-                trendline_options=dict(log_x=True), #trendline_scope="overall", #trendline_color_override="black",
-                title = 'Size of HIC data (GB) against Peak memory for Super Module - ALL'
-            )
+    parser.add_argument("--stats_only", action="store", nargs='?', const='text', choices=['text', 'json'], help="Only write the summary stats (StatsSummary.txt or StatsSummary.json), without pandas or any graphs")
 
+    parser.add_argument("--percentiles", action="store", nargs='+', type=float, default=PERCENTILES, help="Per task percentiles of realtime, peak_rss and %%cpu written per process, clade and entry point to QuantileSummary.tsv (and StatsSummary.json)")
 
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-    return graph_ALL
-
-
-def generate_genome_vs_runtime(data_df: pd.DataFrame):
-    fig = px.scatter(data_df, x='Duration_(Hrs)', y='Fasta_(mb)',
-                    height=400,
-                    color='Clade', hover_data=['Unique_name'], trendline="ols",
-                    trendline_options=dict(log_x=True), #trendline_scope="overall", #trendline_color_override="black",
-                    title = 'Size of Genome (MB) against runtime (Hours) - ALL',
-                    labels = { 'Fasta_(mb)' : 'Fasta Size (MB)',
-                                'Duration_(Hrs)' : 'Runtime (Hours)',
-                                'Clade' : 'Clade'})
-
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'FULL'], x='Duration_(Hrs)', y='Fasta_(mb)',
-                    height=400,
-                    color='Clade', hover_data=['Unique_name'], trendline="ols",
-                    trendline_options=dict(log_x=True), #trendline_scope="overall", #trendline_color_override="black",
-                    title = 'Size of Genome (MB) against runtime (Hours) - FULL',
-                    labels = { 'Fasta_(mb)' : 'Fasta Size (MB)',
-                                'Duration_(Hrs)' : 'Runtime (Hours)',
-                                'Clade' : 'Clade'})
-
-    graph_FULL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'RAPID'], x='Duration_(Hrs)', y='Fasta_(mb)',
-                    height=400,
-                    color='Clade', hover_data=['Unique_name'], trendline="ols",
-                    trendline_options=dict(log_x=True), #trendline_scope="overall", #trendline_color_override="black",
-                    title = 'Size of Genome (MB) against runtime (Hours) - RAPID',
-                    labels = { 'Fasta_(mb)' : 'Fasta Size (MB)',
-                                'Duration_(Hrs)' : 'Runtime (Hours)',
-                                'Clade' : 'Clade'})
-
-    graph_RAPID = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    return graph_ALL, graph_FULL, graph_RAPID
-
-
-def generate_clade_vs_runtime(data_df: pd.DataFrame):
-    fig = px.scatter(data_df, y="Duration_(Hrs)", x="Clade", color="Clade",
-                    title = 'Clade group against Runtime (Hours) - ALL',
-                    height=400)
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'FULL'], y="Duration_(Hrs)", x="Clade", color="Clade",
-                    title = 'Clade group against Runtime (Hours) - FULL',
-                    height=400)
-    graph_FULL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'RAPID'], y="Duration_(Hrs)", x="Clade", color="Clade",
-                    title = 'Clade group against Runtime (Hours) - RAPID',
-                    height=400)
-    graph_RAPID = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    return graph_ALL, graph_FULL, graph_RAPID
+    parser.add_argument("--recommend", action="store_true", help="Propose per process cpus / memory from the runs seen, written to resources.config (Nextflow withName blocks) and ResourceSavings.tsv")
 
+    parser.add_argument("--margin", action="store", type=float, default=0.2, help="Safety margin added to the --recommend cpus and memory (0.2 = 20%%)")
 
-def generate_family_vs_runtime(data_df: pd.DataFrame):
-    fig = px.scatter(data_df, y="Duration_(Hrs)", x="Prefix", color="Clade",
-                    title = 'Clade group against Runtime (Hours) - ALL',
-                    height=400)
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'FULL'], y="Duration_(Hrs)", x="Prefix", color="Clade",
-                    title = 'Clade group against Runtime (Hours) - FULL',
-                    height=400)
-    graph_FULL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'RAPID'], y="Duration_(Hrs)", x="Prefix", color="Clade",
-                    title = 'Clade group against Runtime (Hours) - RAPID',
-                    height=400)
-    graph_RAPID = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    return graph_ALL, graph_FULL, graph_RAPID
-
-
-def generate_longread_vs_runtime(data_df: pd.DataFrame):
-    fig = px.scatter(data_df, x='Duration_(Hrs)', y='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    trendline="ols", trendline_options=dict(log_x=True),
-                    trendline_scope="overall", trendline_color_override="black",
-                    title = 'Total PacBio data against runtime (Hours) - ALL',
-                    height=400)
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'FULL'], x='Duration_(Hrs)', y='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    trendline="ols", trendline_options=dict(log_x=True),
-                    trendline_scope="overall", trendline_color_override="black",
-                    title = 'Total PacBio data against runtime (Hours) - FULL',
-                    height=400)
-    graph_FULL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'RAPID'], x='Duration_(Hrs)', y='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    trendline="ols", trendline_options=dict(log_x=True),
-                    trendline_scope="overall", trendline_color_override="black",
-                    title = 'Total PacBio data against runtime (Hours) - RAPID',
-                    height=400)
-    graph_RAPID = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    return graph_ALL, graph_FULL, graph_RAPID
-
-
-def generate_hic_vs_runtime(data_df: pd.DataFrame):
-    fig = px.scatter(data_df, x='Duration_(Hrs)', y='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    trendline_options=dict(log_x=True), trendline_scope="overall", trendline_color_override="black",
-                    title = 'Total amount of CRAM data against runtime (Hours) - ALL',
-                    height=400)
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'FULL'], x='Duration_(Hrs)', y='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    trendline_options=dict(log_x=True), trendline_scope="overall", trendline_color_override="black",
-                    title = 'Total amount of CRAM data against runtime (Hours) - FULL',
-                    height=400)
-    graph_FULL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    fig = px.scatter(data_df[data_df['Entry_Point'] == 'RAPID'], x='Duration_(Hrs)', y='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'], trendline="ols",
-                    trendline_options=dict(log_x=True), trendline_scope="overall", trendline_color_override="black",
-                    title = 'Total amount of CRAM data against runtime (Hours) - RAPID',
-                    height=400)
-    graph_RAPID = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    return graph_ALL, graph_FULL, graph_RAPID
-
-
-def generate_3d_graphs(data_df: pd.DataFrame):
-    fig = px.scatter_3d(data_df, x='Duration_(Hrs)', y='Fasta_(mb)', z='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    title = 'Size of Genome (MB) against runtime (Hours) - ALL',
-                    height=1000)
-    graph_ALL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-
-    fig = px.scatter_3d(data_df[data_df['Entry_Point'] == 'FULL'], x='Duration_(Hrs)', y='Fasta_(mb)', z='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    title = 'Size of Genome (MB) against runtime (Hours) - FULL',
-                    height=1000)
-    graph_FULL = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-
-    fig = px.scatter_3d(data_df[data_df['Entry_Point'] == 'RAPID'], x='Duration_(Hrs)', y='Fasta_(mb)', z='HiC_(TOTAL_GB)',
-                    color='Clade', hover_data=['Prefix'],
-                    title = 'Size of Genome (MB) against runtime (Hours) - RAPID',
-                    height=1000)
-    graph_RAPID = plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
-
-    return graph_ALL, graph_FULL, graph_RAPID
-
-
-def plot_average_mem_of_super_module(data_df: pd.DataFrame):
-    # TODO: function needs generalising
-    mean = np.nanmean(data_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_PEAK_MEMORY'])
-
-    colormap = plt.cm.bwr #or any other colormap
-    plt.scatter(x = data_df['Unique_name'],
-                y = data_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_P_MEM'],
-                c = data_df['Fasta_(mb)'],
-                cmap = colormap,
-                norm=matplotlib.colors.LogNorm())
-    plt.colorbar()
-    plt.title("\n".join('HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_P_MEM'.split(':')))
-    plt.ylabel('Memory Utilisation (%)')
-    plt.ylim(0,110)
-
-    ax2 = plt.twinx()
-    ax2.set(ylim=(0,110))
-
-    ax2.scatter(x = data_df['Unique_name'],
-                y = data_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_PEAK_MEMORY']
-    )
-    plt.axhline(y=np.nanmean(data_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_PEAK_MEMORY']), linestyle='--', color='red', label='Avg')
+    parser.add_argument("--min_runs", action="store", type=int, default=5, help="Only recommend resources for processes seen in at least this many runs")
 
-    trans = transforms.blended_transform_factory(
-                ax2.get_yticklabels()[0].get_transform(), ax2.transData
-        )
+    parser.add_argument("--predictors", action="store", type=str, help="JSON file of {run size: Groovy expression} for --recommend, e.g. {\"Fasta_(mb)\": \"reference.size() / 1e6\"}. Memory is fitted against these sizes and written as closures on the expressions, without it every request is a constant")
 
-    ax2.text(0,mean, "{:.0f}".format(mean), color="red", transform=trans,
-        ha="right", va="center")
+    parser.add_argument("--html_mode", action="store", choices=['cdn', 'compact'], default='cdn', help="cdn: one plotly div per figure, plotly.js and bootstrap from CDNs. compact: self contained, plotly.js inlined once and figures built in the browser from one shared copy of the data")
 
-    plt.savefig('HIC_super_module_average_mem.png')
+    parser.add_argument("--html_compress", action="store_true", help="gzip the shared data of a compact HTML report")
 
-    plt.clf()
+    parser.add_argument("--profile", action="store", nargs='?', const='rss', choices=['rss', 'tracemalloc'], help="Record wall time, CPU time and memory per stage and the slowest files to ProfileSummary.json, figures are then drawn one at a time. tracemalloc also traces the peak Python memory of each stage but slows the run down")
 
+    parser.add_argument("--profile_top", action="store", type=int, default=10, help="Number of slowest input files listed by --profile")
 
-def plot_average_cpu_of_super_module(data_df: pd.DataFrame):
-    colormap = plt.cm.bwr #or any other colormap
-    plt.scatter(x = data_df['Unique_name'],
-                y = data_df['HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_P_CPU'],
-                c = data_df['Fasta_(mb)'],
-                cmap = colormap,
-                norm=matplotlib.colors.LogNorm())
-    plt.colorbar()
-    plt.title("\n".join('HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-AVERAGE_P_CPU'.split(':')))
-    plt.ylabel('CPU Utilisation (%)')
-    plt.ylim(0,1600)
+    parser.add_argument("--profile_dump", action="store", type=str, help="Write cProfile stats of the whole run to this file (read with pstats or snakeviz)")
 
-    plt.savefig('HIC_super_module_average_cpu.png')
-    plt.clf()
+    parser.add_argument("-v", "--version", action="version", version="v1.0.0")
 
+    parser.add_argument("--verbose", action="store", type=bool, default=False, help="Verbosity, do you want more information on the run?")
 
-def generate_new_column_names(column_names):
-    return ["CRAM_SUPER_MODULE" if i.split(':')[1].startswith('CRAM') else 'Unique_name' if i == 'Unique_name' else i.split(':')[1].split('-')[0] for i in column_names]
+    parser.add_argument("--no_graphs", action="store", type=bool, default=True, help="For debugging, do not generate graphs!")
 
+    options = parser.parse_args(args)
+    return options
 
-def plot_mem_boxplots(name: str, entry: str, data_df: pd.DataFrame, list_of_processes: list, verbose: bool, outdir: str):
 
-    if entry == 'ALL':
-        pass
+def write_stats_only(results: list, broken_co2: list, output_format: str, outdir: str, percentiles: list = PERCENTILES, registry: ProcessRegistry = None) -> str:
+    """
+    The summary stats straight from the parse results, through the same
+    ProjectAggregates as --watch rather than a DataFrame, plus the per task
+    percentiles in QuantileSummary.tsv
+    """
+    totals = ProjectAggregates(registry)
+    for result in results:
+        totals.add_result(result)
+    totals.broken += broken_co2
+
+    if output_format == 'json':
+        output = json.dumps(totals.to_dict(percentiles), indent=2) + '\n'
+        path = os.path.join(outdir, 'StatsSummary.json')
     else:
-        data_df = data_df[data_df['Entry_Point'] == entry]
-
-    # GENERATE LISTS FOR: 1) WHAT WE WANT IT CALLED, 2) WHAT FIRST DATASET IS CURRENTLY CALLED, 3) WHAT SECOND DATASET IS CURRENTLY CALLED
-    processes       = ["CRAM_SUPER_MODULE" if i.split(':')[1].startswith('CRAM') else i.split(':')[1] for i in list_of_processes]
-    processes_mem   = [i + "-AVERAGE_P_MEM" for i in list_of_processes]
-    processes_peak  = [i + "-AVERAGE_PEAK_MEMORY" for i in list_of_processes]
-
-    data_df_P_mem   = data_df[processes_mem].copy()
-    data_df_P_mem.columns = generate_new_column_names(data_df_P_mem.columns)
-
-    data_df_P_peak = data_df[processes_peak]
-    data_df_P_peak.columns = generate_new_column_names(data_df_P_peak.columns)
-
-    data_df_P_peak = data_df_P_peak.iloc[:, :]  # Drops the unique name column otherwise plots per name and breaks max()
-    max_values = data_df_P_peak.max()           # Get the max value per process
-    peak = pd.DataFrame(max_values)             # Make dataframe max()
-    if verbose:
-        print(f"---\n\n>>> {name}_{entry}")
-        print(peak)
-
-    # Actually generates the graph
-    sns.set(rc = {'figure.figsize':(25,25)})
-    fig = sns.boxplot(data=data_df_P_mem, legend=False)
-    fig.set(ylim=(0,110))
-    ax2 = plt.twinx()
-    ax2.set(ylim=(0,110))
-    sns.scatterplot(data=peak, color='red', ax=ax2, legend=False)
-    fig.set_xticks(processes)
-    fig.set_xticklabels(processes, rotation=90, fontsize=6)
-    fig.set_xlabel("Ticket", fontsize=6)
-    plt.subplots_adjust(bottom=0.4)
-
-    box = fig.get_figure()
-
-    box.savefig(f"{outdir}mem_for_{name}_{entry}.png")
-    plt.clf()                                   # Clear plot
-
-
-def print_report(data_df: pd.DataFrame, time: list, efficiency: list, empties: list, verbose: bool, outdir: str):
-    breaker = f"{'-'*50}\n"
-
-    output_list = breaker + "TreeVal Project Summary Stats! \n" + breaker + f"Total data points: {len(data_df)}\n" + breaker + f"Unique CLADE count:\n{data_df['Clade'].value_counts()}\n" + breaker + f"Run Type Count:\n{data_df['Entry_Point'].value_counts()}\n" + breaker + f"Ticket Type Count:\n{data_df['Ticket'].value_counts()}\n" + breaker + '\n'.join(efficiency) + breaker
-
-    if verbose:
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"{Colours.BLUE}TreeVal{Colours.END}{Colours.RED}Project{Colours.END}.{Colours.GREEN}Summary{Colours.END} {Colours.YELLOW}Stats{Colours.END}!\n")
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"Total data points: {len(data_df)} \n")
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"Unique CLADE count:\n{data_df['Clade'].value_counts()}\n")
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"Run Type Count:\n{data_df['Entry_Point'].value_counts()}\n")
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"Ticket Type Count:\n{data_df['Ticket'].value_counts()}\n")
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"Efficiency across all runs:\n")
-        for i in efficiency:
-            stdout.write(f"{i}\n")
-        if len(empties) >= 1:
-            [stdout.write(f"Empty Files!:\n{i}\n") for i in empties]
-            stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-
-    if not verbose:
-        with open(f"{outdir}StatsSummary.txt", 'w') as file:
-            file.write(output_list)
-
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-        stdout.write(f"""{Colours.BLUE}TreeVal{Colours.END}{Colours.RED}Project{Colours.END}.{Colours.GREEN}Summary{Colours.END} {Colours.YELLOW}Stats{Colours.END}!
-ALL DONE!!
-I took: {round(time[1] - time[0], 2)} Seconds!
-
-Now some efficiency for everything so far:
-{efficiency}
-
-""")
-        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
-    return output_list
+        output = totals.summary_text()
+        path = os.path.join(outdir, 'StatsSummary.txt')
+
+    write_atomic(path, output)
+    write_atomic(os.path.join(outdir, 'QuantileSummary.tsv'), totals.quantile_table(percentiles))
+    stdout.write(output)
+    return output
+
+
+def load_predictors(path: str) -> dict:
+    """
+    {run size: Groovy expression} from the --predictors JSON file, {} without one
+    """
+    if not path:
+        return {}
+    with open(path) as file:
+        expressions = json.load(file)
+    unknown = sorted(set(expressions) - set(PREDICTORS))
+    if unknown:
+        sys.exit(f"Unknown --predictors {', '.join(unknown)}, expected any of {', '.join(PREDICTORS)}")
+    return expressions
+
+
+def write_recommendations(results: list, outdir: str, margin: float, min_runs: int, expressions: dict = None) -> str:
+    """
+    The --recommend config fragment and projected savings of the parse results
+    """
+    recommender = ResourceRecommender(margin=margin, min_runs=min_runs, expressions=expressions)
+    for result in results:
+        recommender.add_result(result)
+    models = recommender.recommend()
+    savings = recommender.savings(models)
+
+    write_atomic(os.path.join(outdir, 'resources.config'), recommender.config_text(models))
+    write_atomic(os.path.join(outdir, 'ResourceSavings.tsv'), recommender.savings_table(models, savings))
+    output = recommender.summary_text(models, savings)
+    stdout.write(output)
+    return output
 
-def main():
-    start = time.time()
 
+def main():
     options = get_command_args()
     if options.output[-1] != '/':
         outdir = options.output +'/'
@@ -441,130 +196,155 @@ def main():
     if not os.path.exists(outdir):
         os.makedirs(outdir)
 
+    profiler = StageProfiler(bool(options.profile), top=options.profile_top, memory=options.profile)
+    profile_dump = cProfile.Profile() if options.profile_dump else None
+    if profile_dump:
+        profile_dump.enable()
+    try:
+        run_project(options, outdir, profiler)
+    finally:
+        if profile_dump:
+            profile_dump.disable()
+            profile_dump.dump_stats(options.profile_dump)
+        if options.profile:
+            profiler.write(os.path.join(outdir, 'ProfileSummary.json'))
+            stdout.write(profiler.summary_text())
+
+
+def run_project(options: argparse.Namespace, outdir: str, profiler: StageProfiler):
+    start = time.time()
+
     list_of_lists = []
     empty_files = []
+    broken_files = []
+    skipped_files = []
     efficiency_data = {}
-
-    for file in os.listdir(options.DIR):
-        if os.stat(options.DIR + file).st_size == 0:
-            empty_files.append(file)
-            pass
+    registry = ProcessRegistry.load(options.registry)
+
+    cache = None
+    if options.cache:
+        cache = ParseCache(options.cache, PARSER_VERSION, key_mode=options.cache_key, max_bytes=options.cache_max_mb * 1024 * 1024)
+        if options.clear_cache:
+            cache.clear()
+
+    if options.watch:
+        if options.latest_per_sample:
+            sys.exit("--latest_per_sample needs every run of a sample at once, it can't be used with --watch")
+        watch_directory(options.DIR, outdir, interval=options.interval, jobs=options.jobs, cache=cache, percentiles=options.percentiles, registry=registry, registry_path=options.registry, dedupe=not options.keep_duplicates,
+                        include=options.include, exclude=options.exclude, recursive=options.recursive)
+        return
+
+    with profiler.stage('parse'):
+        # Files go to the workers as they are found, so the directory scan overlaps with the parsing
+        sources = scan_sources(options.DIR, options.include, options.exclude, options.recursive)
+        results = ingest_files( sources, jobs=options.jobs, cache=cache, profile=bool(options.profile), registry=registry,
+                                dedupe=not options.keep_duplicates, latest_per_sample=options.latest_per_sample )
+    profiler.add_files(results)
+    if options.registry:
+        registry.save(options.registry)
+
+    if options.export:
+        with profiler.stage('export'):
+            write_long_table(results, options.export)
+
+    co2_index = {}
+    broken_co2 = []
+    if options.co2footprint:
+        with profiler.stage('co2'):
+            co2_index, broken_co2 = ingest_co2_files(list_co2_files(options.co2footprint, options.recursive), jobs=options.jobs)
+        broken_files += broken_co2
+
+    if options.recommend:
+        with profiler.stage('recommend'):
+            write_recommendations(results, outdir, options.margin, options.min_runs, load_predictors(options.predictors))
+
+    if options.stats_only:
+        with profiler.stage('stats'):
+            write_stats_only(results, broken_co2, options.stats_only, outdir, options.percentiles, registry)
+        return
+
+    with profiler.stage('import'):
+        import pandas as pd
+        from report import (    subset_dataframe, expand_process_columns, add_co2_columns, efficiency_summary,
+                                render_pngs, render_figures, compact_report, print_report, FIGURE_SPECS
+                            )
+
+    for result in results:
+        if result['status'] == 'EMPTY':
+            empty_files.append(result['file'])
+        elif result['status'] == 'BROKEN':
+            broken_files.append(f"{result['file']} | {result['error']}")
+        elif result['status'] in SKIPPED:
+            skipped_files.append(f"{result['file']} | {result['status']} of {result.get('duplicate_of') or result.get('superseded_by')}")
         else:
-            usable_data = options.DIR + file
-            data = RunParser(usable_data)
-
-            efficiency_data[data.uniquename] = { 'MEM_EFF': data.execution.efficiency['MEM_EFFICIENCY']['MEM_RUN_EFF'], 'CPU_EFF': data.execution.efficiency['CPU_EFFICIENCY']['CPU_RUN_EFF']}
-            # print(data.execution.list_of_list) # | Execution log data
-            # print(data.execution.headers)      # | Execution log headers
-            data_list = [   data.uniquename, data.header_block.entrypnt,
-                            data.header_block.version,data.header_block.duration.get('h'),
-                            data.header_block.genome_clade,data.id,
-                            data.fasta_mb,data.header_block.genome_ticket,
-                            data.pacbio_avg,data.header_block.cram_containers,
-                            data.cram_avg,
-                            data.header_block.pacbio_totaldata, data.header_block.cram_totaldata
-                        ]
-            data_and_execution = data_list + data.execution.list_of_list
-
-            df_columns = [  'Unique_name', 'Entry_Point',
-                            'Pipeline_Version', 'Duration_(Hrs)',
-                            'Clade', 'Prefix',
-                            'Fasta_(mb)', 'Ticket',
-                            'Longread_(AVG_GB)', 'HIC_CONTAINERS', 'HiC_(AVG_GB)',
-                            'Longread_(TOTAL_GB)', 'HiC_(TOTAL_GB)'
-                        ]
-
-            df_columns += data.execution.headers # Adds execution log headers to the columns list
-
-            list_of_lists.append(
-                                    data_and_execution
-                                )
+            efficiency_data[result['uniquename']] = result['efficiency']
+            list_of_lists.append(result['row'] + registry.process_row(result))
 
             # collect data.execution.master_dict and get totals.
 
-    efficiency_df = pd.DataFrame.from_dict(
-                                efficiency_data,
-                                orient = 'index'
-    )
-    efficiency_info = graph_efficiency(efficiency_df)
+    with profiler.stage('dataframe.efficiency'):
+        efficiency_df = pd.DataFrame.from_dict(
+                                    efficiency_data,
+                                    orient = 'index'
+        )
+        efficiency_info = efficiency_summary(efficiency_df)
 
 
     if options.no_graphs:
-        header_df = pd.DataFrame(
-                                list_of_lists,
-                                columns = df_columns
-                                )
-
-        subset_df = subset_dataframe(header_df, ticket = [])
-
-        #
-        # THE PROCESS DATA IS IN LIST FORMAT ORGANISED AS: [ avg_cpu, avg_mem, avg_realtime, avg_pcpu, avg_pmem, avg_peak ]
-        # FOR GRAPHING THIS NEEDS SPLITTING OUT INTO COLUMNS
-        # DOING IT LIKE THIS IS NOT GOOD FOR PERFORMANCE HENCE THE WARNING FILTER ON LINE 17
-        #
-        for i in master_list:
-            subset_df[[f'{i}-AVERAGE_CPU', f'{i}-AVERAGE_MEMORY', f'{i}-TOTAL_MEMORY', f'{i}-AVERAGE_REALTIME', f'{i}-AVERAGE_P_CPU', f'{i}-AVERAGE_P_MEM', f'{i}-AVERAGE_PEAK_MEMORY', f'{i}-TOTAL_PEAK_MEMORY']] = pd.DataFrame(subset_df[f'{i}'].to_list(), index = subset_df.index)
-            subset_df.replace('NA', np.nan, inplace=True)
-            subset_df[[f'{i}-AVERAGE_CPU', f'{i}-AVERAGE_MEMORY', f'{i}-TOTAL_MEMORY', f'{i}-AVERAGE_REALTIME', f'{i}-AVERAGE_P_CPU', f'{i}-AVERAGE_P_MEM', f'{i}-AVERAGE_PEAK_MEMORY', f'{i}-TOTAL_PEAK_MEMORY']].astype(float)
-
-        subset_df.replace('NA', None) # str 'NA' as you'd expect, causes issues when comparing against int/float
-
-        # TODO: Need generalising much like boxplots
+        with profiler.stage('dataframe.runs'):
+            header_df = pd.DataFrame(
+                                    list_of_lists,
+                                    columns = RUN_COLUMNS + registry.process_columns()
+                                    )
 
-        a0 = plot_hic_size_vs_mem(subset_df)
+            if options.co2footprint:
+                header_df = add_co2_columns(header_df, co2_index)
 
-        plot_average_mem_of_super_module(subset_df)
+            subset_df = subset_dataframe(header_df, ticket = [])
 
-        plot_average_cpu_of_super_module(subset_df)
+            subset_df = expand_process_columns(subset_df, registry.names)
 
-        """ for subworkflow_name in subworkflows:
-            # Skipping gene alignment at the minute due to subworkflows inside the subworkflow causing over collapsing of data
-            # In this case it will generate a graph containing data for RNA, CDS, CDNA and PEP which are themselves subworkflows
-            # This also means that other sub-subworkflows will be effected
-            if subworkflow_name not in ['GENE_ALIGNMENT', 'CUSTOM_DUMPSOFTWAREVERSIONS']:
-                subworkflow_processes = [i + "" for i in master_list if i.startswith(subworkflow_name)]
-                for x in ['FULL', 'RAPID', 'ALL']:
-                    plot_mem_boxplots(
-                        name = subworkflow_name,
-                        entry = x,
-                        data_df = subset_df,
-                        list_of_processes = subworkflow_processes,
-                        verbose = options.verbose,
-                        outdir = outdir
-                    ) """
+        with profiler.stage('png'):
+            render_pngs(subset_df, efficiency_df, outdir, jobs=options.jobs, verbose=options.verbose)
 
-
-        a1, a2, a3 = generate_genome_vs_runtime(subset_df)
-
-        b1, b2, b3 = generate_clade_vs_runtime(subset_df)
-
-        c1, c2, c3 = generate_family_vs_runtime(subset_df)
-
-        d1, d2, d3 = generate_longread_vs_runtime(subset_df)
-
-        e1, e2, e3 = generate_hic_vs_runtime(subset_df)
-
-        f1, f2, f3 = generate_3d_graphs(subset_df)
+        if options.html_mode == 'cdn' and profiler.enabled:
+            # One spec at a time so each figure gets its own stage
+            sections = {}
+            for spec in FIGURE_SPECS:
+                with profiler.stage(f"figure.{spec['section']}"):
+                    for section, divs in render_figures(subset_df, [spec]).items():
+                        sections.setdefault(section, []).extend(divs)
+        elif options.html_mode == 'cdn':
+            sections = render_figures(subset_df, jobs=options.jobs)
 
         end = time.time()
-        cli = print_report(
-            data_df     = header_df,
-            time        = [start, end],
-            efficiency  = efficiency_info,
-            empties     = empty_files,
-            verbose     = options.verbose,
-            outdir      = outdir
-        )
+        with profiler.stage('report'):
+            cli = print_report(
+                data_df     = header_df,
+                time        = [start, end],
+                efficiency  = efficiency_info,
+                empties     = empty_files,
+                broken      = broken_files,
+                skipped     = skipped_files,
+                verbose     = options.verbose,
+                outdir      = outdir
+            )
     else:
         end = time.time()
         stdout.write(f"TreeVal Summary Stats Completed in: {round(end - start, 2)}")
 
     shape = [subset_df.shape[0], subset_df.shape[1]]
 
-    with open('TreeValSummary.html', 'w') as file:
-        file.write(
-            html_report(cli, shape, [a0, a1, a2, a3, b1, b2, b3, c1, c2, c3, d1, d2, d3, e1, e2, e3, f1, f2, f3])
-        )
+    with profiler.stage('html'):
+        with open('TreeValSummary.html', 'w') as file:
+            if options.html_mode == 'compact':
+                file.write(
+                    compact_report(cli, shape, subset_df, compress=options.html_compress)
+                )
+            else:
+                file.write(
+                    html_report(cli, shape, sections)
+                )
 
 
 if __name__ == "__main__":
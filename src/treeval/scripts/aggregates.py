@@ -0,0 +1,262 @@
+import math
+from collections import Counter
+
+from ingest import PROCESS_METRICS, TASK_METRICS
+from sketch import QuantileSketch
+from process_registry import ProcessRegistry
+from dedup import SKIPPED
+
+# Percentiles reported per process / clade / entry point unless others are asked for
+PERCENTILES = [50, 90, 99]
+
+
+class RunningStats:
+    """
+    Count, mean, variance, min and max of a stream of values without keeping them.
+    Uses Welford's update for single values and Chan's formula to merge two
+    accumulators, so partial results from workers or earlier polls can be combined.
+    """
+
+    def __init__(self):
+        self.count  = 0
+        self.mean   = 0.0
+        self.m2     = 0.0
+        self.min    = math.inf
+        self.max    = -math.inf
+
+
+    def add(self, value: float):
+        if value is None or math.isnan(value):
+            return
+        self.count  += 1
+        delta       = value - self.mean
+        self.mean   += delta / self.count
+        self.m2     += delta * (value - self.mean)
+        self.min    = min(self.min, value)
+        self.max    = max(self.max, value)
+
+
+    def merge(self, other: 'RunningStats'):
+        if other.count == 0:
+            return
+        total       = self.count + other.count
+        delta       = other.mean - self.mean
+        self.mean   += delta * other.count / total
+        self.m2     += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count  = total
+        self.min    = min(self.min, other.min)
+        self.max    = max(self.max, other.max)
+
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'mean': self.mean, 'variance': self.variance, 'min': self.min, 'max': self.max}
+
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(count={self.count}, mean={self.mean}, variance={self.variance}, max={self.max})"
+
+
+class ProjectAggregates:
+    """
+    Running totals of everything print_report shows, plus per process
+    statistics, built up one parse_summary_file result at a time.
+
+    The per task quantile sketches of each file are merged per
+    (clade, entry point, process), so percentiles can be asked for any
+    process and narrowed down by clade and / or entry point afterwards.
+    Processes are keyed on their ProcessRegistry id, names are only looked
+    up again when a table is written.
+    """
+
+    def __init__(self, registry: ProcessRegistry = None):
+        self.registry   = registry or ProcessRegistry()
+        self.runs       = 0
+        self.clades     = Counter()
+        self.entries    = Counter()
+        self.tickets    = Counter()
+        self.efficiency = {'MEM_EFF': RunningStats(), 'CPU_EFF': RunningStats()}
+        self.processes  = {}                        # process id: {metric: RunningStats}
+        self.sketches   = {}                        # (clade, entry point, process id): {metric: QuantileSketch}
+        self.empties    = []
+        self.broken     = []
+        self.skipped    = []                        # duplicate and superseded runs
+
+
+    def add_result(self, result: dict):
+        if result['status'] == 'EMPTY':
+            self.empties.append(result['file'])
+            return
+        if result['status'] == 'BROKEN':
+            self.broken.append(f"{result['file']} | {result['error']}")
+            return
+        if result['status'] in SKIPPED:
+            self.skipped.append(f"{result['file']} | {result['status']} of {result.get('duplicate_of') or result.get('superseded_by')}")
+            return
+
+        self.runs += 1
+        self.entries[result['row'][1]] += 1
+        self.clades[result['row'][4]] += 1
+        self.tickets[result['row'][7]] += 1
+
+        for name, value in result['efficiency'].items():
+            self.efficiency[name].add(value)
+
+        for name, values in result['processes'].items():
+            process = self.registry.intern(name)
+            if process not in self.processes:
+                self.processes[process] = {i: RunningStats() for i in PROCESS_METRICS}
+            for metric, value in zip(PROCESS_METRICS, values):
+                self.processes[process][metric].add(float(value))
+
+        for name, sketches in result.get('sketches', {}).items():
+            key = (result['row'][4], result['row'][1], self.registry.intern(name))
+            if key not in self.sketches:
+                self.sketches[key] = {i: QuantileSketch() for i in TASK_METRICS}
+            for metric, sketch in sketches.items():
+                self.sketches[key][metric].merge_dict(sketch)
+
+
+    def merge(self, other: 'ProjectAggregates'):
+        self.runs += other.runs
+        self.clades.update(other.clades)
+        self.entries.update(other.entries)
+        self.tickets.update(other.tickets)
+        for name, stats in other.efficiency.items():
+            self.efficiency[name].merge(stats)
+        ids = [self.registry.intern(i) for i in other.registry.names]      # other's ids to ours
+        for process, metrics in other.processes.items():
+            process = ids[process]
+            if process not in self.processes:
+                self.processes[process] = {i: RunningStats() for i in PROCESS_METRICS}
+            for metric, stats in metrics.items():
+                self.processes[process][metric].merge(stats)
+        for (clade, entry_point, process), sketches in other.sketches.items():
+            key = (clade, entry_point, ids[process])
+            if key not in self.sketches:
+                self.sketches[key] = {i: QuantileSketch() for i in TASK_METRICS}
+            for metric, sketch in sketches.items():
+                self.sketches[key][metric].merge(sketch)
+        self.empties += other.empties
+        self.broken += other.broken
+        self.skipped += other.skipped
+
+
+    def named_processes(self) -> list:
+        """
+        [(process name, {metric: RunningStats})] sorted by name
+        """
+        return sorted((self.registry.names[k], v) for k, v in self.processes.items())
+
+
+    def sketch(self, process: str, metric: str, clade = None, entry_point = None) -> QuantileSketch:
+        """
+        Merged sketch of one process and metric, over every run or only those of a clade and / or entry point
+        """
+        merged = QuantileSketch()
+        process = self.registry.ids.get(process)
+        for (run_clade, run_entry, run_process), sketches in self.sketches.items():
+            if run_process == process and clade in [None, run_clade] and entry_point in [None, run_entry]:
+                merged.merge(sketches[metric])
+        return merged
+
+
+    def quantiles(self, process: str, metric: str, percentiles: list = PERCENTILES, clade = None, entry_point = None) -> list:
+        """
+        e.g. quantiles('HIC_MAPPING:BWAMEM2_MEM', 'PEAK_RSS', [50, 90, 99], clade='insects')
+        """
+        return self.sketch(process, metric, clade, entry_point).quantiles([i / 100 for i in percentiles])
+
+
+    def grouped_sketches(self) -> dict:
+        """
+        {scope: {group: {process: {metric: QuantileSketch}}}} in one pass, merged over
+        everything (ALL), per clade (CLADE) and per entry point (ENTRY_POINT)
+        """
+        grouped = {'ALL': {}, 'CLADE': {}, 'ENTRY_POINT': {}}
+        for (clade, entry_point, process), sketches in self.sketches.items():
+            process = self.registry.names[process]
+            for scope, group in [('ALL', 'ALL'), ('CLADE', clade), ('ENTRY_POINT', entry_point)]:
+                merged = grouped[scope].setdefault(group, {}).setdefault(process, {i: QuantileSketch() for i in TASK_METRICS})
+                for metric, sketch in sketches.items():
+                    merged[metric].merge(sketch)
+        return grouped
+
+
+    def percentile_dict(self, percentiles: list = PERCENTILES) -> dict:
+        """
+        grouped_sketches with each sketch replaced by its count and percentiles, e.g. {'count': 12, 'p50': ..., 'p90': ...}
+        """
+        fractions = [i / 100 for i in percentiles]
+        names = [f"p{i:g}" for i in percentiles]
+        return {    scope: {    group: {    process: {  metric: {'count': sketch.count, **dict(zip(names, sketch.quantiles(fractions)))}
+                                                        for metric, sketch in metrics.items() if sketch.count }
+                                            for process, metrics in sorted(processes.items()) }
+                                for group, processes in groups.items() }
+                    for scope, groups in self.grouped_sketches().items()
+                }
+
+
+    def summary_text(self) -> str:
+        """
+        The same layout as print_report writes to StatsSummary.txt
+        """
+        breaker = f"{'-'*50}\n"
+
+        def counts(title: str, counter: Counter) -> str:
+            return f"{title}\n" + ''.join(f"{str(k):<20} {v:>6}\n" for k, v in counter.most_common())
+
+        efficiency = [ f"{i[:3]} min/max {round(v.min, 2)}% / {round(v.max, 2)}%" for i, v in sorted(self.efficiency.items()) if v.count ]
+
+        return breaker + "TreeVal Project Summary Stats! \n" + breaker + f"Total data points: {self.runs}\n" + breaker + counts("Unique CLADE count:", self.clades) + breaker + counts("Run Type Count:", self.entries) + breaker + counts("Ticket Type Count:", self.tickets) + breaker + ''.join(f"{i}\n" for i in efficiency) + breaker
+
+
+    def to_dict(self, percentiles: list = PERCENTILES) -> dict:
+        """
+        Everything in summary_text plus the per process statistics and percentiles, for --stats_only json
+        """
+        grouped = self.percentile_dict(percentiles)
+        return {    'runs'          : self.runs,
+                    'clades'        : dict(self.clades.most_common()),
+                    'entry_points'  : dict(self.entries.most_common()),
+                    'tickets'       : dict(self.tickets.most_common()),
+                    'efficiency'    : {k: v.to_dict() for k, v in self.efficiency.items() if v.count},
+                    'processes'     : {k: {m: s.to_dict() for m, s in v.items() if s.count} for k, v in self.named_processes()},
+                    'percentiles'   : { 'processes'     : grouped['ALL'].get('ALL', {}),
+                                        'clades'        : grouped['CLADE'],
+                                        'entry_points'  : grouped['ENTRY_POINT']
+                                    },
+                    'empty_files'   : self.empties,
+                    'broken_files'  : self.broken,
+                    'skipped_files' : self.skipped
+                }
+
+
+    def process_table(self) -> str:
+        """
+        Tab separated per process statistics, one row per process x metric
+        """
+        lines = ["PROCESS\tMETRIC\tCOUNT\tMEAN\tVARIANCE\tMAX"]
+        for process, metrics in self.named_processes():
+            for metric, stats in metrics.items():
+                if stats.count:
+                    lines.append(f"{process}\t{metric}\t{stats.count}\t{round(stats.mean, 2)}\t{round(stats.variance, 2)}\t{stats.max}")
+        return '\n'.join(lines) + '\n'
+
+
+    def quantile_table(self, percentiles: list = PERCENTILES) -> str:
+        """
+        Tab separated per task percentiles, one row per group x process x metric,
+        the group being ALL, a clade or an entry point
+        """
+        lines = ["SCOPE\tGROUP\tPROCESS\tMETRIC\tCOUNT\t" + '\t'.join(f"P{i:g}" for i in percentiles)]
+        for scope, groups in self.percentile_dict(percentiles).items():
+            for group in sorted(groups, key=str):
+                for process, metrics in groups[group].items():
+                    for metric, values in metrics.items():
+                        lines.append(f"{scope}\t{group}\t{process}\t{metric}\t" + '\t'.join(str(round(i, 2)) for i in values.values()))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,144 @@
+import io
+import re
+import hashlib
+from datetime import datetime, timezone
+
+from sources import open_text
+
+# Everything after this line of a summary file is the per task trace
+RESOURCES_MARKER = '---RESOURCES---'
+SESSION_FIELD = re.compile(r'^Pipeline_session:\s*(\S+)', re.MULTILINE)
+
+# Statuses of the results left out of the stats, next to OK / EMPTY / BROKEN
+SKIPPED = ['DUPLICATE', 'SUPERSEDED']
+
+# Characters of the resources block hashed at a time by file_fingerprint
+HASH_CHUNK = 1 << 20
+
+
+def fingerprint(text: str) -> str:
+    """
+    {Pipeline_session}:{hash of the resources block} of a summary file, '' without a resources block.
+
+    Copies of a summary, or the same session written out again under another
+    file name or sample id, get the same fingerprint. Only a regex over the
+    header and one hash are needed, so this is far cheaper than a parse.
+    """
+    header, marker, resources = text.partition(RESOURCES_MARKER)
+    if not marker:
+        return ''
+    session = SESSION_FIELD.search(header)
+    digest = hashlib.blake2b(resources.encode(), digest_size=16).hexdigest()
+    return f"{session.group(1) if session else ''}:{digest}"
+
+
+class FingerprintReader:
+    """
+    Iterate the lines of a text handle while taking the fingerprint() of what went through,
+    so a file is hashed as the parsers stream it and is never held whole.
+    fingerprint() is only that of the file once every line was read.
+    """
+
+    def __init__(self, handle):
+        self.handle     = handle
+        self.lines      = 0
+        self.header     = []                        # Lines up to the marker, for the session
+        self.digest     = None                      # Started at the marker
+
+
+    def __iter__(self):
+        return self
+
+
+    def __next__(self) -> str:
+        line = next(self.handle)
+        self.lines += 1
+        if self.digest is not None:
+            self.digest.update(line.encode())
+        else:
+            head, marker, rest = line.partition(RESOURCES_MARKER)
+            self.header.append(head)
+            if marker:
+                self.digest = hashlib.blake2b(rest.encode(), digest_size=16)
+        return line
+
+
+    def fingerprint(self) -> str:
+        if self.digest is None:
+            return ''
+        session = SESSION_FIELD.search(''.join(self.header))
+        return f"{session.group(1) if session else ''}:{self.digest.hexdigest()}"
+
+
+def file_fingerprint(file: str, text: str = None) -> str:
+    """
+    fingerprint() of a file (or of text, for an archive member) without parsing it: the header
+    is streamed line by line up to the marker, then the resources block goes
+    straight into the hash in large chunks. '' when the file can't be read.
+    """
+    try:
+        with (io.StringIO(text) if text is not None else open_text(file)) as handle:
+            reader = FingerprintReader(handle)
+            for _ in reader:
+                if reader.digest is not None:
+                    break
+            if reader.digest is None:
+                return ''
+            for chunk in iter(lambda: handle.read(HASH_CHUNK), ''):
+                reader.digest.update(chunk.encode())
+            return reader.fingerprint()
+    except (OSError, EOFError, ValueError):
+        return ''
+
+
+def fingerprint_source(source: tuple) -> str:
+    """
+    file_fingerprint of a (file, text) pair, what the workers run before anything is parsed
+    """
+    return file_fingerprint(*source)
+
+
+def duplicate_result(name: str, original: str) -> dict:
+    """
+    The result standing in for a file whose fingerprint was already seen in original
+    """
+    return {'file': name, 'status': 'DUPLICATE', 'duplicate_of': original}
+
+
+def completed_time(result: dict):
+    """
+    Pipeline_datecomp of a parse result as a datetime, None when the run has none.
+    Times without an offset are taken as UTC so they still sort against the rest.
+    """
+    try:
+        completed = datetime.fromisoformat(result['run']['completed'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return completed if completed.tzinfo else completed.replace(tzinfo=timezone.utc)
+
+
+def keep_latest_per_sample(results: list) -> list:
+    """
+    Mark every OK result SUPERSEDED when a later completed run of the same sample and entry point is in results.
+
+    Retries and reruns of a sample (e.g. KPenguin2_1 / KPenguin2_2, started
+    seconds apart) then count once, as the run that finished last, while a
+    RAPID run never replaces a FULL one. Samples without any completed run
+    keep all of theirs. Returns results, changed in place.
+    """
+    def sample(result: dict) -> tuple:
+        return result['run']['sample'], result['row'][1]
+
+    latest = {}
+    for result in results:
+        completed = completed_time(result) if result['status'] == 'OK' else None
+        if completed is not None and (sample(result) not in latest or completed > latest[sample(result)][0]):
+            latest[sample(result)] = (completed, result)
+
+    for result in results:
+        if result['status'] == 'OK' and sample(result) in latest:
+            kept = latest[sample(result)][1]
+            if result is not kept:
+                result['status'] = 'SUPERSEDED'
+                result['superseded_by'] = kept['file']
+    return results
@@ -0,0 +1,66 @@
+import sys
+
+from ingest import PROCESS_METRICS
+
+# Run level fields copied onto every process row, all low cardinality so dictionary encoded
+RUN_KEYS = {    'Unique_name'       : 0,
+                'Entry_Point'       : 1,
+                'Pipeline_Version'  : 2,
+                'Clade'             : 4,
+                'Prefix'            : 5,
+                'Ticket'            : 7
+            }
+
+
+def long_table(results: list):
+    """
+    Build one typed pyarrow Table with a row per run x process.
+
+    Only processes that actually ran are written, so there is no 'NA' padding
+    for RAPID runs. Run keys and process names are dictionary encoded, the
+    metrics are float64 with nulls where condense_data has no value.
+    """
+    import pyarrow as pa
+
+    run_columns = {i: [] for i in RUN_KEYS}
+    process_column = []
+    metric_columns = {i: [] for i in PROCESS_METRICS}
+
+    for result in results:
+        if result['status'] != 'OK':
+            continue
+        for process, values in result['processes'].items():
+            for name, index in RUN_KEYS.items():
+                run_columns[name].append(result['row'][index])
+            process_column.append(process)
+            for index, name in enumerate(PROCESS_METRICS):
+                metric_columns[name].append(float(values[index]) if index < len(values) else None)
+
+    columns = {name: pa.array(values, type=pa.string()).dictionary_encode() for name, values in run_columns.items()}
+    columns['Process'] = pa.array(process_column, type=pa.string()).dictionary_encode()
+    columns.update({name: pa.array(values, type=pa.float64()) for name, values in metric_columns.items()})
+    return pa.table(columns)
+
+
+def write_long_table(results: list, path: str) -> int:
+    """
+    Write the long table to parquet (.parquet) or to an uncompressed arrow IPC
+    file (.arrow / .feather) which can be memory mapped.
+    Returns the number of rows written.
+    """
+    try:
+        import pyarrow.parquet as pq
+        import pyarrow.feather as feather
+    except ImportError:
+        sys.exit("Exporting the long table needs pyarrow: python3 -m pip install pyarrow")
+
+    table = long_table(results)
+
+    if path.endswith('.parquet'):
+        pq.write_table(table, path)
+    elif path.endswith(('.arrow', '.feather')):
+        feather.write_feather(table, path, compression='uncompressed')
+    else:
+        sys.exit(f"Unknown export format for {path}, use .parquet, .arrow or .feather")
+
+    return table.num_rows
@@ -1,4 +1,26 @@
-def html_report(cli_output: str, data_shape: list, graph_list: list) -> str:
+# %%
+import json
+
+
+def html_sections(sections: dict) -> str:
+    """
+    A <div> with a heading per section and the figures underneath, in order
+    """
+    html = ''
+    for heading, graphs in sections.items():
+        html += '''
+            <div>
+                <h2> ''' + heading + ''' </h2>'''
+        for number, graph in enumerate(graphs, 1):
+            html += '''
+                <!-- *** Section ''' + str(number) + ''' *** --->
+                    ''' + graph
+        html += '''
+            </div>'''
+    return html
+
+
+def html_report(cli_output: str, data_shape: list, sections: dict) -> str:
     HTML_STRING = '''
         <html>
             <head>
@@ -40,69 +62,198 @@ def html_report(cli_output: str, data_shape: list, graph_list: list) -> str:
             <div>
                 <h2> General Stats</h2>
                 <p>
-                    ''' + cli_ouput + '''
+                    ''' + cli_output + '''
                 <p>
+            </div>''' + html_sections(sections) + '''
+            </body>
+        </html>
+        '''
+    return HTML_STRING
+
+
+# Builds the figures of the compact report in the browser from the shared
+# columnar payload, following the FIGURE_SPECS keys the way plotly express does:
+# one trace per colour group and OLS trendlines (log10 x with trendline_options log_x)
+FIGURE_JS = '''
+const PALETTE = ['#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A', '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52'];
+
+async function loadTable() {
+    const element = document.getElementById('treeval-data');
+    let payload;
+    if (element.dataset.encoding === 'gzip') {
+        const bytes = Uint8Array.from(atob(element.textContent.trim()), c => c.charCodeAt(0));
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        payload = await new Response(stream).json();
+    } else {
+        payload = JSON.parse(element.textContent);
+    }
+    const columns = {};
+    for (const [name, column] of Object.entries(payload.columns)) {
+        columns[name] = column.levels ? column.codes.map(i => i === null ? null : column.levels[i]) : column;
+    }
+    return {rows: payload.rows, columns: columns};
+}
+
+function olsLine(xs, ys, logX) {
+    const points = xs.map((x, i) => [x, ys[i]])
+                     .filter(([x, y]) => x !== null && y !== null && (!logX || x > 0))
+                     .sort((a, b) => a[0] - b[0]);
+    if (points.length < 2) return null;
+    const tx = points.map(([x]) => logX ? Math.log10(x) : x);
+    const mx = tx.reduce((a, b) => a + b, 0) / tx.length;
+    const my = points.reduce((a, p) => a + p[1], 0) / points.length;
+    let sxy = 0, sxx = 0;
+    tx.forEach((x, i) => { sxy += (x - mx) * (points[i][1] - my); sxx += (x - mx) ** 2; });
+    const slope = sxx ? sxy / sxx : 0;
+    return {x: points.map(([x]) => x), y: tx.map(x => my + slope * (x - mx))};
+}
+
+function trendTrace(x, y, spec, name, colour) {
+    const line = olsLine(x, y, Boolean(spec.trendline_options && spec.trendline_options.log_x));
+    if (!line) return null;
+    return {type: 'scatter', mode: 'lines', x: line.x, y: line.y, name: name, legendgroup: name,
+            showlegend: false, line: {color: colour}, hoverinfo: 'skip'};
+}
+
+function buildFigure(table, spec, subset, target) {
+    const rows = [];
+    for (let i = 0; i < table.rows; i++) {
+        if (subset === 'ALL' || table.columns['Entry_Point'][i] === subset) rows.push(i);
+    }
+    const column = name => rows.map(i => table.columns[name][i]);
+    const label = name => (spec.labels && spec.labels[name]) || name;
+    const is3d = spec.kind === 'scatter_3d';
+    const hover = spec.hover_data || [];
+
+    const x = column(spec.x), y = column(spec.y), z = is3d ? column(spec.z) : null;
+    const hoverColumns = hover.map(column);
+    const groups = new Map();
+    (spec.color ? column(spec.color) : rows.map(() => '')).forEach((group, i) => {
+        if (!groups.has(group)) groups.set(group, []);
+        groups.get(group).push(i);
+    });
+
+    const template = (spec.color ? label(spec.color) + '=%{meta}<br>' : '') + label(spec.x) + '=%{x}<br>' + label(spec.y) + '=%{y}'
+                    + (is3d ? '<br>' + label(spec.z) + '=%{z}' : '')
+                    + hover.map((name, j) => '<br>' + label(name) + '=%{customdata[' + j + ']}').join('') + '<extra></extra>';
+
+    const traces = [];
+    let index = 0;
+    for (const [group, members] of groups) {
+        const pick = values => members.map(i => values[i]);
+        const name = String(group);
+        const trace = {type: is3d ? 'scatter3d' : 'scatter', mode: 'markers', name: name, legendgroup: name, meta: name,
+                       x: pick(x), y: pick(y), marker: {color: PALETTE[index % PALETTE.length]},
+                       customdata: members.map(i => hoverColumns.map(values => values[i])), hovertemplate: template};
+        if (is3d) trace.z = pick(z);
+        traces.push(trace);
+        if (spec.trendline === 'ols' && spec.trendline_scope !== 'overall' && !is3d) {
+            const trend = trendTrace(trace.x, trace.y, spec, name, trace.marker.color);
+            if (trend) traces.push(trend);
+        }
+        index++;
+    }
+    if (spec.trendline === 'ols' && spec.trendline_scope === 'overall' && !is3d) {
+        const trend = trendTrace(x, y, spec, 'Overall Trendline', spec.trendline_color_override || PALETTE[0]);
+        if (trend) traces.push(trend);
+    }
+
+    const layout = {title: {text: spec.title + ' - ' + subset}, height: spec.height,
+                    legend: {title: {text: spec.color ? label(spec.color) : ''}}};
+    const axes = {xaxis: {title: {text: label(spec.x)}}, yaxis: {title: {text: label(spec.y)}}};
+    if (is3d) {
+        layout.scene = {...axes, zaxis: {title: {text: label(spec.z)}}};
+    } else {
+        Object.assign(layout, axes);
+    }
+    Plotly.newPlot(target, traces, layout, {responsive: true});
+}
+
+loadTable().then(table => {
+    const container = document.getElementById('figures');
+    const sections = {};
+    SPECS.forEach(spec => {
+        if (!(spec.section in sections)) {
+            const section = document.createElement('div');
+            section.innerHTML = '<h2> ' + spec.section + ' </h2>';
+            container.appendChild(section);
+            sections[spec.section] = section;
+        }
+        spec.subsets.forEach(subset => {
+            const target = document.createElement('div');
+            sections[spec.section].appendChild(target);
+            buildFigure(table, spec, subset, target);
+        });
+    });
+});
+'''
+
+
+def html_report_compact(cli_output: str, data_shape: list, plotly_js: str, payload: str, specs: list, compressed: bool) -> str:
+    """
+    Self contained version of html_report, nothing is loaded from a CDN.
+    payload is the columnar JSON (gzip + base64 when compressed) that every figure is built from.
+    """
+    HTML_STRING = '''
+        <html>
+            <head>
+                <meta charset="utf-8">
+                <style>
+                    body{
+                        margin:0 100;
+                        background:whitesmoke;
+                        font-family: "Helvetica Neue", Helvetica, Arial, sans-serif;
+                    }
+                    .boxy{
+                        float: left;
+                        width: 50%;
+                        padding: 50px;
+                        box-sizing: border-box;
+                    }
+                    .row{
+                        width: 100%;
+                        overflow: hidden;
+                    }
+                    .text-uppercase{ text-transform: uppercase; }
+                    .text-primary{ color: #337ab7; }
+                    .text-success{ color: #3c763d; }
+                    .font-weight-bold{ font-weight: bold; }
+                    .h5{ font-size: 14px; }
+                    p {text-align: center;}
+                </style>
+                <script type="text/javascript">''' + plotly_js + '''</script>
+            </head>
+            <body>
+            <h1>TreeVal Summary Stats Report</h1>
+            <div class="row">
+                <div class="boxy">
+                    <div>
+                        <div class="text-uppercase text-primary font-weight-bold text-xs mb-1"><span>Rows of Data</span></div>
+
+                        <div class="text-dark font-weight-bold h5 mb-0"><span> ''' + str(data_shape[0]) + '''</span></div>
+                    </div>
+                </div>
+                <div class="boxy">
+                    <div class="col mr-2">
+                        <div class="text-uppercase text-success font-weight-bold text-xs mb-1"><span>Columns of Data</span></div>
+
+                        <div class="text-dark font-weight-bold h5 mb-0"><span>''' + str(data_shape[1]) + '''</span></div>
+                    </div>
+                </div>
             </div>
             <div>
-                <h2> mem vs hic data</h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[0] + '''
-            </div>
-            <div>
-                <h2> Genome Size vs. Runtime </h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[1] + '''
-                    <!-- *** Section 2 *** --->
-                    ''' + graph_list[2] + '''
-                    <!-- *** Section 3 *** --->
-                    ''' + graph_list[3] + '''
-            </div>
-            <div>
-                <h2> Clade vs. Runtime </h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[4] + '''
-                    <!-- *** Section 2 *** --->
-                    ''' + graph_list[5] + '''
-                    <!-- *** Section 3 *** --->
-                    ''' + graph_list[6] + '''
-            </div>
-            <div>
-                <h2> Family vs. Runtime </h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[7] + '''
-                    <!-- *** Section 2 *** --->
-                    ''' + graph_list[8] + '''
-                    <!-- *** Section 3 *** --->
-                    ''' + graph_list[9] + '''
-            </div>
-            <div>
-                <h2> Longread vs. Runtime </h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[10] + '''
-                    <!-- *** Section 2 *** --->
-                    ''' + graph_list[11] + '''
-                    <!-- *** Section 3 *** --->
-                    ''' + graph_list[12] + '''
-            </div>
-            <div>
-                <h2> HiC vs. Runtime </h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[13] + '''
-                    <!-- *** Section 2 *** --->
-                    ''' + graph_list[14] + '''
-                    <!-- *** Section 3 *** --->
-                    ''' + graph_list[15] + '''
-            </div>
-            <div>
-                <h2> 3D Graphs </h2>
-                <!-- *** Section 1 *** --->
-                    ''' + graph_list[16] + '''
-                    <!-- *** Section 2 *** --->
-                    ''' + graph_list[17] + '''
-                    <!-- *** Section 3 *** --->
-                    ''' + graph_list[18] + '''
+                <h2> General Stats</h2>
+                <p>
+                    ''' + cli_output + '''
+                <p>
             </div>
+            <div id="figures"></div>
+            <script type="application/json" id="treeval-data" data-encoding="''' + ('gzip' if compressed else 'json') + '''">''' + payload + '''</script>
+            <script type="text/javascript">
+                const SPECS = ''' + json.dumps(specs).replace('</', '<\\/') + ''';
+                ''' + FIGURE_JS + '''
+            </script>
             </body>
         </html>
         '''
-    return HTML_STRING
\ No newline at end of file
+    return HTML_STRING
@@ -0,0 +1,353 @@
+import io
+import os
+import time
+from functools import partial
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from parse_run import RunParser
+from parse_co2 import Co2Parser
+from sketch import QuantileSketch
+from dedup import FingerprintReader, fingerprint_source, duplicate_result, keep_latest_per_sample
+from scanner import scan_files
+from sources import member_texts, open_text, source_name, plain_name
+
+# Bump whenever the parsers change what parse_summary_file returns, invalidates any ParseCache
+PARSER_VERSION = '11'
+
+RUN_COLUMNS = [ 'Unique_name', 'Entry_Point',
+                'Pipeline_Version', 'Duration_(Hrs)',
+                'Clade', 'Prefix',
+                'Fasta_(mb)', 'Ticket',
+                'Longread_(AVG_GB)', 'HIC_CONTAINERS', 'HiC_(AVG_GB)',
+                'Longread_(TOTAL_GB)', 'HiC_(TOTAL_GB)'
+            ]
+
+# co2footprint plugin output is named {sample id}-co2footprint.txt
+CO2_SUFFIX = '-co2footprint.txt'
+
+# Default file name filters of scan_sources for summary and co2footprint files, compressed or not
+RUN_EXCLUDE = [f'*{CO2_SUFFIX}*']
+CO2_INCLUDE = [f'*{CO2_SUFFIX}*']
+
+# Files per task sent to the pool while files are still being scanned
+STREAM_CHUNKSIZE = 8
+
+# Tasks queued per worker process: enough to keep every worker busy, few enough
+# that a stream of archive member texts is never all pickled into the pool at once
+TASKS_IN_FLIGHT = 4
+
+# Per run totals joined onto the main dataframe, from the normalised mWh and mg
+CO2_COLUMNS = ['Energy_(Wh)', 'CO2e_(g)']
+
+# Order of the values in each process list made by ParseRunExecution.condense_data
+PROCESS_METRICS = [ 'AVERAGE_CPU', 'AVERAGE_MEMORY', 'TOTAL_MEMORY', 'AVERAGE_REALTIME',
+                    'AVERAGE_P_CPU', 'AVERAGE_P_MEM', 'AVERAGE_PEAK_MEMORY', 'TOTAL_PEAK_MEMORY'
+                ]
+
+# Per task values sketched for each process, keys of ParseRunExecution.task_values
+# realtime in seconds, peak_rss in MB and %cpu
+TASK_METRICS = ['REALTIME', 'PEAK_RSS', 'P_CPU']
+
+# Order of the per process totals in result['usage'], what the resource recommender needs of each run:
+# tasks, summed realtime (s), requested cpu seconds and MB seconds (request x realtime), the max
+# peak_rss (MB) and cores used (%cpu / 100) of any task, and the max cpus and memory (MB) requested
+USAGE_COLUMNS = [   'TASKS', 'REALTIME_S', 'CPU_S', 'MB_S',
+                    'MAX_PEAK_RSS', 'MAX_CORES_USED', 'MAX_CPUS', 'MAX_MEMORY'
+                ]
+
+
+def list_summary_files(directory: str, recursive: bool = False, include: list = ['*'], exclude: list = RUN_EXCLUDE) -> list:
+    """
+    Return the files of a summary directory in a stable (sorted) order
+    so that the rows of the final report are reproducible between runs.
+    directory may be a tar archive, and the members of any archive in it
+    are listed as {archive}::{member} (see sources). co2footprint files are
+    left out, and with recursive the files of subdirectories are listed too (see scanner).
+    """
+    return scan_files(directory, include, exclude, recursive)
+
+
+def list_co2_files(directory: str, recursive: bool = False, include: list = CO2_INCLUDE, exclude: list = []) -> list:
+    """
+    Return the co2footprint files of a directory or archive, sorted like list_summary_files
+    """
+    return scan_files(directory, include, exclude, recursive)
+
+
+def run_sample_id(uniquename: str) -> str:
+    """
+    Sample id of a run, uniquename is {sample id}-{nextflow run name}
+    """
+    return uniquename.rsplit('-', 1)[0]
+
+
+def file_profile(file: str, wall: float, cpu: float, timings: dict = {}, text: str = None) -> dict:
+    """
+    Seconds since wall (perf_counter) and cpu (process_time), and the size of file (of text when it was read for it)
+    """
+    return {    'wall'      : time.perf_counter() - wall,
+                'cpu'       : time.process_time() - cpu,
+                'bytes'     : os.path.getsize(file) if text is None else len(text),
+                **timings
+            }
+
+
+def read_text(file: str, text: str = None) -> str:
+    """
+    The text of a file, decompressed if it is .gz / .zst, or text when it was already read (archive members).
+    Only for the co2footprint files, which Co2Parser holds whole anyway
+    """
+    if text is None:
+        with open_text(file) as handle:
+            return handle.read()
+    return text
+
+
+def process_usage(values: dict) -> list:
+    """
+    The USAGE_COLUMNS of one process from its task_values, tasks without a realtime count as 0 s
+    """
+    realtime = [i if isinstance(i, (int, float)) and i == i else 0 for i in values['REALTIME']]
+    return [    len(realtime), sum(realtime),
+                sum(i * j for i, j in zip(values['CPUS'], realtime)),
+                sum(i * j for i, j in zip(values['MEMORY'], realtime)),
+                max(values['PEAK_RSS']), max(values['P_CPU']) / 100,
+                max(values['CPUS']), max(values['MEMORY'])
+            ]
+
+
+def parse_summary_file(file: str, profile: bool = False, text: str = None) -> dict:
+    """
+    Parse one summary file and return only the compact data main needs.
+
+    This is what each worker runs, so it must never raise: empty files and
+    files the parsers can't handle are reported back as a status instead.
+    The RunParser object itself stays in the worker, only plain lists and
+    dicts are sent back to the parent process.
+    With profile the wall / CPU seconds of the file are added under 'profile'.
+    Files are streamed line by line (decompressed as they are read) unless
+    they come with their text (archive members), so a worker never holds a
+    whole trace. The fingerprint (see dedup) is taken on the way through.
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = {'file': source_name(file), 'status': 'OK'}
+
+    try:
+        handle = io.StringIO(text) if text is not None else open_text(file)
+    except (OSError, ValueError) as error:
+        result['status'] = 'BROKEN'
+        result['error'] = f"{type(error).__name__}: {error}"
+        return result
+
+    with handle:
+        reader = FingerprintReader(handle)
+        try:
+            data = RunParser(file, handle=reader)
+            for _ in reader:                        # Whatever the parsers left, for the fingerprint
+                pass
+        except (Exception, SystemExit) as error:     # normalise_value calls sys.exit()
+            if reader.lines == 0 and not isinstance(error, (OSError, EOFError)):
+                result['status'] = 'EMPTY'
+                return result
+            result['status'] = 'BROKEN'
+            result['error'] = f"{type(error).__name__}: {error}"
+            if profile:
+                result['profile'] = file_profile(file, wall, cpu, text=text)
+            return result
+
+    result['uniquename'] = data.uniquename
+    result['fingerprint'] = reader.fingerprint()
+    result['row'] = [   data.uniquename, data.header_block.entrypnt,
+                        data.header_block.version, data.header_block.duration.get('h'),
+                        data.header_block.genome_clade, data.id,
+                        data.fasta_mb, data.header_block.genome_ticket,
+                        data.pacbio_avg, data.header_block.cram_containers,
+                        data.cram_avg,
+                        data.header_block.pacbio_totaldata, data.header_block.cram_totaldata
+                    ]
+    result['run'] = {   'sample'        : data.header_block.name,
+                        'runname'       : data.header_block.runname,
+                        'session'       : data.header_block.session,
+                        'started'       : data.header_block.datestrt,
+                        'completed'     : data.header_block.dateend
+                    }
+    result['processes'] = data.execution.condensed
+    result['sketches'] = {  process: {metric: QuantileSketch(values[metric]).to_dict() for metric in TASK_METRICS}
+                            for process, values in data.execution.task_values.items()
+                        }
+    result['usage'] = {process: process_usage(values) for process, values in data.execution.task_values.items()}
+    result['efficiency'] = {    'MEM_EFF': data.execution.efficiency['MEM_EFFICIENCY']['MEM_RUN_EFF'],
+                                'CPU_EFF': data.execution.efficiency['CPU_EFFICIENCY']['CPU_RUN_EFF']
+                            }
+    if profile:
+        result['profile'] = file_profile(file, wall, cpu, data.timings, text)
+    return result
+
+
+def parse_summary_source(source: tuple, profile: bool = False) -> dict:
+    """
+    parse_summary_file of a (file, text) pair, text is None unless the file was already read
+    """
+    return parse_summary_file(source[0], profile, source[1])
+
+
+def parse_co2_file(file: str, text: str = None) -> dict:
+    """
+    Parse one co2footprint file down to the run totals, like parse_summary_file
+    this runs in the workers so it reports failures as a status.
+    """
+    name = source_name(file)
+    result = {'file': name, 'sample': plain_name(name)[:-len(CO2_SUFFIX)], 'status': 'OK'}
+
+    try:
+        text = read_text(file, text)
+    except (OSError, EOFError, ValueError) as error:
+        result['status'] = 'BROKEN'
+        result['error'] = f"{type(error).__name__}: {error}"
+        return result
+
+    if text == '':
+        result['status'] = 'EMPTY'
+        return result
+
+    try:
+        data = Co2Parser(file, text=text)
+        totals = data.total_data.values()
+        result['totals'] = [    round(sum(i['TOT_ENERGY'] for i in totals) / 1000, 2),
+                                round(sum(i['TOT_CO2e'] for i in totals) / 1000, 2)
+                            ]
+    except (Exception, SystemExit) as error:     # normalise_value calls sys.exit()
+        result['status'] = 'BROKEN'
+        result['error'] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def parse_co2_source(source: tuple) -> dict:
+    return parse_co2_file(*source)
+
+
+def map_chunk(function, chunk: list) -> list:
+    return [function(i) for i in chunk]
+
+
+def map_files(function, files, jobs: int = 1) -> list:
+    """
+    Run function over files (a list or any iterable), in a pool of `jobs` processes when there is more than one.
+    Results are in the same order as `files`. files is taken a chunk at a time
+    and at most TASKS_IN_FLIGHT chunks per process are queued, so an iterable
+    is only read ahead of the workers by that much.
+    """
+    if jobs <= 1 or (isinstance(files, list) and len(files) <= 1):
+        return [function(i) for i in files]
+
+    # Small chunks keep the pool busy when a few 10k line traces sit next to lots of tiny files,
+    # files which are still being scanned are sent over a few at a time
+    chunksize = max(1, len(files) // (jobs * 8)) if isinstance(files, list) else STREAM_CHUNKSIZE
+    files = iter(files)
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        running = deque()
+        for chunk in iter(lambda: list(islice(files, chunksize)), []):
+            running.append(pool.submit(map_chunk, function, chunk))
+            if len(running) >= jobs * TASKS_IN_FLIGHT:
+                results += running.popleft().result()
+        for future in running:
+            results += future.result()
+    return results
+
+
+def ingest_co2_files(files: list, jobs: int = 1) -> tuple:
+    """
+    Parse co2footprint files in parallel and index the run totals by sample id,
+    so runs are joined with a single dict lookup each.
+    Returns ({sample id: CO2_COLUMNS values}, [failed file messages])
+    """
+    index = {}
+    failed = []
+    for result in map_files(parse_co2_source, member_texts(files), jobs):
+        if result['status'] == 'OK':
+            index[result['sample']] = result['totals']
+        else:
+            failed.append(f"{result['file']} | {result.get('error', result['status'])}")
+    return index, failed
+
+
+def ingest_files(files, jobs: int = 1, cache = None, profile: bool = False, registry = None, dedupe: bool = True, seen: dict = None, latest_per_sample: bool = False) -> list:
+    """
+    Parse summary files, spreading the work over `jobs` processes.
+
+    files is a list of files, or any iterable of (file, text) pairs such as
+    scan_sources yields (text is None unless the file came out of an archive).
+    An iterable is consumed while the workers work, so a directory scan
+    overlaps with them instead of having to finish first.
+    With a ParseCache only files missing from the cache are parsed, the rest
+    are loaded from disk. Results come back in the same order as `files`
+    regardless of which worker finished first.
+    With dedupe this runs in two passes. The workers first take only the
+    fingerprint of every file not in the cache (see dedup.file_fingerprint),
+    then the parent goes through them in the order of `files` and every file
+    whose fingerprint is already in seen ({fingerprint: file}, updated in place
+    so --watch can keep it between polls) becomes a DUPLICATE of the first
+    copy, and only the rest are parsed. Archive members are read again for
+    the second pass rather than all held in between.
+    With latest_per_sample only the last completed run of each sample is kept OK, see keep_latest_per_sample.
+    With profile every parsed (not cached) result carries its timings, see parse_summary_file.
+    With a ProcessRegistry the processes of every result are renamed by its
+    aliases and interned, after caching so the cache never depends on the aliases.
+    """
+    if isinstance(files, list):
+        # Archive members are read here as they come up, everything else in the workers
+        files = member_texts(files)
+
+    sources = []
+    results = []
+    keys = []
+    seen = {} if seen is None else seen
+
+    def pending():
+        for file, text in files:
+            sources.append(file)
+            result = None
+            if cache is not None:
+                keys.append(cache.key(file, text))
+                result = cache.get(keys[-1])
+                if result is not None:
+                    # Content keyed entries may have been stored under a copy with another name
+                    result['file'] = source_name(file)
+            results.append(result)
+            if result is None:
+                yield file, text
+
+    parse = partial(parse_summary_source, profile=profile)
+    if dedupe:
+        fingerprints = iter(map_files(fingerprint_source, pending(), jobs))
+        for index, result in enumerate(results):
+            key = next(fingerprints) if result is None else result.get('fingerprint')
+            if key in seen:
+                results[index] = duplicate_result(source_name(sources[index]), seen[key])
+            elif key:
+                seen[key] = source_name(sources[index])
+        to_parse = [i for i, result in enumerate(results) if result is None]
+        parsed = map_files(parse, member_texts([sources[i] for i in to_parse]), jobs)
+    else:
+        parsed = map_files(parse, pending(), jobs)
+        to_parse = [i for i, result in enumerate(results) if result is None]
+
+    for index, result in zip(to_parse, parsed):
+        results[index] = result
+        if cache is not None:
+            cache.put(keys[index], {k: v for k, v in result.items() if k != 'profile'})
+
+    if cache is not None and parsed:
+        cache.prune()
+
+    if latest_per_sample:
+        keep_latest_per_sample(results)
+
+    if registry is not None:
+        for result in results:
+            registry.add_result(result)
+
+    return results
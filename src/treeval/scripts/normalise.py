@@ -0,0 +1,132 @@
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+# (multiply, divide) to get from each suffix to the unit everything is normalised to:
+# co2e into miligrams, Watt Hours into mili Watt Hours and memory into MB
+UNIT_FACTORS = {
+    'kg': (1000000, 1), 'Kg': (1000000, 1), 'kWh': (1000000, 1), 'KWh': (1000000, 1), 'TB': (1000000, 1),
+    'g' : (1000, 1), 'Wh' : (1000, 1), 'GB' : (1000, 1),
+    'mg': (1, 1), 'mWh': (1, 1), 'MB': (1, 1),
+    'ug': (1, 1000), 'uWh': (1, 1000), 'KB': (1, 1000),
+    'ng': (1, 1000000), 'nWh': (1, 1000000),
+    'pg': (1, 1000000000), 'pWh': (1, 1000000000)
+}
+NO_UNIT = (1, 1)
+
+# Seconds per duration suffix, ms is checked before m
+TIME_FACTORS = [('d', 86400), ('h', 3600), ('ms', 1 / 1000), ('m', 60), ('s', 1)]
+
+# Trace columns are very repetitive ('100 MB', '12 GB', '0ms') so most lookups are hits
+CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_value(item: str) -> tuple:
+    """
+    The number and the UNIT_FACTORS suffix of a size, energy or mass string,
+    the suffix is '' for a zero with no suffix
+    """
+    item_data = item.split(' ')
+    unit = item_data[-1].strip()
+    if unit in UNIT_FACTORS:
+        return float(item_data[0]), unit
+    if int(item_data[0].strip()) == 0:
+        #"Zero value with no suffix! Happens when process so short lived that resources can't be polled, but I can deal with it"
+        return 0.0, ''
+    sys.exit(f"Incorrect value ({item}), it's not 0 and there's no suffix!")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalise_value(item: str) -> int:
+    """
+    normalise co2e into miligrams
+    normalise Watt Hour data into mili Watt hours
+    normalise memory values into MB
+    """
+    value, unit = split_value(item)
+    multiply, divide = UNIT_FACTORS.get(unit, NO_UNIT)
+    return int(round(value * multiply / divide, 2))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def duration_seconds(item: str):
+    """
+    Total seconds of a duration string such as '1d 2h 3m 4s', '84ms' or '7474'
+    (the newer formats are already converted). None when the duration couldn't be recorded.
+    """
+    tokens = item.split(' ')
+    if tokens[0] == "CANNOT":
+        return None
+
+    total = 0
+    for i in tokens:
+        for suffix, factor in TIME_FACTORS:
+            if i.endswith(suffix):
+                if suffix == 'ms':
+                    total += int(float(i[:-2])) / 1000   # divide ms by 1000 to convert milliseconds to seconds
+                elif suffix == 's':
+                    total += int(float(i[:-1]))          # nothing.. it's already in seconds
+                else:
+                    total += int(i[:-len(suffix)]) * factor
+                break
+        else:
+            total = int(float(i))                        # nothing.. means its the newer formats which are already converted
+    return total
+
+
+def time_dict(total) -> dict:
+    """
+    Total time in s, m and h
+    """
+    return {    's': total,
+                'm': round(total / 60, 2),
+                'h': round(( total / 60 ) / 60, 2)
+            }
+
+
+def fix_time(time_list: list) -> dict:
+    """
+    Fix all of time!
+    Calculate the total runtime in h, m and s using the time taken per process
+    Time taken over pipeline includes wait time on local HPC
+    """
+    total = duration_seconds(' '.join(str(i) for i in time_list))
+    if total is None:
+        return {}
+    return time_dict(total)
+
+
+def normalise_column(items: list) -> np.ndarray:
+    """
+    normalise_value of each size, energy or mass string of a column, as an int64 array.
+    Each distinct string is split into its number and unit once (split_value),
+    the numbers are scaled by their unit factors in one go and np.unique's
+    inverse spreads them back over the column. Gives exactly what normalise_value does.
+    """
+    if not len(items):
+        return np.zeros(0, dtype=np.int64)
+    tokens, inverse = np.unique(np.asarray(items, dtype=str), return_inverse=True)
+    values, units = zip(*map(split_value, tokens.tolist()))
+    factors = np.array([UNIT_FACTORS.get(i, NO_UNIT) for i in units], dtype=np.float64)
+    scaled = np.array(values) * factors[:, 0] / factors[:, 1]
+    rounded = scaled.astype(np.int64)
+    # round(x, 2) only moves the int past the truncation within 0.005 of the next one, and np.round
+    # isn't exact there (0.995 is just under it, np.round makes 1.0), so those few go through round()
+    near = np.flatnonzero(np.abs(scaled - rounded) > 0.99)
+    rounded[near] = [int(round(i, 2)) for i in scaled[near].tolist()]
+    return rounded[inverse]
+
+
+def duration_column(items: list) -> np.ndarray:
+    """
+    duration_seconds of each duration string of a column, as a float64 array
+    with NaN where it couldn't be recorded. Like normalise_column each distinct
+    string is only parsed once.
+    """
+    if not len(items):
+        return np.zeros(0, dtype=np.float64)
+    tokens, inverse = np.unique(np.asarray(items, dtype=str), return_inverse=True)
+    seconds = np.array([np.nan if i is None else i for i in map(duration_seconds, tokens.tolist())], dtype=np.float64)
+    return seconds[inverse]
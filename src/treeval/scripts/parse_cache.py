@@ -0,0 +1,117 @@
+import os
+import pickle
+import hashlib
+
+from sources import source_path
+
+
+class ParseCache:
+    """
+    On disk cache of parse_summary_file results.
+
+    Each entry is a pickle named after the hash of its key, the key is either
+    the file stat (path, size, mtime) or the file contents, plus the parser
+    version. Bumping ingest.PARSER_VERSION therefore invalidates everything.
+    Entries are touched on every hit and the least recently used ones are
+    pruned once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory: str, version: str, key_mode: str = 'stat', max_bytes: int = 512 * 1024 * 1024):
+        if key_mode not in ['stat', 'content']:
+            raise ValueError(f"Unknown cache key mode: {key_mode}")
+        self.directory  = directory
+        self.version    = version
+        self.key_mode   = key_mode
+        self.max_bytes  = max_bytes
+        self.hits       = 0
+        self.misses     = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    def key(self, file: str, text: str = None) -> str:
+        """
+        Return the cache key for a file. An archive member is keyed on its text
+        (content) or on the archive's stat plus the member name (stat)
+        """
+        digest = hashlib.sha1(self.version.encode())
+        if self.key_mode == 'content' and text is not None:
+            digest.update(text.encode())
+        elif self.key_mode == 'content':
+            with open(file, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(1 << 20), b''):
+                    digest.update(chunk)
+        else:
+            stat = os.stat(source_path(file))
+            digest.update(f"{os.path.abspath(file)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+
+    def get(self, key: str):
+        """
+        Return the cached result for key or None
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as handle:
+                result = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+        os.utime(path)          # Mark as recently used for pruning
+        self.hits += 1
+        return result
+
+
+    def put(self, key: str, result: dict):
+        """
+        Store a result, written to a temp file first so a killed run can't leave half an entry
+        """
+        path = self.entry_path(key)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as handle:
+            pickle.dump(result, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
+
+    def entries(self) -> list:
+        """
+        Return [mtime, size, path] for every entry in the cache
+        """
+        found = []
+        with os.scandir(self.directory) as listing:
+            for entry in listing:
+                if entry.name.endswith('.pkl'):
+                    stat = entry.stat()
+                    found.append([stat.st_mtime, stat.st_size, entry.path])
+        return found
+
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        Returns the number of removed entries.
+        """
+        entries = sorted(self.entries())
+        total = sum(i[1] for i in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+    def clear(self) -> int:
+        """
+        Invalidate the whole cache
+        """
+        entries = self.entries()
+        for _, _, path in entries:
+            os.remove(path)
+        return len(entries)
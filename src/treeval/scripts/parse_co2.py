@@ -1,27 +1,32 @@
 import io
+import math
+from functools import cached_property
+
+from general_functions import get_contents
+from normalise import normalise_value, fix_time
+
+# Measures aggregated for every process and subworkflow, in output order
+CO2_MEASURES = ['ENERGY', 'CO2e', 'CPUS', 'TIME']
 
-from general_functions import get_contents, normalise_values, fix_time
 
 class Co2Parser:
 
-    def __init__ (self, file: str):
+    AGGREGATES = ['max_data', 'total_data', 'average_data', 'max_sworkflow', 'total_sworkflow', 'average_sworkflow']
+
+    def __init__ (self, file: str, text: str = None):
         self.file = file
-        self._file_data         = get_contents(self)
+        self._file_data         = get_contents(self) if text is None else text.splitlines(keepends=True)
         self._processed_data    = Co2Parser.condense_data(self)
         self.original_headers   = Co2Parser.get_co2_columns(self)
-        self.max_data           = Co2Parser.max_data_dict(self)
-        self.total_data         = Co2Parser.total_data_dict(self)
-        self.average_data       = Co2Parser.average_data_dict(self)
-        self.max_sworkflow      = Co2Parser.max_subworkflow_dict(self)
-        self.total_sworkflow    = Co2Parser.total_subworkflow_dict(self)
-        self.average_sworkflow  = Co2Parser.average_subworkflow_dict(self)
         self.collection         = Co2Parser.__iter__(self)
 
 
     def __iter__(self):
-        for attr, value in self.__dict__.items():
-            if not attr.startswith('_'):
+        for attr, value in list(self.__dict__.items()):
+            if not attr.startswith('_') and attr not in Co2Parser.AGGREGATES:
                 yield attr, value
+        for attr in Co2Parser.AGGREGATES:
+            yield attr, getattr(self, attr)
 
 
     def __repr__(self) -> str:
@@ -53,8 +58,8 @@ class Co2Parser:
         CO2e and Energy usage are converted to mg and mWh
         """
         return [    ':'.join(line[1].split(' ')[0].split(':')[2:]), # PROCESS NAMES
-                    normalise_values(self, line[3]),                # ENERGY USAGE
-                    normalise_values(self, line[4]),                # CO2e
+                    normalise_value(line[3]),                       # ENERGY USAGE
+                    normalise_value(line[4]),                       # CO2e
                     fix_time(line[5].split(" ")),                   # TIME TAKEN
                     line[6],                                        # CPUS
                     line[2]                                         # SUCCESS OR FAIL
@@ -88,174 +93,111 @@ class Co2Parser:
         return condensed_data
 
 
-    def collapse_nested_lists(data: dict) -> dict:
-        """
-        Collapse the nested lists from condense_data
-        """
-        corrected = {}
-        for x, y in data.items():
-            corrected[x] = {
-                'COLLECTS'      : y['COLLECTS'], # MUST REMAIN A LIST
-                'SUB_ENERGY'    : [ii for i in y['SUB_ENERGY'] for ii in i],
-                'SUB_CO2e'      : [ii for i in y['SUB_CO2e'] for ii in i],
-                'SUB_TIME'      : [ii for i in y['SUB_TIME'] for ii in i],
-                'SUB_CPUS'      : [int(ii) for i in y['SUB_CPUS'] for ii in i]
-            }
-        return corrected
-
-
-    def condense_per_sworkflow (self) -> dict:
+    @cached_property
+    def _aggregates(self) -> dict:
         """
-        Collapse data down to the subworkflow level rather than module.
+        Single pass over the condensed data.
+        Every value is added to the sum / max / count of its process and of
+        its subworkflow at the same time, so the six output dicts are built
+        from one traversal instead of re-collapsing the data for each of them.
         """
-        condensed_data = {}
+        processes = {}
+        subworkflows = {}
+
         for x, y in self._processed_data.items():
             hierarchy = x.split(':')
+            subworkflow = x if len(hierarchy) < 2 else ':'.join(hierarchy[:-1])
 
-            if len(hierarchy) < 2:
-                subworkflow = x
-            else:
-                subworkflow = ':'.join(hierarchy[:-1])
-
-            if not subworkflow in condensed_data.keys():
-                condensed_data[subworkflow] = {
-                    'COLLECTS'  : [hierarchy[-1]],
-                    'SUB_ENERGY': [y['ENERGY']],
-                    'SUB_CO2e'  : [y['CO2e']],
-                    'SUB_TIME'  : [y['TIME']],
-                    'SUB_CPUS'  : [y['CPUS']]
-                }
-                if not hierarchy[-1] in condensed_data[subworkflow]["COLLECTS"]:
-                    condensed_data[subworkflow]["COLLECTS"].append(hierarchy[-1])
-            else:
-                condensed_data[subworkflow]["COLLECTS"].append(hierarchy[-1]),
-                condensed_data[subworkflow]["SUB_ENERGY"].append(y['ENERGY']),
-                condensed_data[subworkflow]["SUB_CO2e"].append(y['CO2e']),
-                condensed_data[subworkflow]["SUB_TIME"].append(y['TIME']),
-                condensed_data[subworkflow]["SUB_CPUS"].append(y['CPUS'])
-        return Co2Parser.collapse_nested_lists(condensed_data)
-
-
-    def average_subworkflow_dict(self) -> dict:
-        """
-        Create a dictionary of averaged data per subworkflow
-        """
-        data = Co2Parser.condense_per_sworkflow(self)
-        average_dict = {}
-
-        for x, y in data.items():
-            time_list = [ x['s'] for x in y['SUB_TIME']]
-            average_dict[x] = { "COLLECTS"  : y['COLLECTS'],
-                                "AVG_ENERGY": Co2Parser.calc_average(y['SUB_ENERGY']),
-                                "AVG_CO2e"  : Co2Parser.calc_average(y['SUB_CO2e']),
-                                "AVG_CPUS"  : Co2Parser.calc_average(y['SUB_CPUS']),
-                                "AVG_TIME"  : fix_time([Co2Parser.calc_average(time_list)])
-                                }
-        return average_dict
-
-
-    def max_subworkflow_dict(self) -> dict:
-        """
-        Create a dictionary of the maximal value for each category
-        """
-        data = Co2Parser.condense_per_sworkflow(self)
-        max_dict = {}
-
-        for x, y in data.items():
-            time_list = [ x['s'] for x in y['SUB_TIME']]
-            max_dict[x] = { "COLLECTS"  : y['COLLECTS'],
-                            "MAX_ENERGY": max(y['SUB_ENERGY']),
-                            "MAX_CO2e"  : max(y['SUB_CO2e']),
-                            "MAX_CPUS"  : max(y['SUB_CPUS']),
-                            "MAX_TIME"  : fix_time([max(time_list)])
-                            }
-        return max_dict
+            if not subworkflow in subworkflows:
+                subworkflows[subworkflow] = {'COLLECTS': [], **{i: [0, -math.inf, 0] for i in CO2_MEASURES}}
+            subworkflows[subworkflow]['COLLECTS'].append(hierarchy[-1])
+            processes[x] = {i: [0, -math.inf, 0] for i in CO2_MEASURES}
 
+            columns = { 'ENERGY': y['ENERGY'],
+                        'CO2e'  : y['CO2e'],
+                        'CPUS'  : [ int(i) for i in y['CPUS'] ],
+                        'TIME'  : [ i['s'] for i in y['TIME'] ]
+                    }
 
-    def total_subworkflow_dict(self) -> dict:
-        """
-        Create a dictionary of the total value per category
-        """
-        data = Co2Parser.condense_per_sworkflow(self)
-        total_dict = {}
-
-        for x, y in data.items():
-            time_list = [ x['s'] for x in y['SUB_TIME']]
-            total_dict[x] = { "COLLECTS"  : y['COLLECTS'],
-                            "TOT_ENERGY": round(sum(y['SUB_ENERGY']), 2),
-                            "TOT_CO2e"  : round(sum(y['SUB_CO2e']), 2),
-                            "TOT_CPUS"  : round(sum(y['SUB_CPUS']), 2),
-                            "TOT_TIME"  : fix_time([sum(time_list)])
-                            }
-        return total_dict
-
-
-    # NEEDS CACHING OF SOME SORT AS IT WILL BE REFEREED TO THRICE!
-    def all_data_dict(data: dict) -> dict:
-        """
-        Creates a dictionary of all raw data
-        """
-        the_all_dict = {}
-
-        for x, y in data.items():
-            cpu_list    = [ int(yyy) for xx, yy in y.items() if xx == 'CPUS' for yyy in yy]
-            co2e_list   = [ yyy for xx, yy in y.items() if xx == 'CO2e' for yyy in yy ]
-            time_list   = [ yyy['s'] for xx, yy in y.items() if xx == 'TIME' for yyy in yy ]
-            energy_list = [ yyy for xx, yy in y.items() if xx == 'ENERGY' for yyy in yy ]
-
-            the_all_dict[x] = { "ALL_ENERGY": energy_list,
-                                "ALL_CO2e"  : co2e_list,
-                                "ALL_CPUS"  : cpu_list,
-                                "ALL_TIME"  : time_list
-                                }
+            for measure, values in columns.items():
+                for total in (processes[x][measure], subworkflows[subworkflow][measure]):
+                    for value in values:
+                        total[0] += value
+                        if value > total[1]:
+                            total[1] = value
+                    total[2] += len(values)
 
-        return the_all_dict
+        return {'PROCESS': processes, 'SUBWORKFLOW': subworkflows}
 
 
-    def calc_average(data: list) -> int:
+    def calc_average(total, count: int) -> int:
         """
-        Calculate the average value of the input list
+        Calculate the average value from a sum and a count
         """
-        return round(int(sum(data) / len(data)), 2)
+        return round(int(total / count), 2)
 
-    # THE BELOW 3 FUNCTIONS COULD BE SIMPLIFIED WITH
-    # ONE OF THOSE WRAPPERS THAT TAKE A FUNC AS INPUT
-    # GENERATE_DICTS( self, [Co2Parser.calc_average, max, sum]) -> AVG, MAX, TOT
 
-    def average_data_dict (self) -> dict:
-        average_dict = {}
+    @cached_property
+    def max_data(self) -> dict:
+        return { x: {   "MAX_ENERGY": y['ENERGY'][1],
+                        "MAX_CO2e"  : y['CO2e'][1],
+                        "MAX_CPUS"  : y['CPUS'][1],
+                        "MAX_TIME"  : fix_time([y['TIME'][1]])
+                    } for x, y in self._aggregates['PROCESS'].items() }
 
-        for x, y in Co2Parser.all_data_dict(self._processed_data).items():
-            average_dict[x] = { "AVG_ENERGY": Co2Parser.calc_average(y['ALL_ENERGY']),
-                                "AVG_CO2e"  : Co2Parser.calc_average(y['ALL_CO2e']),
-                                "AVG_CPUS"  : Co2Parser.calc_average(y['ALL_CPUS']),
-                                "AVG_TIME"  : fix_time([Co2Parser.calc_average(y['ALL_TIME'])])
-                                }
 
-        return average_dict
+    @cached_property
+    def total_data(self) -> dict:
+        return { x: {   "TOT_ENERGY": y['ENERGY'][0],
+                        "TOT_CO2e"  : y['CO2e'][0],
+                        "TOT_CPUS"  : y['CPUS'][0],
+                        "TOT_TIME"  : fix_time([y['TIME'][0]])
+                    } for x, y in self._aggregates['PROCESS'].items() }
 
 
-    def total_data_dict (self) -> dict:
-        total_dict = {}
+    @cached_property
+    def average_data(self) -> dict:
+        return { x: {   "AVG_ENERGY": Co2Parser.calc_average(*y['ENERGY'][::2]),
+                        "AVG_CO2e"  : Co2Parser.calc_average(*y['CO2e'][::2]),
+                        "AVG_CPUS"  : Co2Parser.calc_average(*y['CPUS'][::2]),
+                        "AVG_TIME"  : fix_time([Co2Parser.calc_average(*y['TIME'][::2])])
+                    } for x, y in self._aggregates['PROCESS'].items() }
 
-        for x, y in Co2Parser.all_data_dict(self._processed_data).items():
-            total_dict[x] = {   "TOT_ENERGY": sum(y['ALL_ENERGY']),
-                                "TOT_CO2e"  : sum(y['ALL_CO2e']),
-                                "TOT_CPUS"  : sum(y['ALL_CPUS']),
-                                "TOT_TIME"  : fix_time([sum(y['ALL_TIME'])])
-                                }
 
-        return total_dict
+    @cached_property
+    def max_sworkflow(self) -> dict:
+        """
+        Create a dictionary of the maximal value for each category
+        """
+        return { x: {   "COLLECTS"  : y['COLLECTS'],
+                        "MAX_ENERGY": y['ENERGY'][1],
+                        "MAX_CO2e"  : y['CO2e'][1],
+                        "MAX_CPUS"  : y['CPUS'][1],
+                        "MAX_TIME"  : fix_time([y['TIME'][1]])
+                    } for x, y in self._aggregates['SUBWORKFLOW'].items() }
 
 
-    def max_data_dict (self) -> dict:
-        max_dict = {}
+    @cached_property
+    def total_sworkflow(self) -> dict:
+        """
+        Create a dictionary of the total value per category
+        """
+        return { x: {   "COLLECTS"  : y['COLLECTS'],
+                        "TOT_ENERGY": round(y['ENERGY'][0], 2),
+                        "TOT_CO2e"  : round(y['CO2e'][0], 2),
+                        "TOT_CPUS"  : round(y['CPUS'][0], 2),
+                        "TOT_TIME"  : fix_time([y['TIME'][0]])
+                    } for x, y in self._aggregates['SUBWORKFLOW'].items() }
 
-        for x, y in Co2Parser.all_data_dict(self._processed_data).items():
-            max_dict[x] = {   "MAX_ENERGY"  : max(y['ALL_ENERGY']),
-                                "MAX_CO2e"  : max(y['ALL_CO2e']),
-                                "MAX_CPUS"  : max(y['ALL_CPUS']),
-                                "MAX_TIME"  : fix_time([max(y['ALL_TIME'])])
-                                }
 
-        return max_dict
\ No newline at end of file
+    @cached_property
+    def average_sworkflow(self) -> dict:
+        """
+        Create a dictionary of averaged data per subworkflow
+        """
+        return { x: {   "COLLECTS"  : y['COLLECTS'],
+                        "AVG_ENERGY": Co2Parser.calc_average(*y['ENERGY'][::2]),
+                        "AVG_CO2e"  : Co2Parser.calc_average(*y['CO2e'][::2]),
+                        "AVG_CPUS"  : Co2Parser.calc_average(*y['CPUS'][::2]),
+                        "AVG_TIME"  : fix_time([Co2Parser.calc_average(*y['TIME'][::2])])
+                    } for x, y in self._aggregates['SUBWORKFLOW'].items() }
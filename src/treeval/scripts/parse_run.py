@@ -1,22 +1,36 @@
 import re
 import io
-import re
+import time
 from itertools import count
+from contextlib import nullcontext
 
 from parse_run_header import ParseRunHeader
 from parse_run_execution import ParseRunExecution
 from parse_co2 import Co2Parser
-from general_functions import get_contents
+from general_functions import read_summary_header, stream_summary_trace
+from sources import open_text
 
 class RunParser:
 
     _instance_counter = count(0)
 
-    def __init__ (self, file: str, co2: str = ''):
+    def __init__ (self, file: str, co2: str = '', text: str = None, handle = None):
+        """
+        The summary is read line by line from handle when given (left open), else from text,
+        else from file itself, which is opened (and decompressed) as a stream.
+        """
         self.instance       = next(self._instance_counter)
         self.file           = str(file)
-        self.contents       = get_contents(self)
-        self.header_block   = ParseRunHeader(self.contents[1:14], )
+        if handle is not None:
+            source = nullcontext(handle)
+        else:
+            source = io.StringIO(text) if text is not None else open_text(self.file)
+        with source as handle:
+            start = time.perf_counter()
+            self.header_block   = ParseRunHeader(read_summary_header(handle))
+            middle = time.perf_counter()
+            self.execution      = ParseRunExecution(stream_summary_trace(handle))
+            self.timings        = {'header': middle - start, 'condense': time.perf_counter() - middle}    # Seconds, for --profile
         self.uniquename     = self.header_block.uniquename
         self.id             = re.search(r'^[a-z]*', self.uniquename).group() # returns initial lowercase characters (upto 2) important for DTOL and presumably EBP
         self.fasta_mb       = round(self.header_block.genome_size / 1000000, 2)
@@ -24,9 +38,8 @@ class RunParser:
         self.pacbio_gb      = round(self.header_block.pacbio_totaldata / 1000000000, 2)
         self.cram_avg       = round(self.cram_gb / self.header_block.cram_count, 2)
         self.pacbio_avg     = round(self.pacbio_gb / self.header_block.pacbio_count, 2)
-        self.execution      = ParseRunExecution(self.contents[16:-1])
         if co2 != '':
-            self.co2_data   = Co2Parser(self, co2)
+            self.co2_data   = Co2Parser(co2)
         else:
             self.co2_data = ['NO CO2 DATA PROVIDED']
 
@@ -52,6 +65,3 @@ class RunParser:
         [txt.write(f"\t {a} = '{v}' \n") for a, v in self.collection if a not in ['block', 'collection', 'contents']]
         txt.write(")")
         return txt.getvalue()
-
-
-    def update_dicts
\ No newline at end of file
@@ -1,9 +1,7 @@
 import io
 import math
-import sys
 
-from master_list import master_list
-from general_functions import normalise_values, fix_time
+from normalise import normalise_value, normalise_column, duration_column, fix_time
 
 class ParseRunExecution:
     def __init__(self, block,):
@@ -49,62 +47,54 @@ class ParseRunExecution:
         """
         Get the pipeline total mem efficiency and cpu efficiency
         """
-        mem_usage   = []
-        mem_request = []
-        cpu_usage   = []
-        cpu_request = []
+        mem_usage   = 0
+        mem_request = 0
+        cpu_usage   = 0
+        cpu_request = 0
         for x, y in data.items():
-            for sub_list in y:
-                cpu_request.append(int(sub_list[0]))                                # cpu request by user
-                mem_request.append(normalise_values(self, sub_list[1]))             # mem request by user
-                cpu_usage.append(math.ceil(float(sub_list[4].split('%')[0]) / 100)) # number of cores used = roundup(CPU_percent  / 100) as it is 100 per core
-                mem_usage.append(normalise_values(self, sub_list[-1].strip()))      # Using peak mem reported by process
+            cpu_request += sum(int(i[0]) for i in y)                                        # cpu request by user
+            cpu_usage   += sum(math.ceil(float(i[4].split('%')[0]) / 100) for i in y)       # number of cores used = roundup(CPU_percent  / 100) as it is 100 per core
+        rows = [i for y in data.values() for i in y]
+        mem_request = int(normalise_column([i[1] for i in rows]).sum())                     # mem request by user
+        mem_usage   = int(normalise_column([i[-1].strip() for i in rows]).sum())            # Using peak mem reported by process
 
         return { 'MEM_EFFICIENCY' : {
-                                    'MEM_USAGE'     : sum(mem_usage),
-                                    'MEM_REQUEST'   : sum(mem_request),
-                                    'MEM_RUN_EFF'   : (sum(mem_request) / sum(mem_usage)) * 100
+                                    'MEM_USAGE'     : mem_usage,
+                                    'MEM_REQUEST'   : mem_request,
+                                    'MEM_RUN_EFF'   : (mem_request / mem_usage) * 100
                                     },
                 'CPU_EFFICIENCY' : {
-                                    'CPU_USAGE'     : sum(cpu_usage),
-                                    'CPU_REQUEST'   : sum(cpu_request),
-                                    'CPU_RUN_EFF'   : (sum(cpu_request) / sum(cpu_usage)) * 100
+                                    'CPU_USAGE'     : cpu_usage,
+                                    'CPU_REQUEST'   : cpu_request,
+                                    'CPU_RUN_EFF'   : (cpu_request / cpu_usage) * 100
                                     }
                 }
 
 
     def condense(self, data: list):
-        processes           = ParseRunExecution.get_unique_processes(data)
-        data_per_process    = ParseRunExecution.collect_per_process(data, processes)
+        data_per_process    = ParseRunExecution.group_per_process(data)
         efficiency_dict     = ParseRunExecution.efficiency_calculator(self, data_per_process)
         condensed           = ParseRunExecution.condense_data(self, data_per_process)
-        process_correction  = ParseRunExecution.compare_to_masterlist(self, condensed)
-        condensed.update(process_correction)
         sorted_dict         = dict(sorted(condensed.items())) # Alphabetically sort the keys, means all iterations should have same order
         return sorted_dict, efficiency_dict
 
 
-    def get_unique_processes(data: list) -> list:
-        """
-        Return unique list of processes in execution log
-        """
-        return list(set([i.split(' ')[0] for i in data]))
-
-
-    def collect_per_process(data: list, processes: list) -> dict:
+    def group_per_process(data: list) -> dict:
         """
         Collect completed processes per process, filtering out the incomplete or errored cases
+
+        One pass over the execution log, each line is split once and grouped
+        under its process name as it is read.
         """
         collection = dict()
-        counter = 0
-        for i in processes:
-            for ii in data:
-                if ii.split(' ')[0] == i and str(ii.split('\t')[1]) == 'COMPLETED':
-                    ii = ii.split('\t')[3:]
-                    if i in collection:
-                        collection[i].append(ii)
-                    else:
-                        collection[i] = [ii]
+        for line in data:
+            fields = line.split('\t')
+            if len(fields) > 3 and fields[1] == 'COMPLETED':
+                process = fields[0].split(' ', 1)[0]    # Drops the tag, e.g. ' (bAnaAcu1_1)'
+                if process in collection:
+                    collection[process].append(fields[3:])
+                else:
+                    collection[process] = [fields[3:]]
 
         return collection
 
@@ -113,48 +103,56 @@ class ParseRunExecution:
         """
         Condense data from the execution log into an easier averaged format
         So ten lines of data recorded by x process becomes one line of average(data) by x process
+        The per task values are kept in self.task_values, {process: {'REALTIME': [seconds], 'PEAK_RSS': [MB],
+        'P_CPU': [%cpu], 'CPUS': [requested], 'MEMORY': [requested MB]}}, for the quantile sketches and usage totals.
         """
         condensed_data = {}
+        self.task_values = {}
+
+        # The size and duration columns are normalised once for the whole trace, each process takes its slice
+        rows = [i for data_lists in data.values() for i in data_lists]
+        memory_column   = normalise_column([i[1] for i in rows])
+        realtime_column = duration_column([i[3] for i in rows])
+        peak_column     = normalise_column([i[6].split('\\')[0] for i in rows])
+        end = 0
         for process, data_lists in data.items():
-            process_entry = str(process.split(':')[0])
-            if process_entry in ['RAPID', 'FULL']:
-                process = ':'.join(process.split(':')[3:])  # Gets subworkflows + process inside subworkflows
-            elif 'SANGERTOL_TREEVAL' in process_entry:      # LEGACY ENTRY POINT
-                process = ':'.join(process.split(':')[2:])  # Gets subworkflows + process
+            start, end = end, end + len(data_lists)
+            parts = process.split(':')
+            if len(parts) > 3 and parts[1].startswith('SANGERTOL_TREEVAL'):    # RAPID, FULL, RAPID_TOL ... entry points
+                process = ':'.join(parts[3:])               # Gets subworkflows + process inside subworkflows
+            elif 'SANGERTOL_TREEVAL' in parts[0]:           # LEGACY ENTRY POINT
+                process = ':'.join(parts[2:])               # Gets subworkflows + process
             else:
                 print('Ooops, I\'m programmed to not recognise the given entry point here')
             if len(data_lists) <= 1:
                 condensed_data[process] = [ int(data_lists[0][0]),
-                                            normalise_values(self, data_lists[0][1]),
-                                            normalise_values(self, data_lists[0][1]),
+                                            normalise_value(data_lists[0][1]),
+                                            normalise_value(data_lists[0][1]),
                                             ParseRunExecution.calculate_avg_time(fix_time(data_lists[0][3].split(' '))),
                                             int(float(data_lists[0][4].split('%')[0])),
                                             int(float(data_lists[0][5].split('%')[0])),
-                                            round((normalise_values(self, data_lists[0][6].split('\\')[0]) / normalise_values(self, data_lists[0][1])) * 100, 0)]
+                                            round((normalise_value(data_lists[0][6].split('\\')[0]) / normalise_value(data_lists[0][1])) * 100, 0)]
+                self.task_values[process] = {   'REALTIME'  : [condensed_data[process][3]],
+                                                'PEAK_RSS'  : [normalise_value(data_lists[0][6].split('\\')[0])],
+                                                'P_CPU'     : [float(data_lists[0][4].split('%')[0])],
+                                                'CPUS'      : [condensed_data[process][0]],
+                                                'MEMORY'    : [condensed_data[process][1]]
+                                            }
             else:
-                cpus = []
-                memory = []
-                realtime= []
-                cpu_percent = []
-                mem_percent = []
-                peak_mem = []
-                for i in data_lists:
-                    cpus.append(int(i[0]))                                          # '16'         - REQUESTED CPU
-                    memory.append(normalise_values(self, i[1]))                     # '130 GB'     - REQUESTED MEM
-                    realtime.append(
-                        fix_time(i[3].split(' '))                                   # '29m 33s'    - REALTIME EXECUTION TIME
-                    )
-                    cpu_percent.append(int(float(i[4].split('%')[0])))              # '1441.5%'    - CPU UTILISATION PERCENTAGE
-                    mem_percent.append(int(float(i[5].split('%')[0])))              # '6.5%'       - MEM UTILISATION PERCENTAGE
-                    peak_mem.append(normalise_values(self, i[6].split('\\')[0]))    # '25.8 GB\n'  - REPORTED PEAK MEMORY for PERCENTAGE OF REQUESTED MEM
+                cpus        = [int(i[0]) for i in data_lists]                           # '16'         - REQUESTED CPU
+                memory      = memory_column[start:end]                                  # '130 GB'     - REQUESTED MEM
+                realtime    = realtime_column[start:end]                                # '29m 33s'    - REALTIME EXECUTION TIME
+                cpu_percent = [int(float(i[4].split('%')[0])) for i in data_lists]      # '1441.5%'    - CPU UTILISATION PERCENTAGE
+                mem_percent = [int(float(i[5].split('%')[0])) for i in data_lists]      # '6.5%'       - MEM UTILISATION PERCENTAGE
+                peak_mem    = peak_column[start:end]                                    # '25.8 GB\n'  - REPORTED PEAK MEMORY for PERCENTAGE OF REQUESTED MEM
                 avg_cpu = sum(cpus) / len(cpus)
-                avg_mem = int(sum(memory) / len(memory))
-                tot_mem = int(sum(memory))
-                avg_realtime = ParseRunExecution.calculate_avg_time(realtime)
+                avg_mem = int(memory.sum() / len(memory))
+                tot_mem = int(memory.sum())
+                avg_realtime = float(realtime.sum() / len(realtime))
                 avg_pcpu = sum(cpu_percent) / len(cpu_percent)
                 avg_pmem = sum(mem_percent) / len(mem_percent)
-                avg_peak = round((sum(peak_mem) / len(peak_mem)) / (int(sum(memory) / len(memory))) * 100, 0)
-                tot_peak = sum(peak_mem)
+                avg_peak = round((int(peak_mem.sum()) / len(peak_mem)) / avg_mem * 100, 0)
+                tot_peak = int(peak_mem.sum())
                 condensed_data[process] = [ avg_cpu,
                                             avg_mem,
                                             tot_mem,
@@ -164,6 +162,12 @@ class ParseRunExecution:
                                             avg_peak,
                                             tot_peak
                                             ]
+                self.task_values[process] = {   'REALTIME'  : realtime.tolist(),
+                                                'PEAK_RSS'  : peak_mem.tolist(),
+                                                'P_CPU'     : [float(i[4].split('%')[0]) for i in data_lists],
+                                                'CPUS'      : cpus,
+                                                'MEMORY'    : memory.tolist()
+                                            }
         return condensed_data
 
 
@@ -172,43 +176,6 @@ class ParseRunExecution:
         pass
 
 
-    def compare_to_masterlist(self, data_dict: dict) -> dict:
-        """
-        Compare created list of execution logs against a master list of processes
-
-        This is ensure that the RAPID and FULL pipeline have data of the same width
-        which is easier for df ingestion.
-        """
-        if len(master_list) == len(data_dict):
-            # Indicates that this is a FULL treeval run in which all processes have fun
-            return data_dict
-
-        not_in_run = {}
-        dict_list = [k for k, v in data_dict.items()]
-        #print(f'{len(dict_list)} == {len(master_list)}')
-        if set(dict_list) == set(master_list):
-            pass # Because it needs no correction
-        else:
-            # Checks for missing processes (which is expected between full and rapid) and writes an NA list
-            # This makes it MUCH easier to merge into the full dataframe later
-            for i in master_list:
-                if i not in dict_list:
-                    not_in_run[i] = ['NA', 'NA', 'NA', 'NA', 'NA', 'NA', 'NA', 'NA']
-                else:
-                    pass
-
-        # Double checks there's no extra processes, caused by modified pipeline
-        for i in dict_list:
-            if i not in master_list:
-                # error out for some reason raise TooManyProcesses(self, i, master_list)
-                print(f"error due to {i}")
-                sys.exit()
-            else:
-                pass
-
-        return not_in_run
-
-
     def calculate_avg_time(times: list) -> int:
         counter = 0
         total_time = 0
@@ -2,33 +2,43 @@ import io
 import re
 import numpy as np
 
+from normalise import fix_time
+
+# One character per alternative in meta: with [^\[\]]+ a line that doesn't match (e.g. cut short
+# in a file still being written) backtracks over every way of splitting the text, exponentially
+GROOVY_INPUT    = re.compile(r'^\s*\[\[(?P<meta>(?:[^\[\]]|\[[^\[\]]*\])*)\],\s*(?P<paths>.*)\]\s*$')     # [[meta], path(s)]
+GROOVY_ENTRY    = re.compile(r'(\w+):\s*(\[[^\[\]]*\]|[^,]*)')                                        # key:value or key:[values]
+GROOVY_INT      = re.compile(r'-?[0-9]+')
+GROOVY_NUMBER_START = set('-0123456789')
+
 class ParseRunHeader:
-    def __init__(self, block: list):
+    def __init__(self, block: dict):
         self.block              = block
         self.name               = ParseRunHeader.get_name(self)
-        self.runname            = self.block[1].strip().split(" ")[-1]
+        self.runname            = self.block['Pipeline_runname']
         self.uniquename         = f"{self.name}-{self.runname}"
-        self.version            = self.block[0].strip().split(" ")[-1]
-        self.session            = self.block[2].strip().split(" ")[-1]
-        self.datestrt           = self.block[4].strip().split(" ")[-1]
-        self.dateend            = self.block[5].strip().split(" ")[-1]
-        self.entrypnt           = self.block[6].strip().split(" ")[-1]
-        self.yamlfile           = self.block[9].strip().split(" ")[-1]
-        self.duration           = ParseRunHeader.fix_time(self.block[3].strip().split("  ")[1].split(" "))
-
-        genome_data             = ParseRunHeader.fix_fasta(self.block[10])
+        self.version            = self.block['Pipeline_version']
+        self.session            = self.block['Pipeline_session']
+        self.datestrt           = self.block['Pipeline_datastrt']
+        self.dateend            = self.block['Pipeline_datecomp']
+        self.entrypnt           = self.block['Pipeline_entrypnt']
+        self.yamlfile           = self.block['InputYamlFile']
+        self.duration           = fix_time(self.block['Pipeline_duration'].split(" "))
+
+        genome_data             = ParseRunHeader.fix_fasta(ParseRunHeader.parse_input(self.block['InputAssemblyData']))
         self.genome_size        = genome_data[1]
         self.genome_clade       = genome_data[2]
         self.genome_ticket      = genome_data[3]
 
-        pacbio_data             = ParseRunHeader.fix_data(self.block[11])
+        pacbio_data             = ParseRunHeader.fix_data(ParseRunHeader.parse_input(self.block['Input_PacBio_Files']))
         self.pacbio_count       = len(pacbio_data)
         self.pacbio_totaldata   = sum(pacbio_data) / 1000000000
 
-        cram_data               = ParseRunHeader.fix_data(self.block[12])
+        cram_input              = ParseRunHeader.parse_input(self.block['Input_Cram_Files'])
+        cram_data               = ParseRunHeader.fix_data(cram_input)
         self.cram_count         = len(cram_data)
         self.cram_totaldata     = sum(cram_data) / 1000000000
-        self.cram_containers    = ParseRunHeader.get_container(self.block[12])
+        self.cram_containers    = ParseRunHeader.get_container(cram_input)
         self.collection         = ParseRunHeader.__iter__(self)
 
     def __iter__(self):
@@ -53,7 +63,7 @@ class ParseRunHeader:
 
 
     def get_name(self) -> str:
-        name = self.block[8].strip().split("      ")[1]
+        name = self.block['InputSampleID']
 
         if name.startswith('['):
             name = name.split('[')[1].split(']')[0]
@@ -61,59 +71,60 @@ class ParseRunHeader:
         return name
 
 
-    def fix_time(time_list: list) -> dict:
-        total = 0
-        time_dict = {}
-        if time_list[0] == "CANNOT":
-            total = -1
-        else:
-            for i in time_list:
-                if i.endswith('d'):
-                    total += int(i.split('d')[0]) * 86400        # number of days * seconds in day
-                elif i.endswith('h'):
-                    total += (int(i.split('h')[0]) * 60) * 60    # number of hours * minutes in hour * seconds in minute
-                elif i.endswith('ms'):
-                    total += int(float(i.split('ms')[0])) * 1000 # number of miliseconds in seconds
-                elif i.endswith('m'):
-                    total += int(i.split('m')[0]) * 60           # number of minutes * seconds in minute
-                elif i.endswith('s'):
-                    total += int(float(i.split('s')[0]))         # nothing.. it's already in seconds
-                else:
-                    total = int(float(i))                        # nothing.. means its the newer formats which are already converted
-            time_dict['s'] = total
-            time_dict['m'] = round(total / 60, 2)
-            time_dict['h'] = round(( total / 60 ) / 60, 2)
-        return time_dict
-
-
-    def fix_data(input_data: str) -> list:
-        if 'cn' in input_data.split(':')[3].split('],')[0]:
-            count_files = eval(input_data.split(':')[3].split(',')[0]) # split data into per list from collection of lists
+    def parse_input(input_data: str) -> dict:
+        """
+        Parse a groovy [[meta map], path(s)] input field without eval, e.g.
+        [[id:cram, sz:[123, 456], cn:4], [/a.cram, /b.cram]]
+        becomes {'meta': {'id': 'cram', 'sz': [123, 456], 'cn': 4}, 'paths': ['/a.cram', '/b.cram']}
+        """
+        matched = GROOVY_INPUT.match(input_data)
+        if not matched:
+            raise ValueError(f"Can't parse input data: {input_data}")
+
+        meta = {key: ParseRunHeader.groovy_value(value) for key, value in GROOVY_ENTRY.findall(matched.group('meta'))}
+        paths = matched.group('paths').strip()
+        if paths.startswith('['):
+            paths = [i.strip() for i in paths[1:-1].split(',')]
         else:
-            count_files = eval(input_data.split(':')[3].split('],')[0]) # split data into per list from collection of lists
+            paths = [paths]
+        return {'meta': meta, 'paths': paths}
+
+
+    def groovy_value(token: str):
+        """
+        Type a single groovy value: [lists], integers and everything else as a string.
+        null stays the string 'null', as the tickets of older runs (tk:null) always read
+        """
+        token = token.strip()
+        if token[:1] == '[':
+            inner = token[1:-1]
+            return [ParseRunHeader.groovy_value(i) for i in inner.split(',')] if inner.strip() else []
+        if token[:1] in GROOVY_NUMBER_START and GROOVY_INT.fullmatch(token):
+            return int(token)
+        return token
+
+
+    def fix_data(input_data: dict) -> list:
+        count_files = input_data['meta']['sz']
         if not isinstance (count_files, list):  # catches not a list objects
             count_files = [count_files]
         return count_files
 
 
-    def get_container(input_data: str) -> int:
-        if 'cn' in input_data:
-            cn_no = re.findall(f"cn:([0-9]*)", input_data)
-            if cn_no:
-                return cn_no[0]
-            else:
-                return np.nan
-        else:
+    def get_container(input_data: dict) -> int:
+        cn_no = input_data['meta'].get('cn')
+        if cn_no in [None, 'null']:             # Missing or cn:null
             return np.nan
+        return cn_no
 
 
-
-    def fix_fasta(fasta: str) -> list:
-        split_field = fasta.split('  ')[1].split(':')
-        output_list = [ split_field[1].split(',')[0],
-                    int(split_field[2].split(',')[0]),
-                    split_field[3].split(',')[0],
-                    split_field[4].split(']')[0],
-                    str(split_field[4].split(']')[1][2:])
+    def fix_fasta(fasta: dict) -> list:
+        meta = fasta['meta']
+        clade = meta.get('ln')
+        output_list = [ str(meta['id']),
+                        meta['sz'],
+                        None if clade is None else str(clade),  # Some runs have a numbered clade e.g. ln:5
+                        meta.get('tk'),
+                        str(fasta['paths'][0])
                     ]
-        return output_list
\ No newline at end of file
+        return output_list
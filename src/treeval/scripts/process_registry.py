@@ -0,0 +1,138 @@
+import os
+import json
+
+from master_list import master_list
+from sketch import QuantileSketch
+
+# Padding for a process that didn't run in a run, the same width as ingest.PROCESS_METRICS
+NOT_RUN = ['NA', 'NA', 'NA', 'NA', 'NA', 'NA', 'NA', 'NA']
+
+
+def merge_processes(lists: list, tasks: list) -> list:
+    """
+    One process list (ingest.PROCESS_METRICS) from the lists of processes aliased to the same name in a run.
+    Averages are weighted by the task count of each, totals are summed and the
+    peak memory % is taken again from the summed peak over the averaged request.
+    """
+    if len(lists) == 1:
+        return lists[0]
+    count = sum(tasks)
+    mean = lambda index: sum(i[index] * j for i, j in zip(lists, tasks)) / count
+    # A process with a single task has no TOTAL_PEAK_MEMORY, it is its peak % of its request
+    peaks = [i[7] if len(i) > 7 else i[6] * i[1] / 100 for i in lists]
+    merged = [mean(0), mean(1), sum(i[2] for i in lists), mean(3), mean(4), mean(5)]
+    return merged + [round(sum(peaks) / count / merged[1] * 100, 0) if merged[1] else 0, sum(peaks)]
+
+
+def merge_usage(usages: list) -> list:
+    """
+    One ingest.USAGE_COLUMNS list from several: tasks and seconds are summed, the maxima kept
+    """
+    return [sum(i[j] for i in usages) for j in range(4)] + [max(i[j] for i in usages) for j in range(4, 8)]
+
+
+def merge_sketches(sketches: list) -> dict:
+    """
+    One {metric: sketch dict} from several of the same metrics
+    """
+    if len(sketches) == 1:
+        return sketches[0]
+    merged = {}
+    for metric in sketches[0]:
+        sketch = QuantileSketch.from_dict(sketches[0][metric])
+        for other in sketches[1:]:
+            sketch.merge_dict(other[metric])
+        merged[metric] = sketch.to_dict()
+    return merged
+
+
+class ProcessRegistry:
+    """
+    Every process name seen so far, interned as a small integer id.
+
+    Seeded with master_list so the known processes keep the same ids, new
+    names get the next id the first time a parse result brings them in, so
+    a pipeline release that adds or renames a module no longer stops a batch.
+    aliases maps {pipeline version: {name: canonical name}}, '*' for every
+    version, for modules that were renamed without changing what they do.
+    Lookups are one dict access and only one copy of each name is kept,
+    however many runs and processes there are.
+    """
+
+    def __init__(self, names: list = master_list, aliases: dict = None):
+        self.names      = []                        # id: name
+        self.ids        = {}                        # name: id
+        self.aliases    = aliases or {}
+        for name in names:
+            self.intern(name)
+
+
+    def intern(self, name: str) -> int:
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+
+    def canonical(self, name: str, version: str = '') -> str:
+        return self.aliases.get(version, {}).get(name) or self.aliases.get('*', {}).get(name) or name
+
+
+    def add_result(self, result: dict) -> dict:
+        """
+        Rename the aliased processes of a parse result and intern all of them, returns the result.
+        Processes of one run renamed to the same name are merged into one, not overwritten.
+        """
+        if result['status'] != 'OK':
+            return result
+        version = result['row'][2]
+        groups = {}
+        for name in result['processes']:
+            groups.setdefault(self.canonical(name, version), []).append(name)
+
+        usage = result.get('usage', {})
+        result['processes'] = { process: merge_processes([result['processes'][i] for i in names], [usage[i][0] if i in usage else 1 for i in names])
+                                for process, names in groups.items() }
+        if 'usage' in result:
+            result['usage'] = {process: merge_usage([usage[i] for i in names]) for process, names in groups.items()}
+        if 'sketches' in result:
+            result['sketches'] = {process: merge_sketches([result['sketches'][i] for i in names]) for process, names in groups.items()}
+
+        for process in result['processes']:
+            self.intern(process)
+        return result
+
+
+    def process_row(self, result: dict) -> list:
+        """
+        The process lists of a run in id order, NOT_RUN for the processes it doesn't have
+        """
+        return [result['processes'].get(i, NOT_RUN) for i in self.names]
+
+
+    def process_columns(self) -> list:
+        """
+        The DataFrame columns of process_row, the process ids. names[id] is the name to show
+        """
+        return list(range(len(self.names)))
+
+
+    def to_dict(self) -> dict:
+        return {'processes': self.names, 'aliases': self.aliases}
+
+
+    def load(path: str) -> 'ProcessRegistry':
+        """
+        The registry saved at path, or a new one seeded with master_list when there is none yet
+        """
+        if not path or not os.path.exists(path):
+            return ProcessRegistry()
+        with open(path) as file:
+            data = json.load(file)
+        # Saved names first so their ids don't move, then anything added to master_list since
+        return ProcessRegistry(data.get('processes', []) + master_list, data.get('aliases', {}))
+
+
+    def save(self, path: str):
+        from watch import write_atomic              # watch imports aggregates, which imports this module
+        write_atomic(path, json.dumps(self.to_dict(), indent=2) + '\n')
@@ -0,0 +1,188 @@
+import math
+from collections import Counter
+
+from ingest import RUN_COLUMNS, USAGE_COLUMNS
+
+# Run sizes the memory of a process can be modelled against, by their RUN_COLUMNS name.
+# A size is only used when it is given a Groovy expression (--predictors) which gives the
+# same value inside the process' resource closure, TreeVal has no such inputs of its own.
+PREDICTORS = ['Fasta_(mb)', 'HiC_(TOTAL_GB)', 'Longread_(TOTAL_GB)', 'HIC_CONTAINERS']
+
+MEMORY_FLOOR = 100                                  # MB, the smallest memory request made
+MIN_R2 = 0.5                                        # A size model must explain at least this much of the peak_rss
+CPU_QUANTILE = 0.9                                  # Runs whose busiest task's share of its cpus must be covered
+
+
+def fit_line(x: list, y: list) -> tuple:
+    """
+    Least squares y = a + b * x, returns (a, b, r2), None when x doesn't vary
+    """
+    n = len(x)
+    mean_x, mean_y = sum(x) / n, sum(y) / n
+    sxx = sum((i - mean_x) ** 2 for i in x)
+    if sxx == 0:
+        return None
+    sxy = sum((i - mean_x) * (j - mean_y) for i, j in zip(x, y))
+    syy = sum((j - mean_y) ** 2 for j in y)
+    b = sxy / sxx
+    a = mean_y - b * mean_x
+    r2 = sxy ** 2 / (sxx * syy) if syy else 0.0
+    return a, b, r2
+
+
+class ResourceRecommender:
+    """
+    Per process cpus / memory requests proposed from the history of every run.
+
+    Memory is a constant, the largest peak_rss of the process in any run
+    plus the safety margin. With expressions ({predictor: Groovy expression})
+    the max peak_rss of each run is also fitted by least squares against
+    each of those PREDICTORS. The size explaining most of it (at least
+    MIN_R2, growing with the size) is kept and becomes a closure on its
+    expression. The line is raised by its largest residual so it covers
+    every run seen, then by the safety margin. Using more cpus than requested
+    only slows a task down where too little memory kills it, so cpus are the
+    usual request scaled to the share of it (%cpu / 100 / cpus) the busiest
+    task used in CPU_QUANTILE of the runs, plus the margin, never more than
+    the usual request.
+    Both are multiplied by task.attempt in the config, so a retry still gets more.
+    """
+
+    def __init__(self, margin: float = 0.2, min_runs: int = 5, expressions: dict = None):
+        self.margin         = margin
+        self.min_runs       = min_runs
+        self.expressions    = expressions or {}     # predictor: Groovy expression
+        self.runs           = {}                    # process: [(sizes, usage)]
+
+
+    def add_result(self, result: dict):
+        if result['status'] != 'OK':
+            return
+        sizes = {i: result['row'][RUN_COLUMNS.index(i)] for i in PREDICTORS}
+        for process, usage in result.get('usage', {}).items():
+            self.runs.setdefault(process, []).append((sizes, dict(zip(USAGE_COLUMNS, usage))))
+
+
+    def recommend_process(self, runs: list) -> dict:
+        peaks = [i[1]['MAX_PEAK_RSS'] for i in runs]
+        model = {'predictor': None, 'intercept': max(peaks), 'slope': 0.0, 'r2': None}
+
+        for predictor in [i for i in PREDICTORS if i in self.expressions]:
+            x = [i[0][predictor] for i in runs]
+            if not all(isinstance(i, (int, float)) and math.isfinite(i) for i in x):
+                continue
+            fit = fit_line(x, peaks)
+            if fit is None or fit[1] <= 0 or fit[2] < MIN_R2:
+                continue
+            if model['r2'] is None or fit[2] > model['r2']:
+                a, b, r2 = fit
+                a += max(j - (a + b * i) for i, j in zip(x, peaks))
+                model = {'predictor': predictor, 'intercept': a, 'slope': b, 'r2': r2}
+
+        model['intercept'] *= 1 + self.margin
+        model['slope'] *= 1 + self.margin
+        share = sorted(i[1]['MAX_CORES_USED'] / i[1]['MAX_CPUS'] for i in runs)
+        share = share[min(len(share) - 1, math.ceil(CPU_QUANTILE * len(share)) - 1)]
+        requested = Counter(i[1]['MAX_CPUS'] for i in runs).most_common(1)[0][0]
+        model['cpus'] = min(max(1, math.ceil(requested * share * (1 + self.margin))), requested)
+        model['cpus_above'] = sum(1 for i in runs if i[1]['MAX_CPUS'] < model['cpus'])
+        model['runs'] = len(runs)
+        return model
+
+
+    def memory(self, model: dict, sizes: dict) -> float:
+        """
+        Memory in MB the model gives a run of these sizes
+        """
+        value = model['intercept']
+        if model['predictor']:
+            value += model['slope'] * sizes[model['predictor']]
+        return max(MEMORY_FLOOR, math.ceil(value))
+
+
+    def recommend(self) -> dict:
+        """
+        {process: model} of every process seen in at least min_runs runs
+        """
+        return {process: self.recommend_process(runs) for process, runs in sorted(self.runs.items()) if len(runs) >= self.min_runs}
+
+
+    def savings(self, models: dict) -> dict:
+        """
+        {process: [runs, core hours now, core hours recommended, GB hours now, GB hours recommended]}
+        over the history, each task holding its request for its realtime.
+        The realtime of a task is only taken to stay the same when its cpus
+        are cut, so runs which asked for fewer cpus than recommended (counted
+        in model['cpus_above']) keep their core hours instead of showing a loss.
+        """
+        output = {}
+        for process, model in models.items():
+            totals = [model['runs'], 0.0, 0.0, 0.0, 0.0]
+            for sizes, usage in self.runs[process]:
+                totals[1] += usage['CPU_S'] / 3600
+                totals[2] += (model['cpus'] * usage['REALTIME_S'] if model['cpus'] <= usage['MAX_CPUS'] else usage['CPU_S']) / 3600
+                totals[3] += usage['MB_S'] / 1000 / 3600
+                totals[4] += self.memory(model, sizes) * usage['REALTIME_S'] / 1000 / 3600
+            output[process] = totals
+        return output
+
+
+    def config_text(self, models: dict) -> str:
+        """
+        A Nextflow config fragment with one withName block per process
+        """
+        lines = [   "// Resource requests proposed by ProjectStats --recommend",
+                    f"// from the runs seen, with a {self.margin:.0%} safety margin.",
+                ]
+        if self.expressions:
+            lines.append("// Size based memory closures use these expressions (from --predictors):")
+            lines += [f"//     {k:<22} {v}" for k, v in self.expressions.items()]
+        lines.append("process {")
+        for process, model in models.items():
+            if model['predictor']:
+                memory = f"1.MB * Math.ceil(Math.max({MEMORY_FLOOR}, {model['intercept']:.1f} + {model['slope']:.4f} * ({self.expressions[model['predictor']]})))"
+                note = f"  // {model['predictor']}, r2 {model['r2']:.2f}, {model['runs']} runs"
+            else:
+                memory = f"{max(MEMORY_FLOOR, math.ceil(model['intercept']))}.MB"
+                note = f"  // constant, {model['runs']} runs"
+            if model['cpus_above']:
+                note += f", cpus above the request of {model['cpus_above']} runs"
+            lines += [  f"    withName: '.*:{process}' {{{note}",
+                        f"        cpus   = {{ {model['cpus']} * task.attempt }}",
+                        f"        memory = {{ {memory} * task.attempt }}",
+                        "    }"
+                    ]
+        lines.append("}")
+        return '\n'.join(lines) + '\n'
+
+
+    def savings_table(self, models: dict, savings: dict) -> str:
+        """
+        Tab separated model and projected savings per process, with a TOTAL row
+        """
+        lines = ["PROCESS\tRUNS\tPREDICTOR\tR2\tCPUS\tRUNS_CPUS_ABOVE_REQUEST\tCORE_HOURS\tCORE_HOURS_NEW\tCORE_HOURS_SAVED\tGB_HOURS\tGB_HOURS_NEW\tGB_HOURS_SAVED"]
+        total = [0.0] * 4
+        for process, model in models.items():
+            runs, cores, cores_new, gb, gb_new = savings[process]
+            total = [i + j for i, j in zip(total, [cores, cores_new, gb, gb_new])]
+            r2 = '' if model['r2'] is None else round(model['r2'], 3)
+            lines.append(   f"{process}\t{runs}\t{model['predictor'] or 'constant'}\t{r2}\t{model['cpus']}\t{model['cpus_above']}\t"
+                            f"{cores:.2f}\t{cores_new:.2f}\t{cores - cores_new:.2f}\t{gb:.2f}\t{gb_new:.2f}\t{gb - gb_new:.2f}"
+                        )
+        cores, cores_new, gb, gb_new = total
+        lines.append(f"TOTAL\t\t\t\t\t\t{cores:.2f}\t{cores_new:.2f}\t{cores - cores_new:.2f}\t{gb:.2f}\t{gb_new:.2f}\t{gb - gb_new:.2f}")
+        return '\n'.join(lines) + '\n'
+
+
+    def summary_text(self, models: dict, savings: dict) -> str:
+        breaker = f"{'-'*50}\n"
+        cores, cores_new, gb, gb_new = [sum(i[j] for i in savings.values()) for j in range(1, 5)]
+        sized = sum(1 for i in models.values() if i['predictor'])
+        above = sum(1 for i in models.values() if i['cpus_above'])
+        return (    breaker + "Resource recommendations:\n"
+                    + f"{len(models)} processes ({sized} sized by input) from at least {self.min_runs} runs each\n"
+                    + f"{above} processes get more cpus than some of their runs asked for, see RUNS_CPUS_ABOVE_REQUEST\n"
+                    + f"Core hours: {cores:.1f} -> {cores_new:.1f} ({cores - cores_new:.1f} saved)\n"
+                    + f"GB hours:   {gb:.1f} -> {gb_new:.1f} ({gb - gb_new:.1f} saved)\n"
+                    + breaker
+                )
@@ -0,0 +1,442 @@
+"""
+The full report: the per run DataFrame, the matplotlib / plotly graphs and
+StatsSummary.txt. Only imported by ProjectStats when graphs are made,
+pandas, matplotlib, plotly and seaborn together take seconds to import.
+"""
+import json
+import gzip
+import base64
+from sys import stdout
+from concurrent.futures import ProcessPoolExecutor
+import plotly.express as px
+import plotly
+from plotly.offline import get_plotlyjs
+import pandas as pd
+import numpy as np
+import matplotlib
+import matplotlib.transforms as transforms
+from matplotlib.figure import Figure
+import seaborn as sns
+
+from ingest import CO2_COLUMNS, PROCESS_METRICS
+from general_functions import Colours
+from html_template import html_report_compact
+
+
+def subset_dataframe(data_df: pd.DataFrame, ticket: list):
+    if len(ticket) > 0:
+        df = data_df[data_df["Ticket"].isin(ticket)]
+    else:
+        df = data_df
+    return df
+
+
+def expand_process_columns(data_df: pd.DataFrame, processes: list) -> pd.DataFrame:
+    """
+    Split the per process lists (see ingest.PROCESS_METRICS) into
+    {process}-{metric} float columns. data_df has a column of lists per
+    process id (ProcessRegistry.process_columns), processes is the registry's
+    names so processes[id] is the name used for the new columns.
+
+    All of the new columns are filled into one numpy block and joined onto
+    the dataframe once, processes which didn't run ('NA' lists) and short lists
+    are left as NaN. The list columns are dropped, nothing reads them once
+    they're expanded and they're object columns the size of the whole block.
+    """
+    width = len(PROCESS_METRICS)
+    block = np.full((len(data_df), len(processes) * width), np.nan)
+
+    for position in range(len(processes)):
+        start = position * width
+        for row, values in enumerate(data_df[position].to_list()):
+            if values[0] != 'NA':
+                block[row, start:start + len(values)] = values
+
+    columns = [f'{i}-{metric}' for i in processes for metric in PROCESS_METRICS]
+    data_df = data_df.drop(columns=list(range(len(processes))))
+    return pd.concat([data_df, pd.DataFrame(block, index=data_df.index, columns=columns)], axis=1)
+
+
+def add_co2_columns(data_df: pd.DataFrame, co2_index: dict) -> pd.DataFrame:
+    """
+    Join the per run co2footprint totals (see ingest.CO2_COLUMNS) on sample id,
+    runs without a co2footprint file are left as NaN.
+    """
+    samples = data_df['Unique_name'].str.rsplit('-', n=1).str[0]
+    for position, column in enumerate(CO2_COLUMNS):
+        data_df[column] = samples.map({k: v[position] for k, v in co2_index.items()}).astype(float)
+    return data_df
+
+
+def efficiency_summary(data: pd.DataFrame) -> list:
+    return [
+            f"CPU min/max {round(min(data['CPU_EFF']), 2)}% / {round(max(data['CPU_EFF']), 2)}%",
+            f"MEM min/max {round(min(data['MEM_EFF']), 2)}% / {round(max(data['MEM_EFF']), 2)}%"
+            ]
+
+
+# Entry point subsets every figure can be drawn for, each is filtered once per report
+SUBSETS = ['ALL', 'FULL', 'RAPID']
+
+# Columns made from other columns before any figure is drawn: {new: (column, divide by)}
+DERIVED_COLUMNS = {
+    'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY_(GB)': ('HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY', 1000)
+}
+
+# Keyword arguments of plotly express which name a column of the dataframe
+COLUMN_ARGUMENTS = ['x', 'y', 'z', 'color', 'symbol', 'size', 'facet_col', 'facet_row', 'hover_data']
+
+RUNTIME_LABELS = {'Fasta_(mb)': 'Fasta Size (MB)', 'Duration_(Hrs)': 'Runtime (Hours)', 'Clade': 'Clade'}
+OLS_LOG_X = {'trendline': 'ols', 'trendline_options': dict(log_x=True)}
+OLS_OVERALL = {**OLS_LOG_X, 'trendline_scope': 'overall', 'trendline_color_override': 'black'}
+
+# The plotly figures of the HTML report, one line per chart.
+# section, kind (a plotly express function), title and subsets are used here,
+# everything else is passed straight to plotly express. Title gets " - {subset}"
+# added. Figures whose columns are missing (e.g. no --co2footprint) are skipped.
+# A section may take several specs, their figures are kept in spec order.
+FIGURE_SPECS = [
+    {'section': 'mem vs hic data', 'kind': 'scatter', 'subsets': ['ALL'], 'title': 'Size of HIC data (GB) against Peak memory for Super Module',
+        'x': 'HiC_(TOTAL_GB)', 'y': 'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY_(GB)', 'color': 'Clade', 'hover_data': ['Unique_name'], 'height': 400, **OLS_LOG_X,
+        'labels': {'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY_(GB)': 'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT-TOTAL_PEAK_MEMORY'}},
+    {'section': 'Genome Size vs. Runtime', 'kind': 'scatter', 'subsets': SUBSETS, 'title': 'Size of Genome (MB) against runtime (Hours)',
+        'x': 'Duration_(Hrs)', 'y': 'Fasta_(mb)', 'color': 'Clade', 'hover_data': ['Unique_name'], 'labels': RUNTIME_LABELS, 'height': 400, **OLS_LOG_X},
+    {'section': 'Clade vs. Runtime', 'kind': 'scatter', 'subsets': SUBSETS, 'title': 'Clade group against Runtime (Hours)',
+        'x': 'Clade', 'y': 'Duration_(Hrs)', 'color': 'Clade', 'height': 400},
+    {'section': 'Family vs. Runtime', 'kind': 'scatter', 'subsets': SUBSETS, 'title': 'Clade group against Runtime (Hours)',
+        'x': 'Prefix', 'y': 'Duration_(Hrs)', 'color': 'Clade', 'height': 400},
+    {'section': 'Longread vs. Runtime', 'kind': 'scatter', 'subsets': SUBSETS, 'title': 'Total PacBio data against runtime (Hours)',
+        'x': 'Duration_(Hrs)', 'y': 'Longread_(TOTAL_GB)', 'color': 'Clade', 'hover_data': ['Prefix'], 'height': 400, **OLS_OVERALL},
+    {'section': 'HiC vs. Runtime', 'kind': 'scatter', 'subsets': ['ALL', 'FULL'], 'title': 'Total amount of CRAM data against runtime (Hours)',
+        'x': 'Duration_(Hrs)', 'y': 'HiC_(TOTAL_GB)', 'color': 'Clade', 'hover_data': ['Prefix'], 'height': 400},
+    {'section': 'HiC vs. Runtime', 'kind': 'scatter', 'subsets': ['RAPID'], 'title': 'Total amount of CRAM data against runtime (Hours)',
+        'x': 'Duration_(Hrs)', 'y': 'HiC_(TOTAL_GB)', 'color': 'Clade', 'hover_data': ['Prefix'], 'height': 400, **OLS_OVERALL},
+    {'section': '3D Graphs', 'kind': 'scatter_3d', 'subsets': SUBSETS, 'title': 'Size of Genome (MB) against runtime (Hours)',
+        'x': 'Duration_(Hrs)', 'y': 'Fasta_(mb)', 'z': 'HiC_(TOTAL_GB)', 'color': 'Clade', 'hover_data': ['Prefix'], 'height': 1000},
+    {'section': 'CO2e vs. Runtime', 'kind': 'scatter', 'subsets': SUBSETS, 'title': 'CO2e (g) against runtime (Hours)',
+        'x': 'Duration_(Hrs)', 'y': 'CO2e_(g)', 'color': 'Clade', 'hover_data': ['Unique_name', 'Energy_(Wh)'], 'height': 400},
+]
+
+
+def spec_columns(spec: dict) -> list:
+    """
+    The dataframe columns a figure spec reads
+    """
+    columns = []
+    for argument in COLUMN_ARGUMENTS:
+        value = spec.get(argument)
+        for column in (value if isinstance(value, list) else [value]):
+            if column is not None and column not in columns:
+                columns.append(column)
+    return columns
+
+
+def render_figure(task: tuple) -> str:
+    """
+    Draw one figure spec for one subset and return the plotly div.
+    Runs in the worker pool, so only the columns the figure needs are sent.
+    """
+    spec, subset, frame = task
+    arguments = {k: v for k, v in spec.items() if k not in ['section', 'kind', 'title', 'subsets']}
+    fig = getattr(px, spec['kind'])(frame, title = f"{spec['title']} - {subset}", **arguments)
+    return plotly.offline.plot(fig, include_plotlyjs=False, output_type='div')
+
+
+def figure_frame(data_df: pd.DataFrame, specs: list = FIGURE_SPECS) -> tuple:
+    """
+    The columns the figures read (plus Entry_Point for the subsets), with the
+    DERIVED_COLUMNS added. Specs whose columns are missing are dropped.
+    Returns (frame, specs)
+    """
+    derived = {i: data_df[source] / divisor for i, (source, divisor) in DERIVED_COLUMNS.items() if source in data_df}
+    specs = [i for i in specs if all(ii in data_df or ii in derived for ii in spec_columns(i))]
+
+    columns = ['Entry_Point']
+    for spec in specs:
+        columns += [i for i in spec_columns(spec) if i not in columns]
+
+    frame = pd.DataFrame({i: derived[i] if i in derived else data_df[i] for i in columns}, index=data_df.index)
+    return frame, specs
+
+
+def render_figures(data_df: pd.DataFrame, specs: list = FIGURE_SPECS, jobs: int = 1) -> dict:
+    """
+    Render every figure spec for each of its subsets.
+
+    The entry point subsets are filtered once and shared by all specs, the
+    figures are drawn over `jobs` processes. Returns {section: [divs]} in
+    spec order, ready for html_report.
+    """
+    frame, specs = figure_frame(data_df, specs)
+    subsets = {i: frame if i == 'ALL' else frame[frame['Entry_Point'] == i] for i in SUBSETS}
+
+    tasks = [ (spec, subset, subsets[subset][spec_columns(spec)]) for spec in specs for subset in spec['subsets'] ]
+
+    if jobs <= 1 or len(tasks) <= 1:
+        divs = [render_figure(i) for i in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            divs = list(pool.map(render_figure, tasks))
+
+    sections = {}
+    for (spec, _, _), div in zip(tasks, divs):
+        sections.setdefault(spec['section'], []).append(div)
+    return sections
+
+
+def figure_payload(frame: pd.DataFrame, compress: bool = False) -> str:
+    """
+    The figure columns as one columnar JSON document for the compact report.
+    Text columns are stored once per distinct value (levels) plus an index per
+    row (codes), numbers as plain lists with null for NaN.
+    With compress the JSON is gzipped and base64 encoded.
+    """
+    columns = {}
+    for name in frame:
+        column = frame[name]
+        if pd.api.types.is_numeric_dtype(column):
+            columns[name] = column.astype(object).where(column.notna(), None).tolist()
+        else:
+            codes, levels = pd.factorize(column)
+            columns[name] = {'levels': levels.tolist(), 'codes': [None if i < 0 else int(i) for i in codes]}
+
+    text = json.dumps({'rows': len(frame), 'columns': columns}, separators=(',', ':'))
+    if compress:
+        return base64.b64encode(gzip.compress(text.encode())).decode()
+    return text.replace('</', '<\\/')     # Can't close the <script> it sits in
+
+
+def compact_report(cli_output: str, data_shape: list, data_df: pd.DataFrame, specs: list = FIGURE_SPECS, compress: bool = False) -> str:
+    """
+    A self contained HTML report: plotly.js is inlined once, the figure
+    columns are stored once and every figure is built from them in the browser
+    """
+    frame, specs = figure_frame(data_df, specs)
+    return html_report_compact(cli_output, data_shape, get_plotlyjs(), figure_payload(frame, compress), specs, compress)
+
+
+# The PNGs are drawn on explicit Figure objects with the Agg canvas rather than
+# through pyplot, so no global state is shared and they can be drawn in a pool
+SUPER_MODULE = 'HIC_MAPPING:CRAM_FILTER_ALIGN_BWAMEM2_FIXMATE_SORT'
+
+
+def plot_efficiency(data: pd.DataFrame, outdir: str) -> list:
+    data = data.copy()
+    data.index.name = 'Org'
+    data = data.reset_index()
+    paths = []
+
+    for k, v in {'MEM':1000, 'CPU': 50}.items():
+        fig = Figure()
+        ax = fig.add_subplot()
+        ax.scatter(x = data['Org'], y = data[f'{k}_EFF'])
+        ax.axhline(y=np.nanmean(data[f'{k}_EFF']), linestyle='--', color='red', label='Avg')
+        ax.axhline(y=100, linestyle='solid', color='black', label='AIM')
+        ax.set_yticks(np.arange(0, max(data[f'{k}_EFF']), v))
+
+        value = ( '' if k == 'CPU' else 'PEAK ')
+
+        ax.set_xlabel('Org')
+        ax.set_ylabel(f'{k} (%)')
+        ax.set_title(f"REQUESTED {k} AS % MORE THAN {value}USAGE")
+        ax.tick_params(axis='x', labelrotation=90)
+
+        paths.append(f'{outdir}Efficiency_{k}.png')
+        fig.savefig(paths[-1])
+
+    return paths
+
+
+def plot_average_mem_of_super_module(data_df: pd.DataFrame, outdir: str) -> list:
+    # TODO: function needs generalising
+    mean = np.nanmean(data_df[f'{SUPER_MODULE}-AVERAGE_PEAK_MEMORY'])
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    points = ax.scatter(x = data_df['Unique_name'],
+                y = data_df[f'{SUPER_MODULE}-AVERAGE_P_MEM'],
+                c = data_df['Fasta_(mb)'],
+                cmap = matplotlib.cm.bwr,
+                norm=matplotlib.colors.LogNorm())
+    fig.colorbar(points, ax=ax)
+    ax.set_title("\n".join(f'{SUPER_MODULE}-AVERAGE_P_MEM'.split(':')))
+    ax.set_ylabel('Memory Utilisation (%)')
+    ax.set_ylim(0,110)
+
+    ax2 = ax.twinx()
+    ax2.set(ylim=(0,110))
+
+    ax2.scatter(x = data_df['Unique_name'],
+                y = data_df[f'{SUPER_MODULE}-AVERAGE_PEAK_MEMORY']
+    )
+    ax2.axhline(y=mean, linestyle='--', color='red', label='Avg')
+
+    trans = transforms.blended_transform_factory(ax2.transAxes, ax2.transData)
+
+    ax2.text(0,mean, "{:.0f}".format(mean), color="red", transform=trans,
+        ha="right", va="center")
+
+    fig.savefig(f'{outdir}HIC_super_module_average_mem.png')
+    return [f'{outdir}HIC_super_module_average_mem.png']
+
+
+def plot_average_cpu_of_super_module(data_df: pd.DataFrame, outdir: str) -> list:
+    fig = Figure()
+    ax = fig.add_subplot()
+    points = ax.scatter(x = data_df['Unique_name'],
+                y = data_df[f'{SUPER_MODULE}-AVERAGE_P_CPU'],
+                c = data_df['Fasta_(mb)'],
+                cmap = matplotlib.cm.bwr,
+                norm=matplotlib.colors.LogNorm())
+    fig.colorbar(points, ax=ax)
+    ax.set_title("\n".join(f'{SUPER_MODULE}-AVERAGE_P_CPU'.split(':')))
+    ax.set_ylabel('CPU Utilisation (%)')
+    ax.set_ylim(0,1600)
+
+    fig.savefig(f'{outdir}HIC_super_module_average_cpu.png')
+    return [f'{outdir}HIC_super_module_average_cpu.png']
+
+
+def boxplot_groups(processes: list) -> dict:
+    """
+    {subworkflow: [processes]} for every process that runs inside a subworkflow.
+
+    Processes are grouped on their whole parent path, so nested subworkflows
+    (GENE_ALIGNMENT:CDS_ALIGNMENTS, GENE_ALIGNMENT:CDS_ALIGNMENTS:PUNCHLIST, ...)
+    each get their own boxplot instead of being collapsed into GENE_ALIGNMENT.
+    Processes outside of a subworkflow (CUSTOM_DUMPSOFTWAREVERSIONS) are left out.
+    """
+    groups = {}
+    for process in processes:
+        if ':' in process:
+            groups.setdefault(process.rsplit(':', 1)[0], []).append(process)
+    return groups
+
+
+def generate_new_column_names(column_names):
+    return ["CRAM_SUPER_MODULE" if i.split(':')[-1].startswith('CRAM') else 'Unique_name' if i == 'Unique_name' else i.split(':')[-1].split('-')[0] for i in column_names]
+
+
+def plot_mem_boxplots(name: str, entry: str, data_df: pd.DataFrame, list_of_processes: list, verbose: bool, outdir: str) -> list:
+    """
+    Boxplot of AVERAGE_P_MEM per process of one subworkflow, with the max
+    AVERAGE_PEAK_MEMORY of each process on the second axis.
+    data_df is already the subset for entry.
+    """
+    # GENERATE LISTS FOR: 1) WHAT WE WANT IT CALLED, 2) WHAT FIRST DATASET IS CURRENTLY CALLED, 3) WHAT SECOND DATASET IS CURRENTLY CALLED
+    processes       = generate_new_column_names(list_of_processes)
+    processes_mem   = [i + "-AVERAGE_P_MEM" for i in list_of_processes]
+    processes_peak  = [i + "-AVERAGE_PEAK_MEMORY" for i in list_of_processes]
+
+    data_df_P_mem   = data_df[processes_mem].copy()
+    data_df_P_mem.columns = processes
+
+    peak = data_df[processes_peak].max()        # Get the max value per process
+    peak.index = processes
+    if verbose:
+        print(f"---\n\n>>> {name}_{entry}")
+        print(peak)
+
+    # Actually generates the graph
+    fig = Figure(figsize=(25,25))
+    ax = fig.add_subplot()
+    sns.boxplot(data=data_df_P_mem, ax=ax, legend=False)
+    ax.set(ylim=(0,110))
+    ax2 = ax.twinx()
+    ax2.set(ylim=(0,110))
+    ax2.scatter(x = range(len(processes)), y = peak.values, color='red')
+    ax.set_xticks(range(len(processes)))
+    ax.set_xticklabels(processes, rotation=90, fontsize=6)
+    ax.set_xlabel("Process", fontsize=6)
+    fig.subplots_adjust(bottom=0.4)
+
+    path = f"{outdir}mem_for_{name.replace(':', '-')}_{entry}.png"
+    fig.savefig(path)
+    return [path]
+
+
+def render_png(task: tuple) -> list:
+    """
+    Run one plotting function of render_pngs, in a worker of the pool
+    """
+    function, arguments = task
+    return function(**arguments)
+
+
+def render_pngs(data_df: pd.DataFrame, efficiency_df: pd.DataFrame, outdir: str, jobs: int = 1, verbose: bool = False) -> list:
+    """
+    Draw every PNG of the report into outdir over `jobs` processes: the
+    efficiency scatters, the HIC super module plots and a memory boxplot for
+    each subworkflow (see boxplot_groups) x ALL / FULL / RAPID.
+    Each task is only sent the columns it plots. Returns the paths written.
+    """
+    super_module = ['Unique_name', 'Fasta_(mb)'] + [f'{SUPER_MODULE}-{i}' for i in ['AVERAGE_P_MEM', 'AVERAGE_PEAK_MEMORY', 'AVERAGE_P_CPU']]
+    tasks = [   (plot_efficiency, {'data': efficiency_df, 'outdir': outdir}),
+                (plot_average_mem_of_super_module, {'data_df': data_df[super_module], 'outdir': outdir}),
+                (plot_average_cpu_of_super_module, {'data_df': data_df[super_module], 'outdir': outdir})
+            ]
+
+    subsets = {i: data_df if i == 'ALL' else data_df[data_df['Entry_Point'] == i] for i in SUBSETS}
+    plotted = [i[:-len('-AVERAGE_P_MEM')] for i in data_df.columns if i.endswith('-AVERAGE_P_MEM')]
+    for name, processes in boxplot_groups(plotted).items():
+        columns = [f'{i}-{metric}' for i in processes for metric in ['AVERAGE_P_MEM', 'AVERAGE_PEAK_MEMORY']]
+        for entry, subset in subsets.items():
+            # Nothing to draw when none of the processes ran for this entry point
+            if subset[columns[::2]].notna().any().any():
+                tasks.append((plot_mem_boxplots, {  'name': name, 'entry': entry, 'data_df': subset[columns],
+                                                    'list_of_processes': processes, 'verbose': verbose, 'outdir': outdir }))
+
+    if jobs <= 1 or len(tasks) <= 1:
+        paths = [render_png(i) for i in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            paths = list(pool.map(render_png, tasks))
+    return [i for path in paths for i in path]
+
+
+def print_report(data_df: pd.DataFrame, time: list, efficiency: list, empties: list, broken: list, verbose: bool, outdir: str, skipped: list = []):
+    breaker = f"{'-'*50}\n"
+
+    output_list = breaker + "TreeVal Project Summary Stats! \n" + breaker + f"Total data points: {len(data_df)}\n" + breaker + f"Unique CLADE count:\n{data_df['Clade'].value_counts()}\n" + breaker + f"Run Type Count:\n{data_df['Entry_Point'].value_counts()}\n" + breaker + f"Ticket Type Count:\n{data_df['Ticket'].value_counts()}\n" + breaker + '\n'.join(efficiency) + breaker
+
+    if verbose:
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"{Colours.BLUE}TreeVal{Colours.END}{Colours.RED}Project{Colours.END}.{Colours.GREEN}Summary{Colours.END} {Colours.YELLOW}Stats{Colours.END}!\n")
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"Total data points: {len(data_df)} \n")
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"Unique CLADE count:\n{data_df['Clade'].value_counts()}\n")
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"Run Type Count:\n{data_df['Entry_Point'].value_counts()}\n")
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"Ticket Type Count:\n{data_df['Ticket'].value_counts()}\n")
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"Efficiency across all runs:\n")
+        for i in efficiency:
+            stdout.write(f"{i}\n")
+        if len(empties) >= 1:
+            [stdout.write(f"Empty Files!:\n{i}\n") for i in empties]
+            stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        if len(broken) >= 1:
+            [stdout.write(f"Unparsable Files!:\n{i}\n") for i in broken]
+            stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        if len(skipped) >= 1:
+            [stdout.write(f"Skipped Files!:\n{i}\n") for i in skipped]
+            stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+
+    if not verbose:
+        with open(f"{outdir}StatsSummary.txt", 'w') as file:
+            file.write(output_list)
+
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+        stdout.write(f"""{Colours.BLUE}TreeVal{Colours.END}{Colours.RED}Project{Colours.END}.{Colours.GREEN}Summary{Colours.END} {Colours.YELLOW}Stats{Colours.END}!
+ALL DONE!!
+I took: {round(time[1] - time[0], 2)} Seconds!
+
+Now some efficiency for everything so far:
+{efficiency}
+
+""")
+        stdout.write(f"{Colours.HEADER}-"*50 + f'\n {Colours.END}')
+    return output_list
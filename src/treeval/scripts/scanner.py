@@ -0,0 +1,85 @@
+import os
+import zlib
+import tarfile
+from fnmatch import fnmatch
+
+from sources import is_archive, stream_archive, decode_member, ARCHIVE_SEPARATOR
+
+
+def matches(name: str, include: list, exclude: list) -> bool:
+    """
+    True when name matches one of the include globs and none of the exclude globs
+    """
+    return any(fnmatch(name, i) for i in include) and not any(fnmatch(name, i) for i in exclude)
+
+
+def scan_archive(path: str, include: list, exclude: list, texts: bool = True, broken: list = None):
+    """
+    Yield (source, text) for the members of an archive whose file names pass the filters,
+    in archive order. The archive is read once, as a stream, and each member is
+    decompressed when it is reached and handed on before the next is read, so
+    only one member's text is held at a time, however big the release.
+    An archive which can't be read (e.g. still being written) raises, or with
+    a broken list is added to it as "{path} | {error}" after the members read before the error.
+    """
+    try:
+        for name, member in stream_archive(path):
+            if matches(os.path.basename(name), include, exclude):
+                yield f"{path}{ARCHIVE_SEPARATOR}{name}", decode_member(name, member.read()) if texts else None
+    except (tarfile.TarError, EOFError, OSError, zlib.error) as error:
+        if broken is None:
+            raise
+        broken.append(f"{path} | {type(error).__name__}: {error}")
+
+
+def scan_sources(path: str, include: list = ['*'], exclude: list = [], recursive: bool = False, texts: bool = True, broken: list = None):
+    """
+    Yield (source, text) for every file under path whose name passes the include / exclude globs.
+
+    Built on os.scandir so the file type comes from the directory entry itself:
+    on Lustre and NFS every stat is a round trip to the metadata server, and
+    no file is stat'ed here, not even for the size (empty files are spotted
+    by the parser when it opens them). Entries are yielded in sorted order per
+    directory as soon as they are found, so ingest_files can start parsing
+    while the rest of the tree is still being listed. Subdirectories are
+    only entered with recursive, and archives (path itself or any file in the
+    tree) are expanded into their members, which come with their text unless
+    texts is False. Plain files come with None and are read by whoever parses them.
+    With recursive each directory is stat'ed once (and only directories), so a
+    symlink pointing back up the tree is entered once instead of forever.
+    For broken see scan_archive.
+    """
+    if is_archive(path):
+        yield from scan_archive(path, include, exclude, texts, broken)
+        return
+    yield from scan_directory(path, include, exclude, recursive, texts, broken, set())
+
+
+def scan_directory(path: str, include: list, exclude: list, recursive: bool, texts: bool, broken: list, visited: set):
+    """
+    scan_sources of a directory, visited holds the (st_dev, st_ino) of the directories already scanned
+    """
+    if recursive:
+        info = os.stat(path)
+        if (info.st_dev, info.st_ino) in visited:
+            return
+        visited.add((info.st_dev, info.st_ino))
+
+    with os.scandir(path) as listing:
+        entries = sorted(listing, key=lambda i: i.name)
+
+    for entry in entries:
+        if entry.is_dir():
+            if recursive:
+                yield from scan_directory(entry.path, include, exclude, recursive, texts, broken, visited)
+        elif is_archive(entry.name):
+            yield from scan_archive(entry.path, include, exclude, texts, broken)
+        elif entry.is_file() and matches(entry.name, include, exclude):
+            yield entry.path, None
+
+
+def scan_files(path: str, include: list = ['*'], exclude: list = [], recursive: bool = False, broken: list = None) -> list:
+    """
+    The sources under path as a list, archive members included but without their text
+    """
+    return [source for source, _ in scan_sources(path, include, exclude, recursive, texts=False, broken=broken)]
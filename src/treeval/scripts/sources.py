@@ -0,0 +1,129 @@
+import os
+import io
+import sys
+import gzip
+import tarfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# A file inside an archive is named {archive}::{member}, e.g. release-1-0-0.tar.gz::runs/TreeVal_run_x.txt
+ARCHIVE_SEPARATOR = '::'
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.zst')
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
+
+def is_archive(path: str) -> bool:
+    return path.endswith(ARCHIVE_SUFFIXES)
+
+
+def is_member(source: str) -> bool:
+    return ARCHIVE_SEPARATOR in source
+
+
+def source_path(source: str) -> str:
+    """
+    The file on disk holding a source, the archive for a member
+    """
+    return source.split(ARCHIVE_SEPARATOR, 1)[0]
+
+
+def source_name(source: str) -> str:
+    """
+    File name of a source as shown in the reports, the member's own name for a member
+    """
+    return os.path.basename(source.split(ARCHIVE_SEPARATOR, 1)[-1])
+
+
+def plain_name(name: str) -> str:
+    """
+    name without its compression suffix, so {sample}-co2footprint.txt.gz still matches CO2_SUFFIX
+    """
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def zstd_reader(handle):
+    if zstandard is None:
+        sys.exit("Reading .zst files needs zstandard: python3 -m pip install zstandard")
+    return zstandard.ZstdDecompressor().stream_reader(handle)
+
+
+def open_text(path: str):
+    """
+    Text handle of a plain, .gz or .zst file, decompressed as it is read
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    if path.endswith('.zst'):
+        return io.TextIOWrapper(zstd_reader(open(path, 'rb')))
+    return open(path)
+
+
+def decode_member(name: str, data: bytes) -> str:
+    """
+    Text of an archive member, which may itself be gzipped or zstd compressed
+    """
+    if name.endswith('.gz'):
+        data = gzip.decompress(data)
+    elif name.endswith('.zst'):
+        if zstandard is None:
+            sys.exit("Reading .zst files needs zstandard: python3 -m pip install zstandard")
+        data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    return data.decode()
+
+
+def stream_archive(path: str):
+    """
+    Yield (member name, open member) for every regular file of a tar archive.
+    The archive is read front to back once as a stream, so a .tar.gz is never
+    decompressed more than once and nothing is unpacked to disk.
+    """
+    with open(path, 'rb') as raw:
+        handle = zstd_reader(raw) if path.endswith('.zst') else raw
+        with tarfile.open(fileobj=handle, mode='r|*') as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member)
+
+
+def member_texts(sources):
+    """
+    Yield (source, text) for each of sources, with the text of archive members and None for plain files.
+    Each archive is walked as a stream while its members come up, so members
+    listed in archive order (as scanner.scan_files lists them) cost one pass
+    per archive and only one member's text is held at a time. A member listed
+    before one already passed reopens its archive, a missing one gets None.
+    """
+    streams = {}
+    try:
+        for source in sources:
+            if not is_member(source):
+                yield source, None
+                continue
+            archive, name = source.split(ARCHIVE_SEPARATOR, 1)
+            yield source, read_member(streams, archive, name)
+    finally:
+        for stream in streams.values():
+            stream.close()
+
+
+def read_member(streams: dict, archive: str, name: str):
+    """
+    Text of member name, read on from where streams[archive] (a stream_archive) stopped
+    """
+    for _ in range(2):
+        fresh = archive not in streams
+        if fresh:
+            streams[archive] = stream_archive(archive)
+        for member_name, member in streams[archive]:
+            if member_name == name:
+                return decode_member(name, member.read())
+        del streams[archive]
+        if fresh:
+            return None
+    return None
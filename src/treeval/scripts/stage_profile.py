@@ -0,0 +1,103 @@
+import json
+import time
+import resource
+import tracemalloc
+from contextlib import contextmanager
+
+from watch import write_atomic
+
+
+class StageProfiler:
+    """
+    Wall time, CPU time and peak memory of each stage of a run, for --profile.
+
+    CPU time covers this process and, once they have exited, its worker
+    processes. Memory is the max RSS of the process so far and how much it
+    grew during the stage; with memory='tracemalloc' the peak of Python
+    allocations during each stage is traced as well, which makes parsing
+    several times slower. When disabled every stage is a no op, so main can
+    always wrap its stages.
+    """
+
+    def __init__(self, enabled: bool = False, top: int = 10, memory: str = 'rss'):
+        self.enabled    = enabled
+        self.top        = top
+        self.traced     = enabled and memory == 'tracemalloc'
+        self.stages     = []
+        self.files      = []
+        self.cached     = 0
+        if self.traced:
+            tracemalloc.start()
+
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        if self.traced:
+            tracemalloc.reset_peak()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss        # KB on Linux
+            stage = {   'stage'             : name,
+                        'wall_s'            : round(wall, 4),
+                        'cpu_s'             : round(cpu, 4),
+                        'workers_cpu_s'     : round(max(0, after.ru_utime + after.ru_stime - children.ru_utime - children.ru_stime), 4),
+                        'max_rss_mb'        : round(max_rss / 1e3, 2),
+                        'rss_growth_mb'     : round((max_rss - rss) / 1e3, 2)
+                    }
+            if self.traced:
+                stage['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            self.stages.append(stage)
+
+
+    def add_files(self, results: list):
+        """
+        Keep the per file timings of parse results made with profile=True, results without any came from the cache
+        """
+        if not self.enabled:
+            return
+        for result in results:
+            if 'profile' not in result:
+                self.cached += result['status'] not in ['EMPTY', 'DUPLICATE']
+                continue
+            self.files.append({'file': result['file'], 'status': result['status'], **result['profile']})
+
+
+    def to_dict(self) -> dict:
+        slowest = sorted(self.files, key=lambda i: i['wall'], reverse=True)[:self.top]
+        return {    'stages'        : self.stages,
+                    'files'         : {     'parsed'            : len(self.files),
+                                            'cached'            : self.cached,
+                                            'wall_s'            : round(sum(i['wall'] for i in self.files), 4),
+                                            'header_s'          : round(sum(i.get('header', 0) for i in self.files), 4),
+                                            'condense_s'        : round(sum(i.get('condense', 0) for i in self.files), 4),
+                                            'slowest'           : [{k: round(v, 4) if isinstance(v, float) else v for k, v in i.items()} for i in slowest]
+                                        }
+                }
+
+
+    def summary_text(self) -> str:
+        breaker = f"{'-'*50}\n"
+        totals = self.to_dict()['files']
+        memory = 'peak_traced_mb' if self.traced else 'max_rss_mb'
+        lines = [breaker + "Profile:\n" + f"{'stage':<32} {'wall (s)':>9} {'cpu (s)':>9} {memory:>15}"]
+        for i in self.stages:
+            lines.append(f"{i['stage']:<32} {i['wall_s']:>9.2f} {i['cpu_s'] + i['workers_cpu_s']:>9.2f} {i[memory]:>15.1f}")
+        lines.append(f"{totals['parsed']} files parsed ({totals['cached']} from the cache): header {totals['header_s']:.2f}s, condense {totals['condense_s']:.2f}s")
+        lines.append(f"Slowest {len(totals['slowest'])} files:")
+        for i in totals['slowest']:
+            lines.append(f"{i['wall']:>9.3f}s {i['bytes'] / 1e6:>8.2f} MB  {i['file']}")
+        return '\n'.join(lines) + '\n' + breaker
+
+
+    def write(self, path: str):
+        write_atomic(path, json.dumps(self.to_dict(), indent=2) + '\n')
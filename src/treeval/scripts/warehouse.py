@@ -0,0 +1,316 @@
+"""
+Load summary files into a local SQLite warehouse once, then slice it without the raw files.
+
+ingest parses only the files that are new or changed since the last ingest
+(by size and mtime) and stores one row per run and one per run x process.
+Files under DIR that were ingested before but are no longer found (deleted,
+renamed or filtered out) are dropped with their runs.
+query filters on the indexed sample, clade, ticket, entry point, version,
+start date and process columns, e.g. VGP bird FULL runs on v1.1.0 since March:
+
+python3 src/treeval/scripts/warehouse.py ingest runs.db ./treeval-summary-files/ --recursive --include 'TreeVal_run_*' --jobs 8
+python3 src/treeval/scripts/warehouse.py query runs.db --ticket VGP --clade bird --entry_point FULL --version v1.1.0 --since 2024-03
+
+and the peak memory of every HIC_MAPPING process for fish:
+
+python3 src/treeval/scripts/warehouse.py query runs.db --process HIC_MAPPING --clade fish --metric average_peak_memory max_peak_rss
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+from ingest import ingest_files, list_summary_files, PROCESS_METRICS, USAGE_COLUMNS, PARSER_VERSION, RUN_EXCLUDE
+from parse_cache import ParseCache
+from sources import source_path, ARCHIVE_SEPARATOR
+
+# Warehouse column: index in the parse result row (RUN_COLUMNS)
+RUN_FIELDS = {  'unique_name'       : 0,
+                'entry_point'       : 1,
+                'version'           : 2,
+                'duration_h'        : 3,
+                'clade'             : 4,
+                'prefix'            : 5,
+                'fasta_mb'          : 6,
+                'ticket'            : 7,
+                'longread_avg_gb'   : 8,
+                'hic_containers'    : 9,
+                'hic_avg_gb'        : 10,
+                'longread_total_gb' : 11,
+                'hic_total_gb'      : 12
+            }
+
+# Warehouse column: key of the parse result 'run' block
+HEADER_FIELDS = ['sample', 'runname', 'session', 'started', 'completed']
+
+# Per run x process columns, the condensed means / totals then the usage totals
+METRIC_FIELDS = [i.lower() for i in PROCESS_METRICS + USAGE_COLUMNS]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    path            TEXT PRIMARY KEY,
+    size            INTEGER,
+    mtime_ns        INTEGER,
+    status          TEXT,
+    error           TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id          INTEGER PRIMARY KEY,
+    file            TEXT,
+    {', '.join(f'{i} TEXT' for i in HEADER_FIELDS)},
+    unique_name     TEXT UNIQUE,
+    entry_point     TEXT,
+    version         TEXT,
+    duration_h      REAL,
+    clade           TEXT,
+    prefix          TEXT,
+    fasta_mb        REAL,
+    ticket          TEXT,
+    longread_avg_gb REAL,
+    hic_containers  REAL,
+    hic_avg_gb      REAL,
+    longread_total_gb REAL,
+    hic_total_gb    REAL,
+    mem_eff         REAL,
+    cpu_eff         REAL
+);
+CREATE TABLE IF NOT EXISTS processes (
+    process_id      INTEGER PRIMARY KEY,
+    name            TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS run_processes (
+    run_id          INTEGER,
+    process_id      INTEGER,
+    {', '.join(f'{i} REAL' for i in METRIC_FIELDS)},
+    PRIMARY KEY (run_id, process_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_sample ON runs (sample);
+CREATE INDEX IF NOT EXISTS runs_clade ON runs (clade);
+CREATE INDEX IF NOT EXISTS runs_ticket ON runs (ticket);
+CREATE INDEX IF NOT EXISTS runs_entry_point ON runs (entry_point);
+CREATE INDEX IF NOT EXISTS runs_version ON runs (version);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+CREATE INDEX IF NOT EXISTS runs_file ON runs (file);
+CREATE INDEX IF NOT EXISTS run_processes_process ON run_processes (process_id, run_id);
+"""
+
+# query option: runs column it filters on
+RUN_FILTERS = {     'sample'        : 'sample',
+                    'clade'         : 'clade',
+                    'ticket'        : 'ticket',
+                    'entry_point'   : 'entry_point',
+                    'version'       : 'version'
+                }
+
+
+class Warehouse:
+    """
+    The SQLite warehouse of parsed runs.
+
+    Start dates are stored as the first 19 characters of Pipeline_datastrt
+    (YYYY-MM-DDTHH:MM:SS, the run's local time) so --since / --until compare
+    as text on the index and accept any prefix such as 2024 or 2024-03.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        if readonly:
+            if not os.path.exists(path):
+                sys.exit(f"No warehouse at {path}, run ingest first")
+            self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.executescript(SCHEMA)
+        self.process_ids = {}
+
+
+    def process_id(self, name: str) -> int:
+        if name not in self.process_ids:
+            self.connection.execute("INSERT OR IGNORE INTO processes (name) VALUES (?)", (name,))
+            self.process_ids[name] = self.connection.execute("SELECT process_id FROM processes WHERE name = ?", (name,)).fetchone()[0]
+        return self.process_ids[name]
+
+
+    def changed_files(self, files: list) -> list:
+        """
+        The files whose size or mtime differ from the last ingest, or that were never ingested
+        """
+        known = {i[0]: (i[1], i[2]) for i in self.connection.execute("SELECT path, size, mtime_ns FROM files")}
+        changed = []
+        for file in files:
+            stat = os.stat(source_path(file))           # The archive's, for a member of one
+            if known.get(os.path.abspath(file)) != (stat.st_size, stat.st_mtime_ns):
+                changed.append(file)
+        return changed
+
+
+    def remove_missing(self, directory: str, files: list) -> int:
+        """
+        Drop the files under directory which were ingested before but are not in files any more, with their runs.
+        Returns how many were dropped
+        """
+        root = os.path.abspath(directory)
+        found = {os.path.abspath(i) for i in files}
+        missing = [ path for (path,) in self.connection.execute("SELECT path FROM files")
+                    if path not in found and (path.startswith(root + os.sep) or path.startswith(root + ARCHIVE_SEPARATOR)) ]
+        for path in missing:
+            self.remove_run('file', path)
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        return len(missing)
+
+
+    def remove_run(self, where: str, value: str):
+        for (run_id,) in self.connection.execute(f"SELECT run_id FROM runs WHERE {where} = ?", (value,)).fetchall():
+            self.connection.execute("DELETE FROM run_processes WHERE run_id = ?", (run_id,))
+            self.connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+
+    def add_result(self, file: str, result: dict):
+        """
+        Store one parse_summary_file result, replacing whatever this file or this run stored before
+        """
+        path = os.path.abspath(file)
+        stat = os.stat(source_path(file))
+        self.remove_run('file', path)
+        self.connection.execute(    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                    (path, stat.st_size, stat.st_mtime_ns, result['status'], result.get('error'))
+                                )
+        if result['status'] != 'OK':
+            return
+
+        self.remove_run('unique_name', result['uniquename'])
+        run = {'file': path}
+        run.update({i: result['run'][i] for i in HEADER_FIELDS})
+        run['started'] = (run['started'] or '')[:19]
+        run['completed'] = (run['completed'] or '')[:19]
+        run.update({name: result['row'][index] for name, index in RUN_FIELDS.items()})
+        run['mem_eff'] = result['efficiency']['MEM_EFF']
+        run['cpu_eff'] = result['efficiency']['CPU_EFF']
+        cursor = self.connection.execute(   f"INSERT INTO runs ({', '.join(run)}) VALUES ({', '.join('?' * len(run))})",
+                                            list(run.values())
+                                        )
+
+        rows = []
+        for process, values in result['processes'].items():
+            values = [float(i) for i in values[:len(PROCESS_METRICS)]] + [None] * (len(PROCESS_METRICS) - len(values))
+            rows.append([cursor.lastrowid, self.process_id(process)] + values + result['usage'].get(process, [None] * len(USAGE_COLUMNS)))
+        self.connection.executemany(f"INSERT INTO run_processes VALUES ({', '.join('?' * (len(METRIC_FIELDS) + 2))})", rows)
+
+
+    def ingest(self, directory: str, jobs: int = 1, cache: ParseCache = None, include: list = ['*'], exclude: list = RUN_EXCLUDE, recursive: bool = False) -> tuple:
+        """
+        Parse and store the new or changed files of directory, chosen as in ProjectStats
+        (see ingest.list_summary_files), and drop the ones no longer found.
+        Returns (files stored, files seen, files dropped)
+        """
+        files = list_summary_files(directory, recursive, include, exclude)
+        changed = self.changed_files(files)
+        with self.connection:
+            removed = self.remove_missing(directory, files)
+            for file, result in zip(changed, ingest_files(changed, jobs=jobs, cache=cache)):
+                self.add_result(file, result)
+        return len(changed), len(files), removed
+
+
+    def query(self, options) -> tuple:
+        """
+        (columns, rows) of the runs, or with --process the run x process rows, matching the options
+        """
+        where, parameters = [], []
+        for option, column in RUN_FILTERS.items():
+            values = getattr(options, option)
+            if values:
+                where.append(f"runs.{column} IN ({', '.join('?' * len(values))})")
+                parameters += values
+        if options.since:
+            where.append("runs.started >= ?")
+            parameters.append(options.since)
+        if options.until:
+            where.append("runs.started < ?")
+            parameters.append(options.until)
+
+        columns = ['unique_name', 'sample', 'started', 'entry_point', 'version', 'clade', 'ticket']
+        if options.process or options.metric:
+            metrics = options.metric or METRIC_FIELDS
+            unknown = [i for i in metrics if i not in METRIC_FIELDS]
+            if unknown:
+                sys.exit(f"Unknown metric {', '.join(unknown)}, choose from: {', '.join(METRIC_FIELDS)}")
+            if options.process:
+                ids = [i[0] for i in self.connection.execute(
+                            f"SELECT process_id FROM processes WHERE {' OR '.join(['instr(name, ?) > 0'] * len(options.process))}",
+                            options.process
+                        )]
+                where.append(f"run_processes.process_id IN ({', '.join('?' * len(ids)) or 'NULL'})")
+                parameters += ids
+            sql = ( f"SELECT {', '.join('runs.' + i for i in columns)}, processes.name, {', '.join('run_processes.' + i for i in metrics)} "
+                    "FROM run_processes JOIN runs USING (run_id) JOIN processes USING (process_id)" )
+            columns = columns + ['process'] + metrics
+        else:
+            columns += ['duration_h', 'fasta_mb', 'longread_total_gb', 'hic_total_gb', 'mem_eff', 'cpu_eff']
+            sql = f"SELECT {', '.join(columns)} FROM runs"
+
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY runs.started, runs.unique_name"
+        if options.process or options.metric:
+            sql += ", processes.name"
+        if options.limit:
+            sql += f" LIMIT {int(options.limit)}"
+        return columns, self.connection.execute(sql, parameters).fetchall()
+
+
+def format_rows(columns: list, rows: list, output_format: str) -> str:
+    if output_format == 'json':
+        return json.dumps([dict(zip(columns, i)) for i in rows], indent=2) + '\n'
+    lines = ['\t'.join(columns)]
+    lines += ['\t'.join('' if i is None else str(round(i, 4) if isinstance(i, float) else i) for i in row) for row in rows]
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite warehouse of TreeVal summary files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load = subparsers.add_parser('ingest', help="Parse new or changed summary files into the warehouse")
+    load.add_argument("database", help="SQLite file, created if missing")
+    load.add_argument("DIR", help="Directory of input Summary Files")
+    load.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes used to parse the summary files")
+    load.add_argument("--recursive", action="store_true", help="Also read the summary files in subdirectories of DIR")
+    load.add_argument("--include", nargs='+', default=['*'], help="Globs of the summary file names to read, e.g. 'TreeVal_run_*'")
+    load.add_argument("--exclude", nargs='+', default=RUN_EXCLUDE, help="Globs of the file names to skip, co2footprint files by default")
+    load.add_argument("--cache", help="Directory of a parse cache shared with ProjectStats --cache")
+    load.add_argument("--cache_key", choices=['stat', 'content'], default='stat', help="Identify unchanged files by path/size/mtime (stat) or by a hash of their contents")
+
+    query = subparsers.add_parser('query', help="Select runs, or run x process metrics with --process / --metric")
+    query.add_argument("database", help="SQLite file made by ingest")
+    query.add_argument("--sample", nargs='+', help="Sample ids (InputSampleID)")
+    query.add_argument("--clade", nargs='+', help="Clades, e.g. bird fish")
+    query.add_argument("--ticket", nargs='+', help="Tickets, e.g. VGP TOL")
+    query.add_argument("--entry_point", nargs='+', help="Entry points, e.g. FULL RAPID")
+    query.add_argument("--version", nargs='+', help="Pipeline versions, e.g. v1.1.0")
+    query.add_argument("--since", help="Runs started on or after this date (any prefix of YYYY-MM-DDTHH:MM:SS)")
+    query.add_argument("--until", help="Runs started before this date")
+    query.add_argument("--process", nargs='+', help="Per process rows of the processes whose name contains any of these, e.g. HIC_MAPPING")
+    query.add_argument("--metric", nargs='+', help=f"Per process columns to show: {', '.join(METRIC_FIELDS)}")
+    query.add_argument("--limit", type=int, help="Return at most this many rows")
+    query.add_argument("--format", choices=['tsv', 'json'], default='tsv', help="Output format")
+
+    options = parser.parse_args()
+
+    start = time.perf_counter()
+    if options.command == 'ingest':
+        cache = ParseCache(options.cache, PARSER_VERSION, key_mode=options.cache_key) if options.cache else None
+        stored, seen, removed = Warehouse(options.database).ingest( options.DIR, jobs=options.jobs, cache=cache, include=options.include,
+                                                                    exclude=options.exclude, recursive=options.recursive )
+        sys.stderr.write(f"{stored} new or changed of {seen} files ingested, {removed} no longer found dropped, in {time.perf_counter() - start:.2f}s\n")
+    else:
+        columns, rows = Warehouse(options.database, readonly=True).query(options)
+        sys.stdout.write(format_rows(columns, rows, options.format))
+        sys.stderr.write(f"{len(rows)} rows in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
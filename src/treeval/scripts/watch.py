@@ -0,0 +1,89 @@
+import os
+import time
+from sys import stdout
+
+from ingest import ingest_files, RUN_EXCLUDE
+from scanner import scan_files
+from sources import source_path
+from aggregates import ProjectAggregates, PERCENTILES
+
+
+def write_atomic(path: str, text: str):
+    """
+    Write to a temp file and rename it over path so readers never see half a summary
+    """
+    temp = f"{path}.tmp"
+    with open(temp, 'w') as file:
+        file.write(text)
+    os.replace(temp, path)
+
+
+def scan_sizes(directory: str, include: list = ['*'], exclude: list = RUN_EXCLUDE, recursive: bool = False, broken: list = None) -> dict:
+    """
+    {source: size} of the summary files scan_sources finds in directory, with the
+    same filters as a normal run. The members of an archive all get the size of
+    the archive, so none of them is picked up while it is still growing.
+    """
+    sizes = {}
+    paths = {}
+    for source in scan_files(directory, include, exclude, recursive, broken):
+        path = source_path(source)
+        if path not in paths:
+            paths[path] = os.stat(path).st_size
+        sizes[source] = paths[path]
+    return sizes
+
+
+def watch_directory(  directory: str, outdir: str, interval: float = 60, jobs: int = 1, cache = None, polls: int = 0, percentiles: list = PERCENTILES, registry = None, registry_path: str = '', dedupe: bool = True,
+                        include: list = ['*'], exclude: list = RUN_EXCLUDE, recursive: bool = False ):
+    """
+    Poll directory for new summary files and keep StatsSummary.txt,
+    ProcessSummary.tsv and QuantileSummary.tsv in outdir up to date.
+
+    Only new files are parsed, their results are folded into a running
+    ProjectAggregates so files that have already been counted are never read
+    again. Files are found like a normal run (see scanner) with the include /
+    exclude globs and recursive, archives are expanded into their members.
+    A file is picked up once its size is the same on two polls, so runs
+    which are still being written are left alone, and empty files are retried.
+    Archives which can't be read yet are reported once and retried every poll.
+    polls > 0 stops after that many polls (0 watches forever).
+    New processes go into registry, which is saved to registry_path when set.
+    With dedupe a copy of a run counted in an earlier poll is skipped as well.
+    """
+    totals = ProjectAggregates(registry)
+    counted = set()
+    unreadable = set()
+    fingerprints = {}
+    last_sizes = {}
+    poll = 0
+
+    while True:
+        broken = []
+        sizes = scan_sizes(directory, include, exclude, recursive, broken)
+        for i in sorted(set(broken) - unreadable):
+            stdout.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | can't read {i}, retrying\n")
+        unreadable.update(broken)
+        ready = sorted( i for i, size in sizes.items()
+                        if i not in counted and size > 0 and (poll == 0 or last_sizes.get(i) == size) )
+        last_sizes = sizes
+
+        if ready:
+            update = ProjectAggregates(totals.registry)
+            for name, result in zip(ready, ingest_files(ready, jobs=jobs, cache=cache, registry=totals.registry, dedupe=dedupe, seen=fingerprints)):
+                update.add_result(result)
+                counted.add(name)
+            totals.merge(update)
+
+            write_atomic(os.path.join(outdir, 'StatsSummary.txt'), totals.summary_text())
+            write_atomic(os.path.join(outdir, 'ProcessSummary.tsv'), totals.process_table())
+            write_atomic(os.path.join(outdir, 'QuantileSummary.tsv'), totals.quantile_table(percentiles))
+            if registry_path:
+                totals.registry.save(registry_path)
+            stdout.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} | added {len(ready)} files | {totals.runs} runs in summary\n")
+            stdout.flush()
+
+        poll += 1
+        if polls and poll >= polls:
+            return totals
+        time.sleep(interval)
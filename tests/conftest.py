@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'src', 'treeval', 'scripts'))
+
+TEST_DATA = os.path.join(REPO, 'tests', 'test_data')
+RUNS_DIR = os.path.join(REPO, 'treeval-summary-files', '1-1-0-runs')
+
+
+@pytest.fixture
+def corpus_file():
+    """
+    Path of a file of the bundled 1-1-0-runs corpus, the test is skipped when it isn't there
+    """
+    def path(name: str) -> str:
+        file = os.path.join(RUNS_DIR, name)
+        if not os.path.isfile(file):
+            pytest.skip(f"{name} is not in the corpus")
+        return file
+    return path
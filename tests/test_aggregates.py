@@ -0,0 +1,102 @@
+import shutil
+
+import numpy as np
+import pytest
+
+import watch
+from aggregates import RunningStats, ProjectAggregates
+from ingest import ingest_files
+from process_registry import ProcessRegistry
+
+FILES = [   'TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt',
+            'TreeVal_run_iyArgPaga1_1_FULL_2023-09-25_20-10-34.txt',
+            'TreeVal_run_KPenguin2_1_FULL_2024-04-16_11-30-20.txt',
+            'TreeVal_run_rPodBoc1_1_RAPID_TOL_2024-06-10_16-21-02.txt',
+            'TreeVal_run_bMerAlb1_3_RAPID_TOL_2024-04-16_12-28-38.txt'
+        ]
+
+
+def running_stats(values) -> RunningStats:
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(1).normal(100, 15, 1000)
+    stats = running_stats(values.tolist() + [None, float('nan')])
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_merged_running_stats_match_a_single_pass():
+    values = np.random.default_rng(2).lognormal(3, 1, 1001).tolist()
+    single = running_stats(values)
+
+    merged = RunningStats()
+    for chunk in [values[:1], [], values[1:400], values[400:]]:
+        merged.merge(running_stats(chunk))
+    assert merged.count == single.count
+    assert merged.mean == pytest.approx(single.mean)
+    assert merged.variance == pytest.approx(single.variance)
+    assert (merged.min, merged.max) == (single.min, single.max)
+
+
+def aggregate(results: list, registry: ProcessRegistry = None) -> ProjectAggregates:
+    totals = ProjectAggregates(registry)
+    for result in results:
+        totals.add_result(result)
+    return totals
+
+
+def assert_same_totals(merged: ProjectAggregates, single: ProjectAggregates):
+    # Counts that tie are listed in the order they came in, so the text is only compared line by line
+    assert sorted(merged.summary_text().splitlines()) == sorted(single.summary_text().splitlines())
+    assert merged.quantile_table() == single.quantile_table()
+    merged, single = merged.to_dict(), single.to_dict()
+    for key in ['runs', 'clades', 'entry_points', 'tickets', 'percentiles', 'empty_files', 'broken_files', 'skipped_files']:
+        assert merged[key] == single[key], key
+
+    # Merged means and variances are only equal up to rounding
+    stats = [(merged['efficiency'], single['efficiency'])] + [(merged['processes'][i], single['processes'][i]) for i in single['processes']]
+    assert merged['processes'].keys() == single['processes'].keys()
+    for merged_metrics, single_metrics in stats:
+        assert merged_metrics.keys() == single_metrics.keys()
+        for metric, values in single_metrics.items():
+            assert merged_metrics[metric] == pytest.approx(values), metric
+
+
+def test_merged_aggregates_match_a_single_pass(corpus_file):
+    results = ingest_files([corpus_file(i) for i in FILES])
+    single = aggregate(results)
+
+    # Each part interns processes into its own registry, merge maps them onto the totals' ids
+    merged = aggregate(results[:2], ProcessRegistry([]))
+    merged.merge(aggregate(results[2:], ProcessRegistry([])))
+    assert merged.runs == len(FILES)
+    assert_same_totals(merged, single)
+
+
+def test_watch_totals_match_a_single_run(tmp_path, monkeypatch, corpus_file):
+    runs = tmp_path / 'runs'
+    runs.mkdir()
+    for name in FILES[:2]:
+        shutil.copy(corpus_file(name), runs / name)
+
+    # The rest land after the first poll, a copy of an already counted run among them
+    late = [(corpus_file(i), i) for i in FILES[2:]] + [(corpus_file(FILES[0]), 'TreeVal_run_zzCopy_1.txt')]
+    def sleep(seconds):
+        while late:
+            file, name = late.pop()
+            shutil.copy(file, runs / name)
+    monkeypatch.setattr(watch.time, 'sleep', sleep)
+
+    totals = watch.watch_directory(str(runs), str(tmp_path), interval=0, polls=3)
+    single = aggregate(ingest_files(sorted(str(i) for i in runs.iterdir())))
+
+    assert totals.runs == len(FILES) and len(totals.skipped) == 1
+    assert_same_totals(totals, single)
+    assert (tmp_path / 'StatsSummary.txt').read_text() == totals.summary_text()
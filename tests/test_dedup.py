@@ -0,0 +1,109 @@
+import os
+import shutil
+
+import ingest
+from dedup import fingerprint, file_fingerprint, keep_latest_per_sample, RESOURCES_MARKER
+from ingest import ingest_files
+
+SUMMARY = """---RUN_DATA---
+Pipeline_session:   {session}
+---INPUT_DATA---
+InputSampleID:      {sample}
+{marker}
+name\tstatus\tmodule\tcpus\tmemory\tattempt\trealtime\t%cpu\t%mem\tpeak_rss
+{trace}
+"""
+
+
+def summary(session: str = 'abc', sample: str = 'bAnaAcu1_1', trace: str = 'TASK (1)\tCOMPLETED', marker: str = RESOURCES_MARKER) -> str:
+    return SUMMARY.format(session=session, sample=sample, trace=trace, marker=marker)
+
+
+def test_fingerprint_ignores_the_sample_but_not_the_session_or_trace():
+    assert fingerprint(summary()) == fingerprint(summary(sample='bAnaAcu1_2'))
+    assert fingerprint(summary()).startswith('abc:')
+    assert fingerprint(summary()) != fingerprint(summary(session='def'))
+    assert fingerprint(summary()) != fingerprint(summary(trace='TASK (2)\tCOMPLETED'))
+    assert fingerprint(summary(marker='')) == ''
+
+
+def test_file_fingerprint_matches_the_text_fingerprint(tmp_path, corpus_file):
+    file = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    with open(file) as handle:
+        assert file_fingerprint(file) == fingerprint(handle.read())
+    assert file_fingerprint(str(tmp_path / 'missing.txt')) == ''
+
+
+def test_copies_are_duplicates_of_the_first(tmp_path, corpus_file):
+    original = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    files = [str(tmp_path / i) for i in ['a.txt', 'b.txt', 'c.txt']]
+    for file in files:
+        shutil.copy(original, file)
+
+    # Results name their file without the directory, see sources.source_name
+    results = ingest_files(files)
+    assert [i['status'] for i in results] == ['OK', 'DUPLICATE', 'DUPLICATE']
+    assert results[1]['duplicate_of'] == results[2]['duplicate_of'] == os.path.basename(files[0])
+
+    assert [i['status'] for i in ingest_files(files, dedupe=False)] == ['OK', 'OK', 'OK']
+
+
+def test_duplicates_are_not_parsed(tmp_path, monkeypatch, corpus_file):
+    original = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    files = [str(tmp_path / i) for i in ['a.txt', 'b.txt', 'c.txt']]
+    for file in files:
+        shutil.copy(original, file)
+
+    parsed = []
+    parse_summary_file = ingest.parse_summary_file
+    monkeypatch.setattr(ingest, 'parse_summary_file', lambda file, *args: parsed.append(file) or parse_summary_file(file, *args))
+    assert [i['status'] for i in ingest_files(files)] == ['OK', 'DUPLICATE', 'DUPLICATE']
+    assert parsed == files[:1]
+
+
+def test_seen_carries_over_between_calls(tmp_path, corpus_file):
+    original = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    first, second = str(tmp_path / 'first.txt'), str(tmp_path / 'second.txt')
+    shutil.copy(original, first)
+    shutil.copy(original, second)
+
+    seen = {}
+    assert ingest_files([first], seen=seen)[0]['status'] == 'OK'
+    assert ingest_files([second], seen=seen)[0]['duplicate_of'] == 'first.txt'
+
+
+def test_corpus_duplicates_across_sample_ids(corpus_file):
+    files = [   corpus_file('TreeVal_run_iyArgPaga1_1_FULL_2023-09-25_20-10-34.txt'),
+                corpus_file('TreeVal_run_iyTenLivi1_1_FULL_2023-09-25_20-10-34.txt'),
+                corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-07-08_11-35-29.txt'),
+                corpus_file('TreeVal_run_ieEpeAssi2_2_RAPID_TOL_2024-07-08_11-35-29.txt')
+            ]
+    results = ingest_files(files)
+    assert [i['status'] for i in results] == ['OK', 'DUPLICATE', 'OK', 'DUPLICATE']
+    assert results[1]['duplicate_of'] == os.path.basename(files[0])
+    assert results[3]['duplicate_of'] == os.path.basename(files[2])
+
+
+def test_latest_per_sample_keeps_the_last_completed_run(corpus_file):
+    files = [   corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt'),
+                corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-07-08_15-15-00.txt'),
+                corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-07-08_11-35-29.txt')
+            ]
+    results = ingest_files(files, latest_per_sample=True)
+    assert [i['status'] for i in results] == ['SUPERSEDED', 'OK', 'SUPERSEDED']
+    assert results[0]['superseded_by'] == results[2]['superseded_by'] == os.path.basename(files[1])
+
+
+def run(file: str, sample: str, entry_point: str, completed) -> dict:
+    return {'file': file, 'status': 'OK', 'row': ['', entry_point], 'run': {'sample': sample, 'completed': completed}}
+
+
+def test_latest_per_sample_by_entry_point():
+    results = keep_latest_per_sample([  run('full', 'bAnaAcu1_1', 'FULL', '2024-01-01T10:00:00+00:00'),
+                                        run('rapid', 'bAnaAcu1_1', 'RAPID', '2024-02-01T10:00:00+00:00'),
+                                        run('rerun', 'bAnaAcu1_1', 'FULL', '2024-01-01T11:30:00+01:00'),
+                                        run('unfinished', 'bAnaAcu1_2', 'FULL', None)
+                                    ])
+    # 11:30+01:00 is 10:30 UTC, so the rerun finished last and the RAPID run is kept next to it
+    assert [i['status'] for i in results] == ['SUPERSEDED', 'OK', 'OK', 'OK']
+    assert results[0]['superseded_by'] == 'rerun'
@@ -0,0 +1,95 @@
+import os
+import shutil
+
+import pytest
+
+from ingest import ingest_files, PARSER_VERSION
+from parse_cache import ParseCache
+
+
+def write(path, text: str = 'text') -> str:
+    path.write_text(text)
+    return str(path)
+
+
+def test_stat_key_changes_with_the_version_and_mtime(tmp_path):
+    file = write(tmp_path / 'a.txt')
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION)
+    key = cache.key(file)
+
+    assert cache.key(file) == key
+    assert ParseCache(str(tmp_path / 'cache'), PARSER_VERSION + '.1').key(file) != key
+
+    stat = os.stat(file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert cache.key(file) != key
+
+
+def test_content_key_follows_the_text_not_the_name(tmp_path):
+    first, renamed = write(tmp_path / 'a.txt', 'summary'), write(tmp_path / 'b.txt', 'summary')
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION, key_mode='content')
+
+    assert cache.key(first) == cache.key(renamed) == cache.key('runs.tar::c.txt', 'summary')
+    assert cache.key(first) != cache.key('runs.tar::c.txt', 'other summary')
+    assert ParseCache(str(tmp_path / 'cache'), PARSER_VERSION + '.1', key_mode='content').key(first) != cache.key(first)
+    assert ParseCache(str(tmp_path / 'cache'), PARSER_VERSION).key(first) != ParseCache(str(tmp_path / 'cache'), PARSER_VERSION).key(renamed)
+
+
+def test_unknown_key_mode():
+    with pytest.raises(ValueError):
+        ParseCache('cache', PARSER_VERSION, key_mode='name')
+
+
+def test_renamed_copy_is_read_from_the_cache(tmp_path, corpus_file):
+    original = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    first, renamed = str(tmp_path / 'first.txt'), str(tmp_path / 'renamed.txt')
+    shutil.copy(original, first)
+    shutil.copy(original, renamed)
+
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION, key_mode='content')
+    parsed = ingest_files([first], cache=cache)[0]
+    cached = ingest_files([renamed], cache=cache, dedupe=False)[0]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached['file'] == 'renamed.txt'
+    assert cached['row'] == parsed['row'] and cached['fingerprint'] == parsed['fingerprint']
+
+    # A new parser version doesn't see the old entries
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION + '.1', key_mode='content')
+    ingest_files([renamed], cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_get_put_and_broken_entries(tmp_path):
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION)
+    assert cache.get('missing') is None
+
+    cache.put('key', {'status': 'OK'})
+    assert cache.get('key') == {'status': 'OK'}
+
+    with open(cache.entry_path('broken'), 'wb') as handle:
+        handle.write(b'not a pickle')
+    assert cache.get('broken') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert not [i for i in os.listdir(cache.directory) if i.endswith('.tmp')]
+
+
+def test_prune_removes_the_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION)
+    for age, key in enumerate(['new', 'used', 'old']):
+        cache.put(key, {'status': 'OK', 'text': 'x' * 1000})
+        os.utime(cache.entry_path(key), (1000000 - age * 100, 1000000 - age * 100))
+
+    # A hit marks the entry as just used
+    cache.get('used')
+    cache.max_bytes = 2 * os.path.getsize(cache.entry_path('new'))
+    assert cache.prune() == 1
+    assert sorted(os.listdir(cache.directory)) == ['new.pkl', 'used.pkl']
+    assert cache.prune() == 0
+
+
+def test_clear(tmp_path):
+    cache = ParseCache(str(tmp_path / 'cache'), PARSER_VERSION)
+    for key in ['a', 'b']:
+        cache.put(key, {'status': 'OK'})
+    assert cache.clear() == 2
+    assert cache.entries() == [] and cache.get('a') is None
@@ -0,0 +1,131 @@
+import os
+import re
+import gzip
+import time
+
+import pytest
+
+from conftest import TEST_DATA
+from dedup import fingerprint
+from general_functions import stream_summary_trace
+from ingest import parse_summary_file
+from normalise import normalise_value, normalise_column, duration_seconds, duration_column
+from parse_run_execution import ParseRunExecution
+from parse_run_header import ParseRunHeader
+
+
+def parse_trace(name: str) -> ParseRunExecution:
+    with open(os.path.join(TEST_DATA, name)) as handle:
+        return ParseRunExecution(list(stream_summary_trace(handle)))
+
+
+def test_trace_condensed_per_process():
+    parsed = parse_trace('bAnaAcu1_1_pipelineinfo.txt')
+    assert len(parsed.condensed) == 34
+    assert parsed.condensed['CUSTOM_DUMPSOFTWAREVERSIONS'] == [1, 6000, 6000, 0.357, 34, 0, 0.0]
+    assert parsed.efficiency['CPU_EFFICIENCY']['CPU_REQUEST'] == 172
+    assert parsed.efficiency['MEM_EFFICIENCY']['MEM_REQUEST'] == 1110000
+
+
+def test_trace_values_ignore_the_workflow_prefix():
+    sanger = parse_trace('bAnaAcu1_1_pipelineinfo.txt')
+    nf_core = parse_trace('nf-core-bAna_pipelineinfo.txt')
+    assert list(nf_core.condensed.values()) == list(sanger.condensed.values())
+    assert nf_core.efficiency == sanger.efficiency
+
+
+def test_trace_without_header_is_broken():
+    result = parse_summary_file(os.path.join(TEST_DATA, 'nf-core_pipelineinfo.txt'))
+    assert result['status'] == 'BROKEN'
+    assert '---RESOURCES---' in result['error']
+
+
+@pytest.mark.parametrize('value, expected', [('12 GB', 12000), ('100 MB', 100), ('250 KB', 0), ('1.5 TB', 1500000), ('0', 0)])
+def test_normalise_value(value, expected):
+    assert normalise_value(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [('1d 2h 3m 4s', 93784), ('29m 33s', 1773), ('84ms', 0.084), ('7474', 7474), ('CANNOT BE RECORDED', None)])
+def test_duration_seconds(value, expected):
+    assert duration_seconds(value) == expected
+
+
+def test_columns_match_the_scalar_parsers():
+    assert normalise_column(['6 GB', '100 MB', '0']).tolist() == [6000, 100, 0]
+    durations = duration_column(['2s', 'CANNOT BE RECORDED', '1m'])
+    assert durations[0] == 2 and durations[2] == 60
+    assert durations[1] != durations[1]
+    assert normalise_column([]).tolist() == duration_column([]).tolist() == []
+
+
+def test_columns_repeat_tokens_and_round_like_the_scalar_parser():
+    # 995 KB is 0.99499.. MB, which round() keeps under 1 where np.round would make it 1.0
+    values = ['995 KB', '12 GB', '995 KB', '1.999 TB', '0', '2.675 g', '12 GB', '999.999 ug']
+    assert normalise_column(values).tolist() == [normalise_value(i) for i in values]
+    assert normalise_column(values)[0] == 0
+
+    durations = ['1d 2h 3m 4s', '84ms', '1d 2h 3m 4s', '7474', '84ms']
+    assert duration_column(durations).tolist() == [duration_seconds(i) for i in durations]
+
+
+def test_groovy_input_keeps_null_as_a_string():
+    parsed = ParseRunHeader.parse_input('[[id:ieEpeAssi2_1, sz:411883736, ln:, tk:null], /data/ref.fa]')
+    assert parsed['meta'] == {'id': 'ieEpeAssi2_1', 'sz': 411883736, 'ln': '', 'tk': 'null'}
+    assert parsed['paths'] == ['/data/ref.fa']
+    assert ParseRunHeader.fix_fasta(parsed)[3] == 'null'
+
+
+def test_groovy_input_with_a_list_of_sizes_and_containers():
+    parsed = ParseRunHeader.parse_input('[[id:cram, sz:[123, 456], cn:4], [/a.cram, /b.cram]]')
+    assert ParseRunHeader.fix_data(parsed) == [123, 456]
+    assert ParseRunHeader.get_container(parsed) == 4
+    assert parsed['paths'] == ['/a.cram', '/b.cram']
+
+    missing = ParseRunHeader.parse_input('[[id:cram, sz:123, cn:null], /a.cram]')
+    assert ParseRunHeader.fix_data(missing) == [123]
+    assert ParseRunHeader.get_container(missing) != ParseRunHeader.get_container(missing)
+
+
+def test_corpus_summary_file(corpus_file):
+    result = parse_summary_file(corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt'))
+    assert result['status'] == 'OK'
+    assert result['run']['sample'] == 'ieEpeAssi2_1'
+    assert result['run']['session'] == '874be3eb-0aec-4beb-888f-24712743fed7'
+    assert result['row'][1] == 'RAPID_TOL'
+    assert result['row'][7] == 'null'
+    assert result['fingerprint'].startswith('874be3eb-0aec-4beb-888f-24712743fed7:')
+    assert result['processes'] and set(result['processes']) == set(result['usage'])
+
+
+@pytest.mark.parametrize('line', [  '[[id:KPenguin_1, sz:1278',
+                                    '[[id:KPenguin_1, sz:1278] /nfs/x.fa]',
+                                    '[[id:KPenguin_1, sz:1278573916, ln:bird, tk:VGP], /nfs/team/KPenguin_1/assembly/KPeng'
+                                ])
+def test_truncated_header_is_broken_quickly(tmp_path, corpus_file, line):
+    with open(corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')) as handle:
+        text = re.sub(r'(?m)^InputAssemblyData:.*$', f'InputAssemblyData:  {line}', handle.read())
+    file = tmp_path / 'truncated.txt'
+    file.write_text(text)
+
+    start = time.perf_counter()
+    result = parse_summary_file(str(file))
+    assert result['status'] == 'BROKEN'
+    assert time.perf_counter() - start < 1
+
+
+def test_compressed_file_streams_to_the_same_result(tmp_path, corpus_file):
+    file = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    with open(file, 'rb') as handle:
+        data = handle.read()
+    compressed = tmp_path / os.path.basename(file).replace('.txt', '.txt.gz')
+    compressed.write_bytes(gzip.compress(data))
+
+    plain, streamed, member = parse_summary_file(file), parse_summary_file(str(compressed)), parse_summary_file('runs.tar::x.txt', text=data.decode())
+    assert streamed['fingerprint'] == plain['fingerprint'] == member['fingerprint'] == fingerprint(data.decode())
+    assert streamed['row'] == plain['row'] == member['row']
+
+
+def test_empty_file(tmp_path):
+    file = tmp_path / 'empty.txt'
+    file.write_text('')
+    assert parse_summary_file(str(file))['status'] == 'EMPTY'
@@ -0,0 +1,90 @@
+import math
+
+import pytest
+
+from ingest import RUN_COLUMNS, USAGE_COLUMNS
+from recommend import ResourceRecommender
+
+FASTA_EXPRESSION = 'meta.sz / 1000000'
+
+# Per run: fasta size (MB), then peak_rss (MB) and cores used of FLAT, which always asks for 8 cpus.
+# SIZED peaks at exactly 1000 MB + 2 per MB of fasta, with 2 of 4 cpus busy
+RUNS = [    (100,  500, 1), (200,  800, 1), (300,  650, 2), (400,  700, 2), (500,  900, 2),
+            (600,  600, 3), (700,  750, 3), (800,  850, 3), (900,  550, 4), (1000, 620, 8)
+        ]
+
+
+def usage(peak_rss: float, cores_used: int, cpus: int) -> list:
+    values = {'TASKS': 1, 'REALTIME_S': 3600, 'CPU_S': 3600 * cores_used, 'MB_S': 3600 * peak_rss,
+              'MAX_PEAK_RSS': peak_rss, 'MAX_CORES_USED': cores_used, 'MAX_CPUS': cpus, 'MAX_MEMORY': 4000}
+    return [values[i] for i in USAGE_COLUMNS]
+
+
+def result(fasta: float, peak_rss: float, cores_used: int) -> dict:
+    row = [math.nan] * len(RUN_COLUMNS)
+    row[RUN_COLUMNS.index('Fasta_(mb)')] = fasta
+    return {    'status'    : 'OK',
+                'row'       : row,
+                'usage'     : { 'FLAT'  : usage(peak_rss, cores_used, 8),
+                                'SIZED' : usage(1000 + 2 * fasta, 2, 4)
+                            }
+            }
+
+
+def recommender(**options) -> ResourceRecommender:
+    recommender = ResourceRecommender(**options)
+    for run in RUNS:
+        recommender.add_result(result(*run))
+    recommender.add_result({'status': 'BROKEN'})
+    return recommender
+
+
+def test_constant_memory_and_cpus():
+    models = recommender(margin=0.2).recommend()
+    flat = models['FLAT']
+
+    # Max peak_rss plus the margin, the runs' sizes aren't used without --predictors
+    assert flat['predictor'] is None and models['SIZED']['predictor'] is None
+    assert math.ceil(flat['intercept']) == 1080
+    # The busiest task used half of the 8 cpus in 9 of 10 runs, the run using all 8 is left out
+    assert flat['cpus'] == math.ceil(8 * 4 / 8 * 1.2) == 5
+    assert flat['cpus_above'] == 0 and flat['runs'] == len(RUNS)
+    assert models['SIZED']['cpus'] == math.ceil(4 * 2 / 4 * 1.2) == 3
+
+    config = recommender(margin=0.2).config_text(models)
+    assert "    withName: '.*:FLAT' {  // constant, 10 runs\n        cpus   = { 5 * task.attempt }\n        memory = { 1080.MB * task.attempt }\n    }" in config
+    assert "memory = { 3600.MB * task.attempt }" in config
+
+
+def test_min_runs():
+    assert recommender(min_runs=11).recommend() == {}
+
+
+def test_predictor_closure():
+    sized = recommender(margin=0.2, expressions={'Fasta_(mb)': FASTA_EXPRESSION})
+    models = sized.recommend()
+    model = models['SIZED']
+
+    assert model['predictor'] == 'Fasta_(mb)' and model['r2'] > 0.99
+    assert (model['intercept'], model['slope']) == pytest.approx((1000 * 1.2, 2 * 1.2))
+    assert sized.memory(model, {'Fasta_(mb)': 500}) == 2400
+    # FLAT doesn't grow with the fasta, it keeps the constant
+    assert models['FLAT']['predictor'] is None
+
+    config = sized.config_text(models)
+    assert f"//     Fasta_(mb)             {FASTA_EXPRESSION}" in config
+    assert "    withName: '.*:SIZED' {  // Fasta_(mb), r2 1.00, 10 runs" in config
+    assert f"memory = {{ 1.MB * Math.ceil(Math.max(100, 1200.0 + 2.4000 * ({FASTA_EXPRESSION}))) * task.attempt }}" in config
+
+
+def test_savings_of_the_recommendation():
+    sized = recommender(margin=0.2, expressions={'Fasta_(mb)': FASTA_EXPRESSION})
+    models = sized.recommend()
+    runs, cores, cores_new, gb, gb_new = sized.savings(models)['FLAT']
+
+    assert runs == len(RUNS)
+    assert cores == sum(i[2] for i in RUNS)
+    assert cores_new == 5 * len(RUNS)
+    assert gb == pytest.approx(sum(i[1] for i in RUNS) / 1000)
+    assert gb_new == pytest.approx(1080 * len(RUNS) / 1000)
+    assert sized.savings_table(models, sized.savings(models)).splitlines()[-1].startswith('TOTAL')
@@ -0,0 +1,87 @@
+import pytest
+import pandas as pd
+
+from ingest import ingest_files, parse_summary_file, PROCESS_METRICS
+from master_list import master_list
+from process_registry import ProcessRegistry, NOT_RUN
+
+
+def result(version: str = 'v1.1.0') -> dict:
+    """
+    A parse result with two tasks of A and one of X, see ingest.PROCESS_METRICS and USAGE_COLUMNS
+    """
+    return {    'status'    : 'OK',
+                'row'       : ['bAnaAcu1_1-run', 'FULL', version],
+                'processes' : { 'A': [2, 1000, 2000, 10.0, 100, 1, 50.0, 1000],
+                                'X': [1, 3000, 3000, 20.0, 200, 2, 10.0]
+                            },
+                'usage'     : { 'A': [2, 20, 40, 1000, 600, 2, 2, 1000],
+                                'X': [1, 20, 40, 300, 300, 2, 1, 3000]
+                            }
+            }
+
+
+def test_seeded_with_master_list():
+    registry = ProcessRegistry()
+    assert registry.names == master_list
+    assert registry.intern('NEW_MODULE:NEW_PROCESS') == len(master_list)
+    assert registry.intern('NEW_MODULE:NEW_PROCESS') == len(master_list)
+    assert registry.process_columns() == list(range(len(master_list) + 1))
+
+
+def test_aliases_merge_into_one_process():
+    registry = ProcessRegistry(['A', 'B'], {'v1.0.0': {'X': 'A'}})
+    merged = registry.add_result(result('v1.0.0'))
+
+    assert list(merged['processes']) == ['A']
+    assert merged['processes']['A'] == pytest.approx([5 / 3, 5000 / 3, 5000, 40 / 3, 400 / 3, 4 / 3, 26.0, 1300])
+    assert merged['usage']['A'] == [3, 40, 80, 1300, 600, 2, 2, 3000]
+    assert registry.names == ['A', 'B']
+
+
+def test_aliases_only_apply_to_their_version():
+    registry = ProcessRegistry(['A', 'B'], {'v1.0.0': {'X': 'A'}})
+    kept = registry.add_result(result('v1.1.0'))
+    assert list(kept['processes']) == ['A', 'X']
+    assert registry.names == ['A', 'B', 'X']
+    assert registry.process_columns() == [0, 1, 2]
+    assert registry.process_row(kept) == [kept['processes']['A'], NOT_RUN, kept['processes']['X']]
+
+
+def test_expanded_frame_drops_the_list_columns():
+    from report import expand_process_columns
+
+    registry = ProcessRegistry(['A', 'B'])
+    merged = registry.add_result(result())
+    frame = pd.DataFrame([['run', 'FULL'] + registry.process_row(merged)], columns=['Unique_name', 'Entry_Point'] + registry.process_columns())
+    expanded = expand_process_columns(frame, registry.names)
+
+    assert list(expanded.columns) == ['Unique_name', 'Entry_Point'] + [f'{i}-{metric}' for i in ['A', 'B', 'X'] for metric in PROCESS_METRICS]
+    assert expanded['A-' + PROCESS_METRICS[0]][0] == 2
+    assert expanded['B-' + PROCESS_METRICS[0]].isna().all()
+    assert (expanded.dtypes[2:] == float).all()
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'registry.json')
+    registry = ProcessRegistry(master_list, {'*': {'OLD': 'NEW'}})
+    registry.intern('NEW_MODULE:NEW_PROCESS')
+    registry.save(path)
+
+    loaded = ProcessRegistry.load(path)
+    assert loaded.names == registry.names
+    assert loaded.aliases == registry.aliases
+    assert ProcessRegistry.load(str(tmp_path / 'missing.json')).names == master_list
+
+
+def test_corpus_aliases(corpus_file):
+    file = corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt')
+    parsed = parse_summary_file(file)
+    first, second = list(parsed['processes'])[:2]
+
+    registry = ProcessRegistry(aliases={'*': {first: 'MERGED', second: 'MERGED'}})
+    merged = ingest_files([file], registry=registry)[0]
+    assert first not in merged['processes'] and second not in merged['processes']
+    assert merged['usage']['MERGED'][0] == parsed['usage'][first][0] + parsed['usage'][second][0]
+    assert set(merged['sketches']['MERGED']) == set(parsed['sketches'][first])
+    assert registry.ids['MERGED'] == len(master_list)
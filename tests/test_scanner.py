@@ -0,0 +1,67 @@
+import os
+import tarfile
+
+from ingest import RUN_EXCLUDE
+from scanner import scan_sources, scan_files
+from sources import member_texts
+
+
+def write(path, text: str = 'text'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def test_filters_and_order(tmp_path):
+    for name in ['b.txt', 'a.txt', 'bAnaAcu1_1-co2footprint.txt', 'sub/c.txt']:
+        write(tmp_path / name)
+
+    assert scan_files(str(tmp_path), exclude=RUN_EXCLUDE) == [str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')]
+    assert scan_files(str(tmp_path), include=['b*'], exclude=RUN_EXCLUDE) == [str(tmp_path / 'b.txt')]
+    assert scan_files(str(tmp_path), exclude=RUN_EXCLUDE, recursive=True)[-1] == str(tmp_path / 'sub' / 'c.txt')
+
+
+def test_archive_members(tmp_path):
+    member = write(tmp_path / 'in' / 'TreeVal_run_a.txt', 'summary')
+    archive = str(tmp_path / 'runs.tar.gz')
+    with tarfile.open(archive, 'w:gz') as tar:
+        tar.add(member, arcname='release/TreeVal_run_a.txt')
+
+    assert list(scan_sources(archive)) == [(f"{archive}::release/TreeVal_run_a.txt", 'summary')]
+    assert scan_files(str(tmp_path)) == [f"{archive}::release/TreeVal_run_a.txt"]
+
+
+def test_broken_archive(tmp_path):
+    archive = write(tmp_path / 'partial.tar.gz', 'not a tar')
+    broken = []
+    assert scan_files(str(tmp_path), broken=broken) == []
+    assert len(broken) == 1 and broken[0].startswith(f"{archive} | ")
+
+
+def test_symlink_loop_is_entered_once(tmp_path):
+    write(tmp_path / 'runs' / 'a.txt')
+    os.symlink(str(tmp_path), str(tmp_path / 'runs' / 'loop'))
+
+    assert scan_files(str(tmp_path), recursive=True) == [str(tmp_path / 'runs' / 'a.txt')]
+
+
+def test_archive_members_stream_in_archive_order(tmp_path):
+    archive = str(tmp_path / 'runs.tar')
+    with tarfile.open(archive, 'w') as tar:
+        for name in ['b.txt', 'a.txt', 'c.txt']:
+            tar.add(write(tmp_path / 'in' / name, name), arcname=name)
+
+    sources = scan_sources(archive)
+    assert next(sources) == (f"{archive}::b.txt", 'b.txt')
+    assert [i for i, _ in sources] == [f"{archive}::a.txt", f"{archive}::c.txt"]
+
+
+def test_member_texts_out_of_order(tmp_path):
+    archive = str(tmp_path / 'runs.tar.gz')
+    with tarfile.open(archive, 'w:gz') as tar:
+        for name in ['a.txt', 'b.txt']:
+            tar.add(write(tmp_path / 'in' / name, name), arcname=name)
+    plain = write(tmp_path / 'plain.txt')
+
+    sources = [f"{archive}::b.txt", plain, f"{archive}::a.txt", f"{archive}::missing.txt"]
+    assert list(member_texts(sources)) == [(sources[0], 'b.txt'), (plain, None), (sources[2], 'a.txt'), (sources[3], None)]
@@ -0,0 +1,72 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from sketch import QuantileSketch
+
+FRACTIONS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+# Rank error allowed, twice what the docstring gives for the default k
+RANK_ERROR = 0.02
+
+
+def lognormal(count: int, seed: int = 1) -> np.ndarray:
+    return np.random.default_rng(seed).lognormal(3, 1, count)
+
+
+def assert_within_rank_error(sketch: QuantileSketch, data: np.ndarray):
+    for fraction, value in zip(FRACTIONS, sketch.quantiles(FRACTIONS)):
+        low, high = np.quantile(data, [max(0, fraction - RANK_ERROR), min(1, fraction + RANK_ERROR)])
+        assert low <= value <= high, fraction
+
+
+def test_exact_until_the_first_compaction():
+    sketch = QuantileSketch([5, 1, 4, 2, 3])
+    assert sketch.quantiles([0, 0.2, 0.5, 1]) == [1, 1, 3, 5]
+    assert sketch.count == 5 and sketch.min == 1 and sketch.max == 5
+
+
+def test_empty_and_missing_values():
+    sketch = QuantileSketch([None, math.nan])
+    assert sketch.count == 0
+    assert math.isnan(sketch.quantile(0.5))
+
+
+@pytest.mark.parametrize('count', [1000, 100000])
+def test_quantiles_within_the_error_bound(count):
+    data = lognormal(count)
+    sketch = QuantileSketch(data.tolist())
+    assert_within_rank_error(sketch, data)
+    assert sketch.held < 1000 and sketch.count == count
+    assert sketch.min == data.min() and sketch.max == data.max()
+
+
+def test_sketches_of_separate_chunks_merge():
+    data = lognormal(50000)
+    chunks = [QuantileSketch(i.tolist()) for i in np.array_split(data, 7)]
+
+    merged, from_dicts = QuantileSketch(), QuantileSketch()
+    for chunk in chunks:
+        merged.merge(chunk)
+        from_dicts.merge_dict(chunk.to_dict())
+    merged.merge(QuantileSketch())
+
+    assert merged.count == len(data) and merged.min == data.min() and merged.max == data.max()
+    assert_within_rank_error(merged, data)
+    assert from_dicts.to_dict() == merged.to_dict()
+
+
+def test_to_dict_round_trip():
+    data = lognormal(20000)
+    sketch = QuantileSketch(data[:10000].tolist())
+    loaded = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert loaded.to_dict() == sketch.to_dict()
+
+    # Offsets are kept, so both go on compacting the same way
+    for value in data[10000:].tolist():
+        sketch.add(value)
+        loaded.add(value)
+    assert loaded.to_dict() == sketch.to_dict()
+    assert loaded.quantiles(FRACTIONS) == sketch.quantiles(FRACTIONS)
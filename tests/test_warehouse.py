@@ -0,0 +1,102 @@
+import os
+import shutil
+from argparse import Namespace
+
+import pytest
+
+from warehouse import Warehouse
+
+FILES = {   'TreeVal_run_iyArgPaga1_1_FULL_2023-09-25_20-10-34.txt'       : 'iyArgPaga1_1-boring_boyd',
+            'TreeVal_run_KPenguin2_1_FULL_2024-04-16_11-30-20.txt'        : 'KPenguin_1-jovial_wright',
+            'TreeVal_run_rPodBoc1_1_RAPID_TOL_2024-06-10_16-21-02.txt'    : 'rPodBoc1_1-sleepy_bartik',
+            'TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-06-20_14-11-26.txt'  : 'ieEpeAssi2_1-thirsty_cray'
+        }
+
+
+def query(**options) -> Namespace:
+    """
+    The options of warehouse.py query, None unless given
+    """
+    names = ['sample', 'clade', 'ticket', 'entry_point', 'version', 'since', 'until', 'process', 'metric', 'limit']
+    return Namespace(**{i: options.get(i) for i in names})
+
+
+def run_names(warehouse: Warehouse, **options) -> list:
+    columns, rows = warehouse.query(query(**options))
+    return [i[columns.index('unique_name')] for i in rows]
+
+
+@pytest.fixture
+def runs(tmp_path, corpus_file):
+    directory = tmp_path / 'runs'
+    directory.mkdir()
+    for name in FILES:
+        shutil.copy(corpus_file(name), directory / name)
+    return directory
+
+
+def test_ingest_and_query(tmp_path, runs):
+    warehouse = Warehouse(str(tmp_path / 'runs.db'))
+    assert warehouse.ingest(str(runs)) == (4, 4, 0)
+
+    # Ordered by start date
+    assert run_names(warehouse) == list(FILES.values())
+    assert run_names(warehouse, entry_point=['FULL'], version=['v1.1.0']) == ['KPenguin_1-jovial_wright']
+    assert run_names(warehouse, clade=['insects'], ticket=['VGP']) == ['iyArgPaga1_1-boring_boyd']
+
+    columns, rows = warehouse.query(query(process=['HIC_MAPPING'], metric=['max_peak_rss']))
+    assert columns[-2:] == ['process', 'max_peak_rss']
+    assert rows and all('HIC_MAPPING' in i[-2] for i in rows)
+
+    with pytest.raises(SystemExit):
+        warehouse.query(query(metric=['peak']))
+
+
+def test_since_and_until_compare_date_prefixes(tmp_path, runs):
+    warehouse = Warehouse(str(tmp_path / 'runs.db'))
+    warehouse.ingest(str(runs))
+
+    assert run_names(warehouse, since='2024') == list(FILES.values())[1:]
+    assert run_names(warehouse, since='2024-06') == list(FILES.values())[2:]
+    assert run_names(warehouse, since='2024-06-20T14:11') == list(FILES.values())[3:]
+    assert run_names(warehouse, since='2024-04', until='2024-06-15') == list(FILES.values())[1:3]
+    assert run_names(warehouse, until='2023-09-25') == []
+
+
+def test_reingest_only_changed_files(tmp_path, runs):
+    warehouse = Warehouse(str(tmp_path / 'runs.db'))
+    warehouse.ingest(str(runs))
+    assert warehouse.changed_files([str(runs / i) for i in FILES]) == []
+    assert warehouse.ingest(str(runs)) == (0, 4, 0)
+
+    touched = runs / list(FILES)[1]
+    stat = os.stat(touched)
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert warehouse.ingest(str(runs)) == (1, 4, 0)
+    assert run_names(warehouse) == list(FILES.values())
+
+    count = warehouse.connection.execute("SELECT COUNT(*) FROM run_processes").fetchone()[0]
+    assert warehouse.ingest(str(runs)) == (0, 4, 0)
+    assert warehouse.connection.execute("SELECT COUNT(*) FROM run_processes").fetchone()[0] == count
+
+
+def test_missing_files_are_dropped_with_their_runs(tmp_path, runs, corpus_file):
+    warehouse = Warehouse(str(tmp_path / 'runs.db'))
+    warehouse.ingest(str(runs))
+    removed = list(FILES)[0]
+    os.remove(runs / removed)
+
+    # A warehouse also holding another directory only drops what was under DIR, runs_other included
+    other = tmp_path / 'runs_other'
+    other.mkdir()
+    shutil.copy(corpus_file('TreeVal_run_ieEpeAssi2_1_RAPID_TOL_2024-07-08_15-15-00.txt'), other)
+    assert warehouse.ingest(str(other)) == (1, 1, 0)
+    later = run_names(warehouse)[-1]
+    assert later not in FILES.values()
+
+    assert warehouse.ingest(str(runs)) == (0, 3, 1)
+    assert run_names(warehouse) == list(FILES.values())[1:] + [later]
+    assert warehouse.connection.execute("SELECT COUNT(*) FROM files WHERE path LIKE ?", (f'%{removed}',)).fetchone()[0] == 0
+    assert warehouse.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 4
+    orphans = "SELECT COUNT(*) FROM run_processes WHERE run_id NOT IN (SELECT run_id FROM runs)"
+    assert warehouse.connection.execute(orphans).fetchone()[0] == 0